@@ -1,27 +1,55 @@
 """FastAPI 请求与响应数据模型。"""
-from typing import List, Optional
+from datetime import date, datetime
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
 from backend import config
 
 
-class LoadRequest(BaseModel):
+class DatasetOptions(BaseModel):
+    """请求所针对的数据集。"""
+
+    dataset_id: Optional[str] = Field(
+        None, pattern=r"^[A-Za-z0-9_-]{1,64}$", description="数据集 ID，不填使用默认数据集",
+    )
+
+
+class PageOptions(BaseModel):
+    """大结果集的分页、排序与输出格式选项。"""
+
+    limit: Optional[int] = Field(None, ge=1, description="返回行数上限，不填返回全部")
+    offset: int = Field(0, ge=0, description="起始偏移量，配合响应中的 next_offset 翻页")
+    sort_by: Optional[str] = Field(None, description="服务端排序字段，配合 limit 即为 Top-K")
+    descending: bool = Field(True, description="是否降序排序")
+    layout: Literal["records", "columns"] = Field("records", description="records 为逐行对象，columns 为按列数组")
+
+
+# 分页选项不影响计算结果，合并请求与参数传递时需排除；数据集已由快照版本号区分，同样排除
+PAGE_FIELDS = {"limit", "offset", "sort_by", "descending", "layout", "dataset_id"}
+
+
+class LoadRequest(DatasetOptions):
     """数据加载请求。"""
 
-    path: Optional[str] = Field(None, description="CSV 文件路径，不填使用默认样例路径")
+    path: Optional[str] = Field(None, description="CSV 文件、目录或通配符路径（如 data/2024-*.csv），不填使用默认样例路径")
+    compact: Optional[bool] = Field(None, description="是否启用紧凑内存模式，不填沿用服务端配置")
+    start_date: Optional[date] = Field(None, description="只加载该日期及之后的订单，日期范围不相交的分区文件不会被读取")
+    end_date: Optional[date] = Field(None, description="只加载该日期及之前的订单")
 
 
-class PromotionRule(BaseModel):
+class PromotionRule(PageOptions, DatasetOptions):
     """促销筛选规则。"""
 
     min_quantity: float = Field(config.DEFAULT_PROMOTION_RULE["min_quantity"], description="最低销量")
     max_quantity: float = Field(config.DEFAULT_PROMOTION_RULE["max_quantity"], description="最高销量")
     min_profit_rate: float = Field(config.DEFAULT_PROMOTION_RULE["min_profit_rate"], description="最低利润率")
     max_discount: float = Field(config.DEFAULT_PROMOTION_RULE["max_discount"], description="最高折扣")
+    categories: Optional[str] = Field(None, description="只保留这些品类，多个以逗号分隔")
+    sub_categories: Optional[str] = Field(None, description="只保留这些子品类，多个以逗号分隔")
 
 
-class PromotionAnalyzeRequest(BaseModel):
+class PromotionAnalyzeRequest(PageOptions, DatasetOptions):
     """关联规则挖掘参数。"""
 
     min_support: float = Field(config.DEFAULT_MIN_SUPPORT, description="最小支持度")
@@ -40,33 +68,83 @@ class AssociationRule(BaseModel):
     reason: str
 
 
-class RecommendRequest(BaseModel):
+class RecommendRequest(DatasetOptions):
     """客户推荐请求。"""
 
     customer_id: str = Field(..., description="客户编号")
     top_n: int = Field(config.DEFAULT_TOP_N, description="推荐数量")
 
 
-class ForecastRequest(BaseModel):
-    """销售预测请求。"""
+class ForecastRequest(PageOptions, DatasetOptions):
+    """销售预测请求，分页选项作用于预测结果。"""
 
-    months: int = Field(config.DEFAULT_FORECAST_MONTHS, description="预测月份数")
+    months: int = Field(config.DEFAULT_FORECAST_MONTHS, ge=1, le=config.MAX_FORECAST_MONTHS, description="预测月份数")
 
 
-class ClusterRequest(BaseModel):
+class ClusterRequest(PageOptions, DatasetOptions):
     """聚类参数请求。"""
 
-    k: int = Field(config.DEFAULT_CLUSTER_K, description="聚类数量")
+    k: int = Field(config.DEFAULT_CLUSTER_K, ge=2, le=config.MAX_CLUSTER_K, description="聚类数量")
+    refit: bool = Field(False, description="是否在当前数据上重新训练模型，默认沿用追加数据前训练的模型")
+
+
+class CustomerOrderLine(BaseModel):
+    """用于现算 RFM 的一条客户订单明细。"""
+
+    customer_id: str = Field(..., description="客户编号")
+    order_id: str = Field(..., description="订单编号")
+    order_date: datetime = Field(..., description="下单时间")
+    sales: float = Field(..., description="销售额")
+
+
+class ClusterAssignRequest(DatasetOptions):
+    """客户分群归类请求：已有客户按编号取 RFM，新客户按提供的订单明细现算 RFM。"""
+
+    customer_ids: List[str] = Field(default_factory=list, description="数据集中已有客户的编号")
+    orders: List[CustomerOrderLine] = Field(default_factory=list, description="新客户的订单明细")
+    k: int = Field(config.DEFAULT_CLUSTER_K, ge=2, le=config.MAX_CLUSTER_K, description="聚类数量，对应已训练的模型")
+
+
+class SimilarCustomersRequest(DatasetOptions):
+    """相似客户检索请求。"""
+
+    customer_ids: List[str] = Field(..., min_length=1, description="种子客户编号列表")
+    top_n: int = Field(config.DEFAULT_TOP_N, ge=1, description="每个种子返回的相似客户数量")
+    include_category: bool = Field(False, description="是否加入品类消费占比特征")
 
 
-class ExportRequest(BaseModel):
+class ExportRequest(DatasetOptions):
     """导出任务请求。"""
 
-    target: str = Field(..., description="导出类型，支持 recommendation/promotion/cluster/forecast")
+    target: Optional[str] = Field(None, description="导出类型，支持 recommendation/promotion/cluster/forecast，指定 result_id 时可不填")
+    result_id: Optional[str] = Field(None, description="分析接口返回的结果 ID，指定后直接导出该结果而不重新计算")
+    format: Literal["csv", "parquet"] = Field("csv", description="导出格式")
+    compress: bool = Field(False, description="CSV 是否以 gzip 压缩")
     customer_id: Optional[str] = Field(None, description="当导出推荐时需要客户 ID")
     top_n: int = Field(config.DEFAULT_TOP_N, description="导出推荐的数量")
-    months: int = Field(config.DEFAULT_FORECAST_MONTHS, description="预测导出的月份数")
-    k: int = Field(config.DEFAULT_CLUSTER_K, description="聚类导出的群组数量")
+    months: int = Field(
+        config.DEFAULT_FORECAST_MONTHS, ge=1, le=config.MAX_FORECAST_MONTHS, description="预测导出的月份数",
+    )
+    k: int = Field(config.DEFAULT_CLUSTER_K, ge=2, le=config.MAX_CLUSTER_K, description="聚类导出的群组数量")
+
+
+class OrderLineEvent(BaseModel):
+    """一条实时订单明细事件。"""
+
+    order_id: str = Field(..., description="订单编号")
+    product_id: str = Field(..., description="商品编号")
+    product_name: Optional[str] = Field(None, description="商品名称，用于热销榜展示")
+    customer_id: Optional[str] = Field(None, description="客户编号")
+    quantity: float = Field(1, description="数量")
+    sales: float = Field(..., description="销售额")
+    profit: float = Field(0, description="利润")
+    timestamp: Optional[datetime] = Field(None, description="下单时间，不填为服务端接收时间")
+
+
+class EventBatch(DatasetOptions):
+    """一批实时订单明细事件。"""
+
+    events: List[OrderLineEvent] = Field(..., min_length=1, max_length=config.EVENT_BATCH_MAX, description="订单明细事件")
 
 
 class MiniMaxTTSRequest(BaseModel):
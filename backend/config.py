@@ -50,13 +50,98 @@ DEFAULT_PROMOTION_RULE = {
     "max_discount": 0.5,
 }
 DEFAULT_FORECAST_MONTHS = 3
+# 预测月数上限：月数参与预测缓存键并决定 ARIMA 外推步数，需限制以免客户端撑大缓存与计算量
+MAX_FORECAST_MONTHS = int(os.getenv("MAX_FORECAST_MONTHS", "24"))
 DEFAULT_CLUSTER_K = 4
+# 聚类数量上限与每个数据谱系最多缓存的模型数：k 参与模型缓存键，逐个尝试不同 k 不会无限占用内存
+MAX_CLUSTER_K = int(os.getenv("MAX_CLUSTER_K", "12"))
+CLUSTER_MODELS_PER_LINEAGE = int(os.getenv("CLUSTER_MODELS_PER_LINEAGE", "4"))
 DEFAULT_MIN_SUPPORT = 0.01
 DEFAULT_MIN_CONFIDENCE = 0.5
 
+# 紧凑内存模式：ID/名称/类别使用共享字典编码的 category，数量用 int32、金额与折扣用 float32，
+# 并丢弃分析用不到的列，适合在单进程内容纳更大的数据集。float32 约 7 位有效数字，单行金额超过约 16 万时
+# 不再精确到分；订单、客户、商品等汇总统一先提升为 float64 再累加，不会随行数累积误差
+COMPACT_MEMORY = os.getenv("DATA_COMPACT_MEMORY", "").lower() in {"1", "true", "yes"}
+
+# 多 worker 共享数据集：加载后将视图发布为内存映射文件，其它 worker 只读挂载并按版本号切换。
+# 数值、日期与 category 列零拷贝共享；非紧凑模式下的字符串列挂载时还原为原 dtype，每个 worker 各持一份，
+# 需要字符串列也零拷贝共享时同时开启 DATA_COMPACT_MEMORY
+SHARED_MEMORY_ENABLED = os.getenv("DATA_SHARED_MEMORY", "").lower() in {"1", "true", "yes"}
+SHARED_DATA_DIR = os.path.join(OUTPUT_DIR, "shared")
+
+# 多数据集注册表：请求未指定 dataset_id 时使用默认数据集；各数据集常驻内存合计超过预算（MB，0 表示不限）时，
+# 按最近最少使用将数据集写入 DATASET_SPILL_DIR 并释放内存，下次使用时以内存映射方式挂载而无需重新解析 CSV
+DEFAULT_DATASET_ID = "default"
+DATASET_MEMORY_BUDGET_MB = int(os.getenv("DATASET_MEMORY_BUDGET_MB", "2048"))
+DATASET_SPILL_DIR = os.path.join(OUTPUT_DIR, "datasets")
+
+# 目录或通配符加载多个 CSV 时的并行解析线程数；各文件的日期范围记录在分区索引中，按日期窗口加载时据此跳过无关文件
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+PARTITION_INDEX_PATH = os.path.join(OUTPUT_DIR, "partition_index.json")
+
+# 实时订单事件的滑动窗口：窗口名 -> (桶数, 每桶秒数)，窗口覆盖最近 桶数×每桶秒数 的事件；单批事件条数上限
+EVENT_WINDOWS = {"5m": (60, 5), "1h": (60, 60), "24h": (96, 900)}
+EVENT_BATCH_MAX = 5000
+EVENT_TOP_K = 10
+
+# 计算密集型接口准入控制：按 (请求方法, 路径) 匹配，methods 中的方法与 paths 中的附加路径共用同一闸门；
+# concurrency 为同时执行上限，queue 为最多排队数，timeout 为排队超时秒数。OPTIONS/HEAD 请求不受限
+ADMISSION_LIMITS = {
+    "/api/promotion/analyze": {"methods": ["GET", "POST"], "concurrency": 2, "queue": 8, "timeout": 15},
+    "/api/forecast": {"methods": ["GET", "POST"], "concurrency": 2, "queue": 8, "timeout": 15},
+    "/api/clustering": {
+        "methods": ["GET", "POST"], "paths": ["/api/clustering/assign"], "concurrency": 2, "queue": 8, "timeout": 15,
+    },
+    "/api/export": {"methods": ["POST"], "concurrency": 2, "queue": 4, "timeout": 30},
+    "/api/recommend": {"methods": ["POST"], "concurrency": 4, "queue": 16, "timeout": 10},
+    "/api/promotion": {"methods": ["GET", "POST"], "concurrency": 4, "queue": 16, "timeout": 10},
+    "/api/customers/similar": {"methods": ["POST"], "concurrency": 4, "queue": 16, "timeout": 10},
+}
+# 线程池总量固定为 受限接口并发之和 + READ_LANE_THREADS。受限接口最多占用其并发之和个线程，
+# 因此至少 READ_LANE_THREADS 个线程始终留给健康检查、数据概览等其它接口；默认 20 + 20 = 40，与 anyio 默认容量一致
+READ_LANE_THREADS = int(os.getenv("READ_LANE_THREADS", "20"))
+
+# 响应体超过该字节数且客户端支持时启用 gzip 压缩
+GZIP_MIN_SIZE = 1024
+# 已压缩的下载内容（gzip CSV 导出、Parquet）不经 gzip 中间件二次压缩
+GZIP_EXCLUDED_TYPES = ("application/gzip", "application/vnd.apache.parquet", "text/event-stream")
+
+# 流式导出每块行数；分析结果缓存条目数（导出可按结果 ID 直接复用）
+EXPORT_CHUNK_ROWS = 50000
+RESULT_CACHE_SIZE = 32
+
+# 分析接口 GET 版本的 Cache-Control max-age（秒），0 表示每次都用 ETag 向服务端校验
+ANALYSIS_CACHE_MAX_AGE = 0
+
+# 按需请求剖析：请求头 X-Profile 与该令牌一致时对该请求运行 cProfile 与栈采样，留空表示关闭
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# 启动后在后台加载默认数据；开启 STARTUP_WARMUP 时还在就绪前预热以下计算（可选 forecast、clustering、
+# co_occurrence、basket、promotion_index）。预热会在每个 worker 启动时导入 scikit-learn、statsmodels、mlxtend，
+# 抵消延迟导入带来的启动提速，因此默认关闭
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "").lower() in {"1", "true", "yes"}
+STARTUP_WARMUP_TASKS = ["forecast", "clustering", "co_occurrence", "basket", "promotion_index"]
+
 # 日志相关
 LOG_LEVEL = "INFO"
 LOG_FILE = os.path.join(OUTPUT_DIR, "system.log")
+# 日志文件按时间（LOG_ROTATE_WHEN）与大小（LOG_MAX_BYTES）双重条件轮转，保留 LOG_BACKUP_COUNT 个归档
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_ROTATE_WHEN = "midnight"
+LOG_BACKUP_COUNT = 14
+# 设置 LOG_JSON=1 时以 JSON Lines 格式输出
+LOG_JSON = os.getenv("LOG_JSON", "").lower() in {"1", "true", "yes"}
+# 异步日志队列容量，写盘跟不上时丢弃而不阻塞请求
+LOG_QUEUE_SIZE = 10000
+# 高频 INFO 日志采样：每个调用位置在 LOG_SAMPLE_WINDOW 秒内前 LOG_SAMPLE_BURST 条全部输出，之后每 LOG_SAMPLE_EVERY 条输出一条
+LOG_SAMPLE_WINDOW = 10
+LOG_SAMPLE_BURST = 20
+LOG_SAMPLE_EVERY = 100
+# 是否把日志继续传递给根记录器（如 uvicorn 或测试框架配置的处理器）；只需本模块的队列输出、避免重复打印时设为 0
+LOG_PROPAGATE = os.getenv("LOG_PROPAGATE", "1").lower() in {"1", "true", "yes"}
 
 # 语音播报
 TTS_RATE = 170
@@ -68,6 +153,9 @@ MINIMAX_DEFAULT_VOICE = os.getenv("MINIMAX_VOICE_ID", "Chinese (Mandarin)_Warm_G
 MINIMAX_GROUP_ID = os.getenv("MINIMAX_GROUP_ID", "")
 MINIMAX_API_KEY = os.getenv("MINIMAX_API_KEY", "")
 MINIMAX_POLL_INTERVAL = 2
+# 云端合成音频的本地缓存：按文本、发音设置、音频设置与模型的哈希存放，超出容量时淘汰最久未用的文件
+TTS_CACHE_DIR = os.path.join(TTS_AUDIO_DIR, "cache")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
 
 # 前端跨域配置（本地调试与部署时务必限制来源域名）
 # 生产环境请改为实际受信任的前端域名列表，避免使用 ["*"] 造成安全风险。
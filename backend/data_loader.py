@@ -1,48 +1,622 @@
 """数据加载与清洗模块。"""
-from datetime import datetime
-from typing import Dict, Optional
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import pandas as pd
 
 from backend import config
+from backend.utils import shared_store
+from backend.utils import metrics
 from backend.utils.logger import LOGGER
 
+# 紧凑模式下保留的列，其余列在加载后释放
+_COMPACT_COLUMNS: List[str] = [
+    "order_id", "order_date", "customer_id", "customer_name", "product_id",
+    "product_name", "category", "sub_category", "quantity", "sales", "profit", "discount",
+]
+_CATEGORICAL_COLUMNS: List[str] = [
+    "order_id", "customer_id", "customer_name", "product_id", "product_name", "category", "sub_category",
+]
+_VIEW_NAMES: List[str] = ["raw_df", "orders", "customers", "products", "rfm"]
+# 挂载共享数据集时遇到版本目录被并发清理的重试次数
+_ATTACH_RETRIES = 3
+
+# 快照版本号在进程内全局递增，不同数据集的版本互不重复，各模块按版本号缓存的结果因此不会串用
+_VERSION_LOCK = threading.Lock()
+_last_version = 0
+# 各数据仓库当前发布的快照版本及其谱系号，已被替换的版本不在其中；换出到磁盘的版本仍保留，
+# 重新挂载后沿用同一版本号，按版本缓存的分析结果不必重算
+_LIVE_VERSIONS: Dict[int, int] = {}
+
+
+def _next_version(at_least: int = 0) -> int:
+    """分配新的快照版本号。"""
+    global _last_version
+    with _VERSION_LOCK:
+        _last_version = max(_last_version + 1, at_least)
+        return _last_version
+
+
+# 分区索引：文件绝对路径 -> 大小、修改时间、行数与订单日期范围，文件变化后自动失效
+_PARTITION_INDEX: Dict[str, Dict[str, Any]] = {}
+_PARTITION_LOCK = threading.Lock()
+_partition_index_loaded = False
+
+
+def is_live_version(version: int) -> bool:
+    """
+    判断版本号是否仍是某个数据集的当前快照，按版本缓存的模块据此淘汰过期条目。
+
+    :param version: 快照版本号。
+    :return: 是否仍在使用。
+    """
+    return version in _LIVE_VERSIONS
+
+
+def is_live_lineage(lineage: int) -> bool:
+    """
+    判断谱系号是否仍有数据集在用，跨追加复用的缓存（如聚类模型）据此淘汰过期条目。
+
+    :param lineage: 快照谱系号，即该数据首次加载时的版本号。
+    :return: 是否仍在使用。
+    """
+    return lineage in list(_LIVE_VERSIONS.values())
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """
+    一次加载产生的不可变数据快照。
+
+    快照构建完成后才会被发布，发布后任何视图都不再修改；请求在开始时取得快照引用并全程使用，
+    新数据以整体替换快照的方式生效，旧快照在最后一个引用它的请求结束后由垃圾回收释放。
+    orders、customers、products、rfm 等派生视图在首次访问时才由 raw_df 构建并缓存在快照内，
+    只做预测的 worker 不必为用不到的视图付出加载时间与内存。
+    """
+
+    raw_df: Optional[pd.DataFrame] = None
+    source_path: Optional[str] = None
+    version: int = 0
+    # 谱系号：加载时取本次版本号，追加时沿用，标识“同一份数据的后续版本”
+    lineage: int = 0
+    compact: bool = False
+    fingerprint: str = ""
+    # 多文件加载时各分区文件的路径、行数、日期范围与是否被读取
+    partitions: Tuple[Dict[str, Any], ...] = ()
+    # 已构建好的派生视图（共享挂载或增量追加时传入），其余视图按需构建
+    prebuilt: Dict[str, pd.DataFrame] = field(default_factory=dict, repr=False, compare=False)
+    # 已构建的派生视图，另以 "_counts" 缓存概览计数
+    _memo: Dict[str, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._memo.update({name: view for name, view in self.prebuilt.items() if view is not None})
+        object.__setattr__(self, "prebuilt", {})
+
+    @property
+    def orders(self) -> Optional[pd.DataFrame]:
+        return self._view("orders")
+
+    @property
+    def customers(self) -> Optional[pd.DataFrame]:
+        return self._view("customers")
+
+    @property
+    def products(self) -> Optional[pd.DataFrame]:
+        return self._view("products")
+
+    @property
+    def rfm(self) -> Optional[pd.DataFrame]:
+        return self._view("rfm")
+
+    def built(self, name: str) -> Optional[pd.DataFrame]:
+        """返回已构建的派生视图，尚未构建时返回 None 而不触发构建。"""
+        return self.raw_df if name == "raw_df" else self._memo.get(name)
+
+    def views(self) -> Dict[str, pd.DataFrame]:
+        """返回已构建的视图名到数据框的映射，不触发尚未构建的视图。"""
+        return {name: view for name in _VIEW_NAMES if (view := self.built(name)) is not None}
+
+    def materialize(self) -> Dict[str, pd.DataFrame]:
+        """构建全部派生视图并返回视图名到数据框的映射。"""
+        if self.raw_df is None:
+            return {}
+        return {name: getattr(self, name) for name in _VIEW_NAMES}
+
+    def _view(self, name: str) -> Optional[pd.DataFrame]:
+        """取得派生视图，首次访问时加锁构建，同一快照内只构建一次。"""
+        view = self._memo.get(name)
+        if view is not None or self.raw_df is None:
+            return view
+        with self._lock:
+            view = self._memo.get(name)
+            if view is None:
+                with metrics.stage(f"view.{name}"):
+                    view = _VIEW_BUILDERS[name](self)
+                self._memo[name] = view
+        return view
+
+    def get_latest_date(self) -> Optional[datetime]:
+        """返回数据集中最新订单日期。"""
+        if self.raw_df is None or "order_date" not in self.raw_df:
+            return None
+        return self.raw_df["order_date"].max()
+
+    def overview(self) -> Dict[str, object]:
+        """返回数据概览，用于前端展示。"""
+        if self.raw_df is None:
+            raise ValueError("尚未加载任何数据集。")
+        counts = self._counts()
+        return {
+            "records": int(len(self.raw_df)),
+            **counts,
+            "source_path": self.source_path,
+            "compact": self.compact,
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "partitions": list(self.partitions),
+        }
+
+    def _counts(self) -> Dict[str, object]:
+        """
+        返回订单、客户、商品数与日期范围，同一快照内只计算一次。
+
+        对应视图已构建时直接取其行数，否则在明细上统计，概览不会触发派生视图的构建。
+        """
+        counts = self._memo.get("_counts")
+        if counts is not None:
+            return counts
+        with self._lock:
+            counts = self._memo.get("_counts")
+            if counts is not None:
+                return counts
+            df = self.raw_df
+            orders, customers, products = self.built("orders"), self.built("customers"), self.built("products")
+            latest_date = self.get_latest_date()
+            earliest = df["order_date"].min() if "order_date" in df else None
+            counts = {
+                "orders": int(len(orders) if orders is not None else df["order_id"].nunique()),
+                "customers": int(len(customers) if customers is not None else df["customer_id"].nunique()),
+                "products": int(
+                    len(products) if products is not None
+                    else df.groupby(["product_id", "product_name"], dropna=False, observed=True).ngroups
+                ),
+                "start_date": earliest.strftime("%Y-%m-%d") if earliest is not None else None,
+                "end_date": latest_date.strftime("%Y-%m-%d") if latest_date is not None else None,
+            }
+            self._memo["_counts"] = counts
+        return counts
+
+    def memory_report(self) -> Dict[str, Dict[str, object]]:
+        """
+        统计已构建数据视图的深度内存占用，尚未构建的视图不计入。
+
+        :return: 以视图名为键，包含行数、字节数与各列字节数的字典。
+        """
+        report: Dict[str, Dict[str, object]] = {}
+        for name, view in self.views().items():
+            usage = view.memory_usage(index=True, deep=True)
+            report[name] = {
+                "rows": int(len(view)),
+                "bytes": int(usage.sum()),
+                "columns": {str(col): int(size) for col, size in usage.items()},
+            }
+        return report
+
+    def resident_bytes(self) -> int:
+        """统计已构建视图占用的堆内存，直接引用内存映射文件的列不计入。"""
+        total = 0
+        for view in self.views().values():
+            total += int(view.index.memory_usage(deep=True))
+            for column in view.columns:
+                series = view[column]
+                if not shared_store.is_mapped(series):
+                    total += int(series.memory_usage(index=False, deep=True))
+        return total
+
 
 class DataRepository:
-    """数据仓库，集中存储加载后的数据视图。"""
+    """数据仓库，持有当前发布的数据快照，并负责加载、追加与共享发布。"""
+
+    def __init__(self, compact: bool = config.COMPACT_MEMORY) -> None:
+        self.compact = compact
+        self._snapshot = DatasetSnapshot()
+        # 仅串行化写入方（加载/追加/挂载），读取方直接取快照引用，从不等待
+        self._write_lock = threading.Lock()
+        self._shared_mtime: Optional[int] = None
+        # 数据集被注册表换出后的落盘目录，换出期间快照为空，由 reload_spilled 重新挂载
+        self._spill_root: Optional[str] = None
+
+    def snapshot(self) -> DatasetSnapshot:
+        """返回当前快照，调用方应在整个请求期间持有该引用。"""
+        return self._snapshot
+
+    @property
+    def raw_df(self) -> Optional[pd.DataFrame]:
+        return self._snapshot.raw_df
 
-    def __init__(self) -> None:
-        self.raw_df: Optional[pd.DataFrame] = None
-        self.orders: Optional[pd.DataFrame] = None
-        self.customers: Optional[pd.DataFrame] = None
-        self.products: Optional[pd.DataFrame] = None
-        self.source_path: Optional[str] = None
+    @property
+    def orders(self) -> Optional[pd.DataFrame]:
+        return self._snapshot.orders
 
-    def load_csv(self, path: str = config.DEFAULT_CSV) -> None:
+    @property
+    def customers(self) -> Optional[pd.DataFrame]:
+        return self._snapshot.customers
+
+    @property
+    def products(self) -> Optional[pd.DataFrame]:
+        return self._snapshot.products
+
+    @property
+    def rfm(self) -> Optional[pd.DataFrame]:
+        return self._snapshot.rfm
+
+    @property
+    def source_path(self) -> Optional[str]:
+        return self._snapshot.source_path
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def load_csv(
+        self,
+        path: str = config.DEFAULT_CSV,
+        compact: Optional[bool] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> None:
         """
-        读取并清洗销售明细数据。
+        读取并清洗销售明细数据，构建完整快照后一次性替换。
+
+        path 可以是单个 CSV、目录（读取其中全部 *.csv）或通配符；多个文件视为按时间划分的分区，
+        在线程池中并行解析后合并。指定日期窗口时，分区索引中日期范围与窗口不相交的文件直接跳过不读。
 
-        :param path: CSV 文件路径。
+        :param path: CSV 文件、目录或通配符路径。
+        :param compact: 是否启用紧凑内存模式，None 时沿用仓库当前设置。
+        :param start_date: 只保留该日期及之后的订单，None 表示不限。
+        :param end_date: 只保留该日期及之前的订单，None 表示不限。
         """
-        LOGGER.info("开始读取销售数据：%s", path)
+        if compact is not None:
+            self.compact = compact
+        use_compact = self.compact
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期。")
+        files = _resolve_sources(path)
+        LOGGER.info("开始读取销售数据：%s，共 %s 个文件。", path, len(files))
+        partitions = [_partition_info(file) for file in files]
+        selected = [file for file, info in zip(files, partitions) if _overlaps(info, start_date, end_date)]
         try:
-            df = pd.read_csv(path)
+            if len(selected) <= 1:
+                frames = [self._read_partition(file, use_compact, start_date, end_date) for file in selected]
+            else:
+                with ThreadPoolExecutor(max_workers=min(config.LOAD_WORKERS, len(selected))) as pool:
+                    frames = list(pool.map(lambda file: self._read_partition(file, use_compact, start_date, end_date), selected))
         except FileNotFoundError as exc:
             LOGGER.error("未找到数据文件，请检查路径：%s", path)
             raise exc
         except Exception as exc:  # noqa: BLE001
             LOGGER.error("读取 CSV 失败，请确认文件编码与格式。%s", exc)
             raise exc
+        _save_partition_index()
+        if not frames or all(frame.empty for frame in frames):
+            raise ValueError("指定日期范围内没有任何订单记录。")
+        with metrics.stage("load_csv.concat"):
+            df = _concat_partitions(frames)
+        fingerprint = self._sources_fingerprint(files, use_compact, start_date, end_date)
+        with self._write_lock:
+            version = _next_version()
+            self._swap(DatasetSnapshot(
+                raw_df=df,
+                source_path=path,
+                version=version,
+                lineage=version,
+                compact=use_compact,
+                fingerprint=fingerprint,
+                partitions=tuple(
+                    {**_partition_info(file), "path": file, "loaded": file in selected} for file in files
+                ),
+            ))
+        LOGGER.info(
+            "数据读取完成，共 %s 条记录，读取分区 %s/%s 个，派生视图将在首次使用时构建。", len(df), len(selected), len(files),
+        )
+
+    def _read_partition(
+        self, path: str, compact: bool, start_date: Optional[date], end_date: Optional[date],
+    ) -> pd.DataFrame:
+        """读取并清洗单个分区文件，记录其日期范围，并按日期窗口过滤。"""
+        stat = os.stat(path)
+        with metrics.stage("load_csv.read"):
+            df = pd.read_csv(path)
+        with metrics.stage("load_csv.clean"):
+            df = self._normalize_columns(df)
+            df = self._convert_types(df)
+            df = df.dropna(subset=["order_id", "customer_id", "product_id", "sales", "profit"])
+            dates = df["order_date"] if "order_date" in df else None
+            _record_partition(path, stat, len(df), dates)
+            if dates is not None and (start_date is not None or end_date is not None):
+                mask = pd.Series(True, index=df.index)
+                if start_date is not None:
+                    mask &= dates >= pd.Timestamp(start_date)
+                if end_date is not None:
+                    mask &= dates <= pd.Timestamp(end_date)
+                df = df[mask]
+            if compact:
+                df = self._compact_frame(df)
+        return df
+
+    def append_csv(self, source: Union[str, IO[bytes]]) -> int:
+        """
+        读取增量 CSV 并追加到当前数据集。
+
+        :param source: CSV 文件路径或二进制文件对象。
+        :return: 实际追加的记录数。
+        """
+        try:
+            df = pd.read_csv(source)
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.error("读取增量 CSV 失败，请确认文件编码与格式。%s", exc)
+            raise exc
+        return self.append_records(df)
 
+    def append_records(self, df: pd.DataFrame) -> int:
+        """
+        追加新订单明细，仅对受影响的订单、客户、商品增量刷新视图，并以新快照整体替换。
+
+        :param df: 新增的订单明细数据框，列名规则同 load_csv。
+        :return: 实际追加的记录数。
+        """
         df = self._normalize_columns(df)
         df = self._convert_types(df)
         df = df.dropna(subset=["order_id", "customer_id", "product_id", "sales", "profit"])
-        self.raw_df = df
-        self.orders = self._build_orders(df)
-        self.customers = self._build_customers(df)
-        self.products = self._build_products(df)
-        self.source_path = path
-        LOGGER.info("数据读取完成，共 %s 条记录，订单数 %s 个，客户数 %s 个。", len(df), self.orders.shape[0], self.customers.shape[0])
+        with self._write_lock:
+            current = self._snapshot
+            if current.raw_df is None:
+                raise ValueError("尚未加载任何数据集，无法追加。")
+            if df.empty:
+                return 0
+            compact = current.compact
+            order_ids = df["order_id"].unique()
+            if compact:
+                raw_df = _append_compact(current.raw_df, self._compact_frame(df))
+            else:
+                raw_df = pd.concat([current.raw_df, df], ignore_index=True)
+            like = raw_df if compact else None
+            # 只增量刷新当前快照中已构建的视图，尚未构建的视图留给新快照按需构建
+            prebuilt: Dict[str, pd.DataFrame] = {}
+            orders = current.built("orders")
+            if orders is not None:
+                previous_owners = orders.loc[orders["order_id"].isin(order_ids), "customer_id"]
+                orders = prebuilt["orders"] = self._refresh_rows(orders, raw_df, "order_id", order_ids, _build_orders, like)
+            customers = current.built("customers")
+            if customers is not None:
+                prebuilt["customers"] = self._refresh_rows(customers, raw_df, "customer_id", df["customer_id"].unique(), _build_customers, like)
+            products = current.built("products")
+            if products is not None:
+                prebuilt["products"] = self._refresh_rows(products, raw_df, "product_id", df["product_id"].unique(), _build_products, like)
+            rfm = current.built("rfm")
+            if rfm is not None and orders is not None:
+                current_owners = orders.loc[orders["order_id"].isin(order_ids), "customer_id"]
+                touched_customers = pd.concat([previous_owners, current_owners]).unique()
+                rfm = self._refresh_rows(rfm, orders, "customer_id", touched_customers, _build_rfm, like)
+                latest_date = raw_df["order_date"].max() if "order_date" in raw_df else None
+                prebuilt["rfm"] = _with_recency(rfm, latest_date)
+            self._swap(replace(
+                current,
+                raw_df=raw_df,
+                version=_next_version(),
+                fingerprint=self._chain_fingerprint(current.fingerprint, df),
+                prebuilt=prebuilt,
+            ))
+        LOGGER.info("已追加 %s 条记录，涉及客户 %s 个。", len(df), df["customer_id"].nunique())
+        return int(len(df))
+
+    def publish_shared(self) -> int:
+        """
+        将当前快照发布到共享目录，并改为挂载发布后的只读映射以释放堆内副本。
+
+        :return: 发布后的全局版本号。
+        """
+        current = self._snapshot
+        if current.raw_df is None:
+            raise ValueError("尚未加载任何数据集，无法发布。")
+        shared_store.publish(current.materialize(), current.source_path, current.compact, current.fingerprint)
+        self._shared_mtime = None
+        self.sync_shared()
+        return self.version
+
+    def sync_shared(self) -> bool:
+        """
+        检查共享目录是否有新版本，有则以内存映射方式挂载为新快照。
+
+        :return: 是否挂载了新版本。
+        """
+        mtime = self._manifest_mtime()
+        if mtime is None or mtime == self._shared_mtime:
+            return False
+        with self._write_lock:
+            if mtime == self._shared_mtime:
+                return False
+            for _ in range(_ATTACH_RETRIES):
+                mtime = self._manifest_mtime()
+                manifest = shared_store.read_manifest()
+                if manifest is None:
+                    return False
+                try:
+                    views = shared_store.attach(manifest)
+                    break
+                except FileNotFoundError:
+                    # 读取清单与挂载之间，其它 worker 发布新版本并清理了该版本目录，改为挂载最新清单
+                    LOGGER.warning("共享数据集版本 %s 已被清理，重新读取最新版本。", manifest.get("version"))
+            else:
+                LOGGER.warning("共享数据集版本连续被清理，本次沿用当前快照。")
+                return False
+            version = _next_version(int(manifest["version"]))
+            self._swap(DatasetSnapshot(
+                raw_df=views["raw_df"],
+                source_path=manifest.get("source_path"),
+                version=version,
+                lineage=version,
+                compact=bool(manifest.get("compact", False)),
+                fingerprint=str(manifest.get("fingerprint", "")),
+                prebuilt={name: view for name, view in views.items() if name != "raw_df"},
+            ))
+            self._shared_mtime = mtime
+        LOGGER.info("已挂载共享数据集版本 %s，共 %s 条记录。", self.version, len(views["raw_df"]))
+        return True
+
+    @property
+    def spilled(self) -> bool:
+        """数据集是否已被换出到磁盘且尚未重新挂载。"""
+        return self._spill_root is not None and self._snapshot.raw_df is None
+
+    def spill(self, root: str) -> bool:
+        """
+        将当前快照已构建的视图写入落盘目录并释放内存；内容未变化时复用上次写出的文件。
+
+        :param root: 落盘目录。
+        :return: 是否换出了数据。
+        """
+        with self._write_lock:
+            current = self._snapshot
+            if current.raw_df is None:
+                return False
+            manifest = shared_store.read_manifest(root)
+            if (
+                manifest is None
+                or not current.fingerprint
+                or manifest.get("fingerprint") != current.fingerprint
+                or set(manifest["views"]) != set(current.views())
+            ):
+                shared_store.publish(current.views(), current.source_path, current.compact, current.fingerprint, root=root)
+            self._spill_root = root
+            # 空快照保留原版本号与谱系号，重新挂载时沿用
+            self._swap(DatasetSnapshot(
+                source_path=current.source_path, version=current.version, lineage=current.lineage, compact=current.compact,
+            ))
+        LOGGER.info("数据集已换出到磁盘：%s", root)
+        return True
+
+    def reload_spilled(self) -> bool:
+        """
+        以只读内存映射方式重新挂载换出的数据集，不重新解析 CSV。
+
+        :return: 是否重新挂载了数据。
+        """
+        if not self.spilled:
+            return False
+        with self._write_lock:
+            if not self.spilled:
+                return False
+            root = str(self._spill_root)
+            manifest = shared_store.read_manifest(root)
+            if manifest is None:
+                raise ValueError(f"换出的数据集文件已丢失：{root}")
+            views = shared_store.attach(manifest, root)
+            # 内容与换出前相同，沿用原版本号，按版本缓存的模型、预测、购物篮与共现矩阵继续有效
+            parked = self._snapshot
+            self._swap(DatasetSnapshot(
+                raw_df=views["raw_df"],
+                source_path=manifest.get("source_path"),
+                version=parked.version,
+                lineage=parked.lineage,
+                compact=bool(manifest.get("compact", False)),
+                fingerprint=str(manifest.get("fingerprint", "")),
+                prebuilt={name: view for name, view in views.items() if name != "raw_df"},
+            ))
+        LOGGER.info("已从磁盘重新挂载数据集：%s，共 %s 条记录。", root, len(views["raw_df"]))
+        return True
+
+    def get_latest_date(self) -> Optional[datetime]:
+        """返回当前快照中最新订单日期。"""
+        return self._snapshot.get_latest_date()
+
+    def overview(self) -> Dict[str, object]:
+        """返回当前快照的数据概览。"""
+        return self._snapshot.overview()
+
+    def memory_report(self) -> Dict[str, Dict[str, object]]:
+        """返回当前快照各视图的内存占用。"""
+        return self._snapshot.memory_report()
+
+    def _sources_fingerprint(
+        self, files: List[str], compact: bool, start_date: Optional[date], end_date: Optional[date],
+    ) -> str:
+        """根据各文件路径、大小、修改时间与日期窗口生成数据指纹，同一批文件在各 worker 间一致。"""
+        parts = []
+        for path in files:
+            stat = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}")
+        raw = "|".join(parts) + f"|{compact}"
+        if start_date is not None or end_date is not None:
+            raw += f"|{start_date}|{end_date}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _chain_fingerprint(self, previous: str, appended: pd.DataFrame) -> str:
+        """在原指纹基础上叠加追加数据的内容哈希。"""
+        content = int(pd.util.hash_pandas_object(appended, index=False).sum())
+        raw = f"{previous}|{content}|{len(appended)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _swap(self, snapshot: DatasetSnapshot) -> None:
+        """以单次引用赋值发布新快照，调用方需持有写锁。"""
+        _LIVE_VERSIONS.pop(self._snapshot.version, None)
+        # 换出后的空快照仍带原版本号，视为在用
+        if snapshot.raw_df is not None or snapshot.version:
+            _LIVE_VERSIONS[snapshot.version] = snapshot.lineage
+        self._snapshot = snapshot
+
+    def _manifest_mtime(self) -> Optional[int]:
+        """返回共享版本清单的修改时间，仅需一次 stat 即可判断是否有新版本。"""
+        try:
+            return os.stat(shared_store.manifest_path()).st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh_rows(
+        self,
+        view: pd.DataFrame,
+        source: pd.DataFrame,
+        key: str,
+        keys: Iterable[object],
+        builder: Callable[[pd.DataFrame], pd.DataFrame],
+        like: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """按主键从源数据重算受影响的汇总行，其余行保持不变；like 非空时复用其 category 字典。"""
+        keys = list(keys)
+        rebuilt = builder(source[source[key].isin(keys)])
+        kept = view[~view[key].isin(keys)]
+        merged = pd.concat([kept, rebuilt], ignore_index=True)
+        if like is not None:
+            merged = self._share_categories(merged, like)
+        return merged.sort_values(by=key, ignore_index=True)
+
+    def _compact_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """释放无用列，并将键与维度列转为 category、度量列降为 32 位。"""
+        df = df[[col for col in _COMPACT_COLUMNS if col in df.columns]].copy()
+        for col in _CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(str).astype("category")
+        quantity = df["quantity"]
+        df["quantity"] = quantity.astype("int32") if (quantity % 1 == 0).all() else quantity.astype("float32")
+        for col in ["sales", "profit", "discount"]:
+            df[col] = df[col].astype("float32")
+        return df
+
+    def _share_categories(self, view: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+        """让视图中的键列复用 raw_df 的 category 字典，避免每个视图各存一份字符串。"""
+        for col in view.columns:
+            if col in _CATEGORICAL_COLUMNS and col in like:
+                view[col] = view[col].astype(like[col].dtype)
+        return view
 
     def _normalize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -103,65 +677,392 @@ class DataRepository:
         df["profit"] = df["profit"].fillna(0)
         return df
 
-    def _build_orders(self, df: pd.DataFrame) -> pd.DataFrame:
-        """按订单汇总基础信息。"""
-        grouped = df.groupby("order_id").agg(
-            customer_id=("customer_id", "first"),
-            order_date=("order_date", "first"),
-            sales=("sales", "sum"),
-            profit=("profit", "sum"),
-            discount=("discount", "mean"),
-        )
-        grouped = grouped.reset_index()
-        return grouped
-
-    def _build_customers(self, df: pd.DataFrame) -> pd.DataFrame:
-        """按客户汇总消费情况。"""
-        grouped = df.groupby("customer_id").agg(
-            order_count=("order_id", "nunique"),
-            total_sales=("sales", "sum"),
-            total_profit=("profit", "sum"),
-            first_order_date=("order_date", "min"),
-            last_order_date=("order_date", "max"),
-        )
-        return grouped.reset_index()
-
-    def _build_products(self, df: pd.DataFrame) -> pd.DataFrame:
-        """按商品汇总销售指标。"""
-        grouped = df.groupby(["product_id", "product_name"], dropna=False).agg(
-            quantity=("quantity", "sum"),
-            sales=("sales", "sum"),
-            profit=("profit", "sum"),
-            discount=("discount", "mean"),
-        )
-        grouped = grouped.reset_index()
-        if grouped.empty:
-            grouped["profit_rate"] = 0
-        else:
-            grouped["profit_rate"] = grouped.apply(lambda r: r["profit"] / r["sales"] if r["sales"] else 0, axis=1)
-        return grouped
 
-    def get_latest_date(self) -> Optional[datetime]:
-        """返回数据集中最新订单日期。"""
-        if self.raw_df is None or "order_date" not in self.raw_df:
-            return None
-        return self.raw_df["order_date"].max()
 
-    def overview(self) -> Dict[str, object]:
-        """返回数据概览，用于前端展示。"""
-        if self.raw_df is None:
-            raise ValueError("尚未加载任何数据集。")
-        latest_date = self.get_latest_date()
-        earliest = self.raw_df["order_date"].min() if "order_date" in self.raw_df else None
+def _resolve_sources(path: str) -> List[str]:
+    """将单个文件、目录或通配符路径展开为按文件名排序的 CSV 文件列表。"""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.csv")))
+    elif glob.has_magic(path):
+        files = sorted(item for item in glob.glob(path, recursive=True) if os.path.isfile(item))
+    else:
+        return [path]
+    if not files:
+        raise FileNotFoundError(f"未找到匹配的 CSV 文件：{path}")
+    return files
+
+
+def _load_partition_index() -> None:
+    """首次使用时从磁盘读取分区索引，文件缺失或损坏时从空索引开始。"""
+    global _partition_index_loaded
+    with _PARTITION_LOCK:
+        if _partition_index_loaded:
+            return
+        _partition_index_loaded = True
+        try:
+            with open(config.PARTITION_INDEX_PATH, "r", encoding="utf-8") as file:
+                _PARTITION_INDEX.update(json.load(file))
+        except (OSError, ValueError):
+            pass
+
+
+def _save_partition_index() -> None:
+    """将分区索引写回磁盘，供重启后的按日期窗口加载直接剪枝。"""
+    with _PARTITION_LOCK:
+        content = json.dumps(_PARTITION_INDEX, ensure_ascii=False)
+    try:
+        os.makedirs(os.path.dirname(config.PARTITION_INDEX_PATH), exist_ok=True)
+        temp_path = f"{config.PARTITION_INDEX_PATH}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temp_path, config.PARTITION_INDEX_PATH)
+    except OSError as exc:
+        LOGGER.warning("保存分区索引失败：%s", exc)
+
+
+def _partition_info(path: str) -> Dict[str, Any]:
+    """返回文件在分区索引中的行数与日期范围，未记录或文件已变化时各项为 None。"""
+    _load_partition_index()
+    stat = os.stat(path)
+    entry = _PARTITION_INDEX.get(os.path.abspath(path))
+    if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+        return {"rows": None, "start_date": None, "end_date": None}
+    return {key: entry[key] for key in ("rows", "start_date", "end_date")}
+
+
+def _record_partition(path: str, stat: os.stat_result, rows: int, dates: Optional[pd.Series]) -> None:
+    """在分区索引中记录文件的行数与订单日期范围。"""
+    start = dates.min() if dates is not None else None
+    end = dates.max() if dates is not None else None
+    with _PARTITION_LOCK:
+        _PARTITION_INDEX[os.path.abspath(path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "rows": int(rows),
+            "start_date": None if start is None or pd.isna(start) else start.strftime("%Y-%m-%d"),
+            "end_date": None if end is None or pd.isna(end) else end.strftime("%Y-%m-%d"),
+        }
+
+
+def _overlaps(info: Dict[str, Any], start_date: Optional[date], end_date: Optional[date]) -> bool:
+    """分区日期范围未知或与窗口相交时需要读取。"""
+    if info["start_date"] is None or info["end_date"] is None:
+        return True
+    if start_date is not None and pd.Timestamp(info["end_date"]) < pd.Timestamp(start_date).normalize():
+        return False
+    if end_date is not None and pd.Timestamp(info["start_date"]) > pd.Timestamp(end_date):
+        return False
+    return True
+
+
+def _concat_partitions(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """合并各分区明细；category 列先统一为各分区类别的并集，合并后仍为共享字典的 category。"""
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].columns:
+        if not all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame):
+            continue
+        categories = frames[0][col].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[col].cat.categories)
+        dtype = pd.CategoricalDtype(categories)
+        for frame in frames:
+            frame[col] = frame[col].astype(dtype)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _append_compact(base: pd.DataFrame, chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    将已紧凑化的增量明细接到紧凑 raw_df 之后。
+
+    category 列只在原字典末尾追加新类别，已有行的编码保持不变，无需对全量数据重新编码；
+    数量列在 int32 与 float32 之间不一致时统一为 float32。
+
+    :param base: 当前紧凑 raw_df，不会被修改。
+    :param chunk: 经 _compact_frame 处理后的增量明细。
+    :return: 合并后的紧凑 raw_df。
+    """
+    widened: Dict[str, pd.Series] = {}
+    for col in chunk.columns:
+        if col not in base:
+            continue
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            added = chunk[col].cat.categories.difference(base[col].cat.categories)
+            column = base[col].cat.add_categories(added) if len(added) else base[col]
+            if len(added):
+                widened[col] = column
+            chunk[col] = chunk[col].astype(column.dtype)
+        elif base[col].dtype != chunk[col].dtype:
+            dtype = "float32" if "float32" in {str(base[col].dtype), str(chunk[col].dtype)} else base[col].dtype
+            if base[col].dtype != dtype:
+                widened[col] = base[col].astype(dtype)
+            chunk[col] = chunk[col].astype(dtype)
+    if widened:
+        base = base.assign(**widened)
+    return pd.concat([base, chunk], ignore_index=True)
+
+
+def _as_float64(df: pd.DataFrame, columns: Iterable[str] = ("sales", "profit")) -> pd.DataFrame:
+    """紧凑模式下金额列为 float32，汇总前先提升为 float64，避免大量行累加时的精度漂移。"""
+    widened = {col: df[col].astype("float64") for col in columns if col in df and df[col].dtype == "float32"}
+    return df.assign(**widened) if widened else df
+
+
+def _build_orders(df: pd.DataFrame) -> pd.DataFrame:
+    """按订单汇总基础信息。"""
+    df = _as_float64(df)
+    grouped = df.groupby("order_id", observed=True).agg(
+        customer_id=("customer_id", "first"),
+        order_date=("order_date", "first"),
+        sales=("sales", "sum"),
+        profit=("profit", "sum"),
+        discount=("discount", "mean"),
+    )
+    grouped = grouped.reset_index()
+    return grouped
+
+
+def _build_customers(df: pd.DataFrame) -> pd.DataFrame:
+    """按客户汇总消费情况。"""
+    df = _as_float64(df)
+    grouped = df.groupby("customer_id", observed=True).agg(
+        order_count=("order_id", "nunique"),
+        total_sales=("sales", "sum"),
+        total_profit=("profit", "sum"),
+        first_order_date=("order_date", "min"),
+        last_order_date=("order_date", "max"),
+    )
+    return grouped.reset_index()
+
+
+def _build_products(df: pd.DataFrame) -> pd.DataFrame:
+    """按商品汇总销售指标。"""
+    df = _as_float64(df)
+    grouped = df.groupby(["product_id", "product_name"], dropna=False, observed=True).agg(
+        quantity=("quantity", "sum"),
+        sales=("sales", "sum"),
+        profit=("profit", "sum"),
+        discount=("discount", "mean"),
+    )
+    grouped = grouped.reset_index()
+    # 销售额为 0 的商品利润率记为 0
+    grouped["profit_rate"] = grouped["profit"].div(grouped["sales"].where(grouped["sales"] != 0)).fillna(0)
+    return grouped
+
+
+def _build_rfm(orders: pd.DataFrame) -> pd.DataFrame:
+    """按客户汇总订单视图，生成 RFM 特征表（R 由 _with_recency 统一计算）。"""
+    grouped = orders.groupby("customer_id", observed=True).agg(
+        last_order_date=("order_date", "max"),
+        F=("order_id", "nunique"),
+        M=("sales", "sum"),
+    )
+    return grouped.reset_index()
+
+
+def _with_recency(rfm: pd.DataFrame, latest_date: Optional[datetime]) -> pd.DataFrame:
+    """以数据集最新日期为基准，向量化刷新 R 列。"""
+    rfm = rfm.copy()
+    if latest_date is None or pd.isna(latest_date):
+        rfm["R"] = float("nan")
+    else:
+        rfm["R"] = (latest_date - rfm["last_order_date"]).dt.days
+    return rfm
+
+
+def build_rfm_features(lines: pd.DataFrame, latest_date: Optional[datetime]) -> pd.DataFrame:
+    """
+    由订单明细计算 RFM 特征，口径与快照中的 RFM 视图一致。
+
+    :param lines: 订单明细，至少包含 customer_id、order_id、order_date、sales。
+    :param latest_date: 计算 R 的基准日期，通常为数据集最新订单日期。
+    :return: 包含 customer_id、last_order_date、F、M、R 的数据框。
+    """
+    lines = lines.assign(profit=lines["profit"] if "profit" in lines else 0.0, discount=lines["discount"] if "discount" in lines else 0.0)
+    return _with_recency(_build_rfm(_build_orders(lines)), latest_date)
+
+
+def _build_snapshot_rfm(snapshot: DatasetSnapshot) -> pd.DataFrame:
+    """由订单视图构建 RFM 特征表，订单视图尚未构建时一并构建。"""
+    return _with_recency(_build_rfm(snapshot.orders), snapshot.get_latest_date())
+
+
+_VIEW_BUILDERS: Dict[str, Callable[[DatasetSnapshot], pd.DataFrame]] = {
+    "orders": lambda snapshot: _build_orders(snapshot.raw_df),
+    "customers": lambda snapshot: _build_customers(snapshot.raw_df),
+    "products": lambda snapshot: _build_products(snapshot.raw_df),
+    "rfm": _build_snapshot_rfm,
+}
+
+
+class DatasetRegistry:
+    """
+    按数据集 ID 管理多个数据仓库。
+
+    各数据集常驻内存合计超过预算时，按最近最少使用顺序将数据集换出到磁盘，
+    换出的数据集在下次 get 时以内存映射方式挂载，切换门店数据无需重新解析 CSV。
+    """
+
+    def __init__(self, default: DataRepository, budget_bytes: int, spill_dir: str) -> None:
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._repos: "OrderedDict[str, DataRepository]" = OrderedDict({config.DEFAULT_DATASET_ID: default})
+        # 按 (版本号, 已构建视图) 缓存各数据集的内存占用，视图未变化时不重复做深度统计
+        self._sizes: Dict[str, Tuple[Tuple[int, Tuple[str, ...]], int]] = {}
+        # 后台预算检查：取用数据集时若内存占用可能变化，由单个后台线程统计并按需换出
+        self._checking = False
+        self._checker: Optional[threading.Thread] = None
+
+    def __contains__(self, dataset_id: object) -> bool:
+        """数据集是否已注册，不会重新挂载已换出的数据集。"""
+        with self._lock:
+            return dataset_id in self._repos
+
+    def get(self, dataset_id: Optional[str] = None) -> DataRepository:
+        """
+        取得数据集并标记为最近使用，已换出的数据集会先重新挂载。
+
+        注意返回后其它线程仍可能将其换出，需要读取数据时应使用 snapshot。
+
+        :param dataset_id: 数据集 ID，None 时为默认数据集。
+        :return: 数据仓库。
+        """
+        dataset_id = dataset_id or config.DEFAULT_DATASET_ID
+        repo, _ = self._acquire(dataset_id)
+        return repo
+
+    def snapshot(self, dataset_id: Optional[str] = None) -> DatasetSnapshot:
+        """
+        取得数据集当前快照并标记为最近使用。
+
+        取得的快照不为空时直接返回，不加任何全局锁；只有数据集已换出时才在换出锁内重新挂载，
+        不会取到被并发换出后的空快照。换出只替换数据仓库持有的引用，调用方持有的快照在整个请求期间始终有效。
+
+        :param dataset_id: 数据集 ID，None 时为默认数据集。
+        :return: 数据快照，数据集尚未加载时 raw_df 为 None。
+        """
+        dataset_id = dataset_id or config.DEFAULT_DATASET_ID
+        _, snapshot = self._acquire(dataset_id)
+        return snapshot
+
+    def _acquire(self, dataset_id: str) -> Tuple[DataRepository, DatasetSnapshot]:
+        with self._lock:
+            repo = self._repos.get(dataset_id)
+            if repo is None:
+                raise KeyError(dataset_id)
+            self._repos.move_to_end(dataset_id)
+        snapshot = repo.snapshot()
+        if snapshot.raw_df is None and repo.spilled:
+            with self._evict_lock:
+                if repo.spilled:
+                    repo.reload_spilled()
+                    self._sizes.pop(dataset_id, None)
+                snapshot = repo.snapshot()
+        self._schedule_check(dataset_id, snapshot)
+        return repo, snapshot
+
+    def _schedule_check(self, dataset_id: str, snapshot: DatasetSnapshot) -> None:
+        """
+        派生视图按需构建会让常驻内存逐渐增长：快照版本或已构建视图与上次统计不同时，在后台线程中检查预算。
+
+        深度统计与落盘都在后台完成，请求线程只做一次字典比较；同一时间最多一个后台检查。
+        """
+        if self.budget_bytes <= 0 or snapshot.raw_df is None:
+            return
+        cached = self._sizes.get(dataset_id)
+        if cached is not None and cached[0] == (snapshot.version, tuple(snapshot.views())):
+            return
+        with self._lock:
+            if self._checking:
+                return
+            self._checking = True
+        self._checker = threading.Thread(target=self._background_check, args=(dataset_id,), name="dataset-budget", daemon=True)
+        self._checker.start()
+
+    def _background_check(self, keep: str) -> None:
+        try:
+            self.enforce_budget(keep=keep)
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.error("后台检查数据集内存预算失败：%s", exc)
+        finally:
+            with self._lock:
+                self._checking = False
+
+    def get_or_create(self, dataset_id: Optional[str] = None) -> DataRepository:
+        """取得数据集，不存在时创建空数据仓库，用于加载新数据集。"""
+        dataset_id = dataset_id or config.DEFAULT_DATASET_ID
+        with self._lock:
+            if dataset_id not in self._repos:
+                self._repos[dataset_id] = DataRepository()
+        return self.get(dataset_id)
+
+    def enforce_budget(self, keep: Optional[str] = None) -> List[str]:
+        """
+        常驻内存超出预算时，从最久未用的数据集开始换出，直到回到预算以内。
+
+        :param keep: 本次正在使用、不应被换出的数据集 ID。
+        :return: 被换出的数据集 ID 列表。
+        """
+        if self.budget_bytes <= 0:
+            return []
+        with self._evict_lock:
+            with self._lock:
+                items = list(self._repos.items())
+            sizes = {dataset_id: self._resident_bytes(dataset_id, repo) for dataset_id, repo in items}
+            total = sum(sizes.values())
+            evicted: List[str] = []
+            for dataset_id, repo in items:
+                if total <= self.budget_bytes:
+                    break
+                # 共享内存模式下默认数据集由各 worker 挂载同一份映射文件，不参与换出
+                pinned = dataset_id == config.DEFAULT_DATASET_ID and config.SHARED_MEMORY_ENABLED
+                if dataset_id == keep or pinned or not sizes[dataset_id]:
+                    continue
+                if repo.spill(os.path.join(self.spill_dir, dataset_id)):
+                    # 重新挂载后版本号不变，但列改为内存映射，占用需重新统计
+                    self._sizes.pop(dataset_id, None)
+                    total -= sizes[dataset_id]
+                    evicted.append(dataset_id)
+        if evicted:
+            LOGGER.info("数据集常驻内存超出预算，已换出：%s", "、".join(evicted))
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各数据集的常驻状态、内存占用与预算，按最近使用排序。"""
+        with self._lock:
+            items = list(self._repos.items())
+        datasets = []
+        for dataset_id, repo in reversed(items):
+            snapshot = repo.snapshot()
+            datasets.append({
+                "dataset_id": dataset_id,
+                "resident": snapshot.raw_df is not None,
+                "spilled": repo.spilled,
+                "bytes": self._resident_bytes(dataset_id, repo),
+                "records": int(len(snapshot.raw_df)) if snapshot.raw_df is not None else 0,
+                "version": snapshot.version,
+                "source_path": snapshot.source_path,
+            })
         return {
-            "records": int(len(self.raw_df)),
-            "orders": int(self.orders.shape[0]) if self.orders is not None else 0,
-            "customers": int(self.customers.shape[0]) if self.customers is not None else 0,
-            "products": int(self.products.shape[0]) if self.products is not None else 0,
-            "start_date": earliest.strftime("%Y-%m-%d") if earliest is not None else None,
-            "end_date": latest_date.strftime("%Y-%m-%d") if latest_date is not None else None,
-            "source_path": self.source_path,
+            "budget_bytes": self.budget_bytes,
+            "resident_bytes": sum(item["bytes"] for item in datasets),
+            "datasets": datasets,
         }
 
+    def _resident_bytes(self, dataset_id: str, repo: DataRepository) -> int:
+        snapshot = repo.snapshot()
+        if snapshot.raw_df is None:
+            return 0
+        key = (snapshot.version, tuple(snapshot.views()))
+        cached = self._sizes.get(dataset_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        size = snapshot.resident_bytes()
+        self._sizes[dataset_id] = (key, size)
+        return size
+
 
 data_repo = DataRepository()
+datasets = DatasetRegistry(data_repo, config.DATASET_MEMORY_BUDGET_MB * 1024 * 1024, config.DATASET_SPILL_DIR)
@@ -1,42 +1,182 @@
 """FastAPI 版后端入口，提供前后端分离接口。"""
+import hmac
+import itertools
 import os
+import threading
+import time
 from contextlib import asynccontextmanager
-from io import StringIO
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+# 记录模块导入起点，用于启动耗时报告
+_IMPORT_STARTED = time.perf_counter()
+
+import pandas as pd
+
+import anyio
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 from backend import config
-from backend.api_models import (AssociationRule, ClusterRequest, ExportRequest,
-                                ForecastRequest, LoadRequest,
-                                MiniMaxTTSRequest, PromotionAnalyzeRequest,
-                                PromotionRule, RecommendRequest)
-from backend.data_loader import data_repo
-from backend.modules import clustering, forecast, promotion, recommender
+from backend.api_models import (PAGE_FIELDS, AssociationRule,
+                                ClusterAssignRequest, ClusterRequest,
+                                EventBatch, ExportRequest, ForecastRequest,
+                                LoadRequest, MiniMaxTTSRequest, PageOptions,
+                                PromotionAnalyzeRequest, PromotionRule,
+                                RecommendRequest, SimilarCustomersRequest)
+from backend.data_loader import DataRepository, DatasetSnapshot, data_repo, datasets
+from backend.modules import (clustering, forecast, promotion, realtime,
+                             recommender, similarity)
+from backend.modules import tts as tts_module
 from backend.modules.tts import query_minimax_task, speak, submit_minimax_task
-from backend.utils.logger import LOGGER, ensure_dirs
+from backend.utils import exporter, importing, memory, metrics, profiler
+from backend.utils.admission import AdmissionController, AdmissionRejected
+from backend.utils.logger import LOGGER, ensure_dirs, logger_stats
+from backend.utils.response import (FastJSONResponse, etag_matches, frame_payload,
+                                    frame_to_json, make_etag)
+from backend.utils.result_store import ResultStore
+from backend.utils.singleflight import SingleFlight
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+_startup: Dict[str, float] = {"import_seconds": round(_IMPORT_SECONDS, 4)}
+# 后台启动流程的进度：starting → loading → warming → ready；默认数据加载失败时为 degraded
+_readiness: Dict[str, Any] = {"status": "starting", "data_loaded": False, "warmed": {}}
+# 后台加载与请求触发的按需加载共用，避免同时解析两次默认 CSV
+_auto_load_lock = threading.Lock()
+
+# 相同数据版本、接口与参数的并发请求只计算一次，其余请求等待并共享结果
+_single_flight = SingleFlight()
+# 最近的分析结果，导出时可按结果 ID 直接复用
+_results = ResultStore(config.RESULT_CACHE_SIZE)
+_DATASET_QUERY = Query(None, pattern=r"^[A-Za-z0-9_-]{1,64}$", description="数据集 ID，不填使用默认数据集")
+# 计算密集型接口的并发上限与排队控制，轻量接口不经过闸门
+_admission = AdmissionController(config.ADMISSION_LIMITS)
+
 
 def _try_auto_load_default() -> bool:
-    """尝试自动加载默认 CSV，返回是否成功。"""
-    if data_repo.raw_df is not None:
+    """尝试自动加载默认 CSV，返回是否成功；后台加载进行中时等待其完成而不重复解析。"""
+    # 已被换出的数据集由注册表重新挂载，无需重新解析 CSV
+    if data_repo.raw_df is not None or data_repo.spilled:
         return True
-    if not os.path.exists(config.DEFAULT_CSV):
-        return False
+    with _auto_load_lock:
+        if data_repo.raw_df is not None:
+            return True
+        if config.SHARED_MEMORY_ENABLED and data_repo.sync_shared():
+            return True
+        if not os.path.exists(config.DEFAULT_CSV):
+            return False
+        try:
+            data_repo.load_csv(config.DEFAULT_CSV)
+            _publish_if_shared()
+            LOGGER.info("已自动加载默认数据文件：%s", config.DEFAULT_CSV)
+            return True
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("自动加载默认数据失败：%s", exc)
+            return False
+
+
+def _background_startup() -> None:
+    """后台加载默认数据并按配置预热常用计算，完成后将就绪状态置为 ready。"""
+    _readiness["status"] = "loading"
+    loaded = _try_auto_load_default()
+    _readiness["data_loaded"] = loaded
+    _startup["ready_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 4)
+    if not loaded:
+        # 没有可用数据时不报告就绪，数据加载或上传成功后 /api/ready 自动转为就绪
+        _readiness["status"] = "degraded"
+        LOGGER.warning("默认数据未能加载，/api/ready 报告未就绪，等待上传或加载数据。")
+        return
+    if config.STARTUP_WARMUP:
+        _readiness["status"] = "warming"
+        _warm_up(data_repo.snapshot())
+        _startup["ready_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 4)
+    _readiness["status"] = "ready"
+    LOGGER.info("后端就绪：模块导入 %.2f 秒，就绪共 %.2f 秒。", _startup["import_seconds"], _startup["ready_seconds"])
+
+
+def _warm_up(snapshot: DatasetSnapshot) -> None:
+    """预先计算默认参数下的预测、聚类、共现矩阵、购物篮矩阵与促销筛选索引，写入各模块的按版本缓存。"""
+    tasks: Dict[str, Callable[[], Any]] = {
+        "forecast": lambda: forecast.forecast_report(snapshot, config.DEFAULT_FORECAST_MONTHS),
+        "clustering": lambda: clustering.fit_cluster_model(snapshot, config.DEFAULT_CLUSTER_K),
+        "co_occurrence": lambda: recommender.get_co_occurrence(snapshot),
+        "basket": lambda: promotion.get_basket_matrix(snapshot),
+        "promotion_index": lambda: promotion.get_promotion_index(snapshot),
+    }
+    for name in config.STARTUP_WARMUP_TASKS:
+        start = time.perf_counter()
+        try:
+            with metrics.stage(f"warmup.{name}"):
+                tasks[name]()
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("预热 %s 失败：%s", name, exc)
+            continue
+        _readiness["warmed"][name] = round(time.perf_counter() - start, 4)
+
+
+def _publish_if_shared() -> None:
+    """启用多 worker 共享时，将刚加载的数据发布给其它 worker。"""
+    if not config.SHARED_MEMORY_ENABLED:
+        return
     try:
-        data_repo.load_csv(config.DEFAULT_CSV)
-        LOGGER.info("已自动加载默认数据文件：%s", config.DEFAULT_CSV)
-        return True
+        data_repo.publish_shared()
     except Exception as exc:  # noqa: BLE001
-        LOGGER.warning("自动加载默认数据失败：%s", exc)
-        return False
+        LOGGER.warning("发布共享数据集失败，其它 worker 将继续使用旧版本：%s", exc)
+
+
+def _ensure_data_loaded(dataset_id: Optional[str] = None) -> DatasetSnapshot:
+    """校验数据是否已加载，并返回本次请求全程使用的数据快照；指定 dataset_id 时取注册表中的对应数据集。"""
+    if dataset_id and dataset_id != config.DEFAULT_DATASET_ID:
+        snapshot = _get_snapshot(dataset_id)
+        if snapshot.raw_df is None:
+            raise HTTPException(status_code=400, detail=f"数据集 {dataset_id} 尚未加载数据")
+        return snapshot
+    if config.SHARED_MEMORY_ENABLED:
+        data_repo.sync_shared()
+    # 默认数据集同样参与 LRU，被换出后在此重新挂载
+    snapshot = _get_snapshot(config.DEFAULT_DATASET_ID)
+    if snapshot.raw_df is None:
+        if not _try_auto_load_default():
+            raise HTTPException(status_code=400, detail="请先在数据管理中上传或加载销售 CSV 文件")
+        snapshot = _get_snapshot(config.DEFAULT_DATASET_ID)
+    return snapshot
+
+
+def _get_dataset(dataset_id: Optional[str]) -> DataRepository:
+    """取得注册表中的数据集，不存在时返回 404。"""
+    try:
+        return datasets.get(dataset_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"未找到数据集：{dataset_id}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+def _get_snapshot(dataset_id: Optional[str]) -> DatasetSnapshot:
+    """取得注册表中数据集的当前快照，不存在时返回 404。"""
+    try:
+        return datasets.snapshot(dataset_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"未找到数据集：{dataset_id}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
-def _ensure_data_loaded() -> None:
-    """校验数据是否已加载。"""
-    if data_repo.raw_df is None and not _try_auto_load_default():
-        raise HTTPException(status_code=400, detail="请先在数据管理中上传或加载销售 CSV 文件")
+def _get_aggregator(dataset_id: Optional[str]) -> realtime.RealtimeAggregator:
+    """取得已注册数据集的实时汇总器，数据集不存在时返回 404。"""
+    try:
+        return realtime.get_aggregator(dataset_id, datasets)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"未找到数据集：{dataset_id}") from exc
+
+
+def _after_load(dataset_id: Optional[str]) -> None:
+    """数据集加载或追加后：默认数据集按需发布共享，并检查各数据集的内存预算。"""
+    dataset_id = dataset_id or config.DEFAULT_DATASET_ID
+    if dataset_id == config.DEFAULT_DATASET_ID:
+        _publish_if_shared()
+    datasets.enforce_budget(keep=dataset_id)
 
 
 @asynccontextmanager
@@ -44,11 +184,82 @@ async def lifespan(app: FastAPI) -> None:
     """应用生命周期管理。"""
     ensure_dirs()
     os.makedirs(config.DATA_DIR, exist_ok=True)
-    _try_auto_load_default()
+    # 线程池容量 = 受限接口并发之和 + 预留线程；受限接口被准入控制封顶，预留部分始终可供轻量接口使用
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = _admission.total_concurrency() + config.READ_LANE_THREADS
+    LOGGER.info("线程池容量 %s（受限接口 %s + 预留 %s）。", limiter.total_tokens, _admission.total_concurrency(), config.READ_LANE_THREADS)
+    # 数据加载与预热放到后台线程，服务立即开始接收请求；流量调度应以 /api/ready 为准
+    threading.Thread(target=_background_startup, name="startup-loader", daemon=True).start()
     yield
 
 
 app = FastAPI(title="超市AI营销系统", description="提供营销分析 API，配合 Vue 前端使用", lifespan=lifespan)
+# 接口函数外包剖析钩子，仅带有效 X-Profile 请求头的请求才会启用
+app.router.route_class = profiler.ProfilingRoute
+
+
+# 中间件按定义的逆序包裹：后添加的在外层。由内到外依次为准入控制、请求剖析、请求指标、gzip、CORS，
+# 使被拒绝与被剖析的请求都计入指标，且 429/503 等所有响应都带上 CORS 头
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """对计算密集型接口执行准入控制，超出队列或排队超时时返回 429/503 与 Retry-After；名额在响应体发送完毕后归还。"""
+    limiter = _admission.get(request.method, request.url.path)
+    if limiter is None:
+        return await call_next(request)
+    try:
+        await limiter.acquire()
+    except AdmissionRejected as exc:
+        LOGGER.warning("接口 %s 拒绝请求：%s", request.url.path, exc.detail)
+        # 被拒绝的请求未经过路由匹配，指标中按其路径计入
+        request.scope["admission_path"] = request.url.path
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.detail},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    try:
+        response = await call_next(request)
+    except BaseException:
+        limiter.release()
+        raise
+    response.body_iterator = limiter.release_after(response.body_iterator)
+    return response
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """请求头 X-Profile 与 PROFILE_TOKEN 一致时剖析该请求，结果 ID 通过 X-Profile-Id 响应头返回。"""
+    if not _profile_token_valid(request):
+        return await call_next(request)
+    if request.url.path.startswith("/api/debug/"):
+        return await call_next(request)
+    session = profiler.ProfileSession(f"{request.method} {request.url.path}")
+    token = profiler.activate(session)
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.deactivate(token)
+        await anyio.to_thread.run_sync(session.save)
+    response.headers["X-Profile-Id"] = session.profile_id
+    return response
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """记录各接口耗时与状态码，按路由模板聚合；位于剖析与准入控制之外，被拒绝的请求按其路径计入。"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or request.scope.get("admission_path") or "unmatched"
+        metrics.observe_request(request.method, path, status, time.perf_counter() - start)
+
+
+app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MIN_SIZE, exclude_content_types=config.GZIP_EXCLUDED_TYPES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config.ALLOWED_ORIGINS,
@@ -57,56 +268,263 @@ app.add_middleware(
 )
 
 
+def _profile_token_valid(request: Request) -> bool:
+    """校验请求头 X-Profile 是否与 PROFILE_TOKEN 一致，使用定长时间比较以免按响应耗时逐字节猜出令牌。"""
+    if not config.PROFILE_TOKEN:
+        return False
+    supplied = request.headers.get("x-profile", "")
+    return hmac.compare_digest(supplied.encode("utf-8"), config.PROFILE_TOKEN.encode("utf-8"))
+
+
+def _require_profile_token(request: Request) -> None:
+    """剖析管理接口与剖析请求使用同一令牌校验。"""
+    if not _profile_token_valid(request):
+        raise HTTPException(status_code=403, detail="未开启请求剖析或令牌无效")
+
+
+@app.get("/api/debug/imports")
+def import_report(request: Request, cold: bool = False) -> Dict[str, Any]:
+    """
+    启动耗时报告：本进程的导入与就绪耗时、各延迟依赖的首次导入耗时；
+    cold=true 时另起子进程以 -X importtime 冷导入 backend.main 并按模块分解耗时，需携带剖析令牌。
+    """
+    report: Dict[str, Any] = {"startup": dict(_startup), **importing.runtime_report()}
+    if cold:
+        # 每次冷导入都会启动新的解释器进程，不能对未授权请求开放
+        _require_profile_token(request)
+        try:
+            report["cold_import"] = importing.cold_import_report()
+        except ValueError as exc:
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return report
+
+
+@app.get("/api/debug/memory")
+def memory_report(
+    request: Request,
+    trace: Optional[str] = None,
+    top: int = 20,
+    group_by: str = "lineno",
+    frames: int = 1,
+    rebase: bool = False,
+) -> Dict[str, Any]:
+    """
+    内存诊断：进程常驻内存、各数据视图与各缓存的深度内存占用。
+
+    trace=start 开启 tracemalloc 并记录基准快照，trace=diff 返回相对基准增长最多的分配位置，
+    trace=stop 停止追踪。深度统计会遍历全部视图与缓存、tracemalloc 会拖慢整个进程，均需携带剖析令牌。
+    """
+    _require_profile_token(request)
+    if trace is not None:
+        try:
+            if trace == "start":
+                return {"tracemalloc": memory.trace_start(frames)}
+            if trace == "diff":
+                return {"tracemalloc": memory.trace_diff(top, group_by, rebase)}
+            if trace == "stop":
+                return {"tracemalloc": memory.trace_stop()}
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        raise HTTPException(status_code=400, detail="trace 仅支持 start、diff 或 stop。")
+    snapshot = data_repo.snapshot()
+    views = snapshot.memory_report()
+    caches = memory.cache_report()
+    return {
+        "process": memory.process_report(),
+        "dataset_version": snapshot.version,
+        "views": views,
+        "caches": caches,
+        "largest": memory.summarize(views, caches),
+        "datasets": datasets.stats(),
+        "tracemalloc": memory.trace_status(),
+    }
+
+
+@app.get("/api/debug/profiles")
+def list_profiles(request: Request) -> Dict[str, Any]:
+    """列出已保存的请求剖析结果。"""
+    _require_profile_token(request)
+    return {"profiles": profiler.list_profiles()}
+
+
+@app.get("/api/debug/profiles/{profile_id}", response_class=PlainTextResponse)
+def profile_summary(request: Request, profile_id: str, limit: int = 30, sort_by: str = "cumulative") -> PlainTextResponse:
+    """输出指定剖析结果中耗时最多的函数。"""
+    _require_profile_token(request)
+    try:
+        return PlainTextResponse(profiler.summarize(profile_id, limit, sort_by))
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+def _register_gauges() -> None:
+    """注册缓存与排队相关的仪表盘指标，仅在抓取 /api/metrics 时取值。"""
+    metrics.register_gauge("dataset_version", "当前数据快照版本号", lambda: {(): data_repo.version})
+    metrics.register_gauge(
+        "dataset_rows", "当前数据快照各视图行数",
+        lambda: {(("view", name),): len(df) for name, df in data_repo.snapshot().views().items() if df is not None},
+    )
+    metrics.register_gauge(
+        "log_queue", "异步日志队列积压与丢弃条数",
+        lambda: {(("kind", name),): value for name, value in logger_stats().items()},
+    )
+    metrics.register_gauge("result_cache_entries", "分析结果缓存条目数", lambda: {(): _results.stats()["entries"]})
+    metrics.register_gauge(
+        "model_cache_entries", "模型与索引缓存条目数",
+        lambda: {
+            (("cache", "cluster_model"),): len(clustering._CLUSTER_MODEL_CACHE),
+            (("cache", "similarity_index"),): len(similarity._INDEX_CACHE),
+        },
+    )
+    metrics.register_gauge(
+        "singleflight_in_flight", "正在执行的合并计算数",
+        lambda: {(("endpoint", name),): counter["in_flight"] for name, counter in _single_flight.stats().items()},
+    )
+    for field in ("active", "waiting", "rejected", "timed_out"):
+        metrics.register_gauge(
+            f"admission_{field}", f"准入控制 {field} 统计",
+            lambda field=field: {(("path", path),): stat[field] for path, stat in _admission.stats().items()},
+        )
+
+
+_register_gauges()
+
+
+def _register_memory_caches() -> None:
+    """登记 /api/debug/memory 需要统计的缓存。"""
+    memory.register_cache("co_occurrence", lambda: recommender._CO_OCCURRENCE_CACHE)
+    memory.register_cache("basket_matrix", lambda: promotion._BASKET_CACHE)
+    memory.register_cache("promotion_index", lambda: promotion._SCREEN_CACHE)
+    memory.register_cache("forecast", lambda: forecast._FORECAST_CACHE)
+    memory.register_cache("cluster_model", lambda: clustering._CLUSTER_MODEL_CACHE)
+    memory.register_cache("similarity_index", lambda: similarity._INDEX_CACHE)
+    memory.register_cache("results", _results.frames)
+    memory.register_cache("realtime_windows", lambda: realtime._AGGREGATORS)
+    memory.register_cache("tts_tasks", lambda: tts_module._MINIMAX_TASK_CACHE)
+    memory.register_cache("tts_audio_index", lambda: tts_module._AUDIO_CACHE._index)
+
+
+_register_memory_caches()
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """以 Prometheus 文本格式输出接口耗时直方图、分阶段耗时与缓存/排队指标。"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/api/health")
 def health() -> Dict[str, str]:
-    """健康检查。"""
+    """健康检查，仅表示进程存活。"""
     return {"status": "ok"}
 
 
+@app.get("/api/ready")
+def ready() -> JSONResponse:
+    """就绪检查：默认数据加载与预热完成前返回 503，完成后返回 200；默认数据加载失败时返回 503 与 degraded。"""
+    if _readiness["status"] == "degraded" and (data_repo.raw_df is not None or data_repo.spilled):
+        _readiness.update(status="ready", data_loaded=True)
+    body = {**_readiness, "warmed": dict(_readiness["warmed"]), "startup": dict(_startup)}
+    return JSONResponse(status_code=200 if _readiness["status"] == "ready" else 503, content=body)
+
+
+@app.get("/api/stats/coalescing")
+def coalescing_stats() -> Dict[str, Any]:
+    """返回各分析接口的请求合并统计。"""
+    return {"endpoints": _single_flight.stats()}
+
+
+@app.get("/api/stats/admission")
+def admission_stats() -> Dict[str, Any]:
+    """返回各受限接口的并发、排队与拒绝统计。"""
+    return {"endpoints": _admission.stats()}
+
+
+@app.get("/api/datasets")
+def list_datasets() -> Dict[str, Any]:
+    """列出已注册的数据集及其常驻状态、内存占用与内存预算。"""
+    return datasets.stats()
+
+
 @app.post("/api/data/load")
 def load_data(req: LoadRequest) -> Dict[str, Any]:
-    """从指定路径读取 CSV。"""
+    """从指定文件、目录或通配符读取 CSV，可按日期窗口只读取相关分区；指定 dataset_id 时加载到对应数据集（不存在则新建）。"""
     path = req.path or config.DEFAULT_CSV
-    if not os.path.exists(path):
-        raise HTTPException(status_code=404, detail=f"未找到数据文件：{path}")
+    repo = datasets.get_or_create(req.dataset_id)
     try:
-        data_repo.load_csv(path)
+        repo.load_csv(path, req.compact, req.start_date, req.end_date)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=f"未找到数据文件：{path}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("读取数据失败：%s", exc)
         raise HTTPException(status_code=400, detail="数据加载失败，请检查文件格式与编码") from exc
-    return {"message": "加载完成", "overview": data_repo.overview()}
+    _after_load(req.dataset_id)
+    return {"message": "加载完成", "dataset_id": req.dataset_id or config.DEFAULT_DATASET_ID, "overview": repo.overview()}
 
 
+# 上传与追加涉及 CSV 解析、视图重建、共享发布与内存预算检查，定义为同步接口在线程池中执行，不阻塞事件循环
 @app.post("/api/data/upload")
-async def upload_data(file: UploadFile = File(...)) -> Dict[str, Any]:
+def upload_data(file: UploadFile = File(...), dataset_id: Optional[str] = _DATASET_QUERY) -> Dict[str, Any]:
     """上传 CSV 文件并立即加载。"""
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="仅支持上传 CSV 文件")
     os.makedirs(config.DATA_DIR, exist_ok=True)
     target_path = os.path.join(config.DATA_DIR, file.filename)
-    content = await file.read()
+    content = file.file.read()
     with open(target_path, "wb") as f:
         f.write(content)
+    repo = datasets.get_or_create(dataset_id)
     try:
-        data_repo.load_csv(target_path)
+        repo.load_csv(target_path)
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("上传后解析失败：%s", exc)
         raise HTTPException(status_code=400, detail="上传文件格式异常，请确认列名与编码") from exc
-    return {"message": "上传并加载成功", "overview": data_repo.overview()}
+    _after_load(dataset_id)
+    return {"message": "上传并加载成功", "dataset_id": dataset_id or config.DEFAULT_DATASET_ID, "overview": repo.overview()}
+
+
+@app.post("/api/data/append")
+def append_data(file: UploadFile = File(...), dataset_id: Optional[str] = _DATASET_QUERY) -> Dict[str, Any]:
+    """上传增量 CSV，追加到当前数据集并增量刷新视图。"""
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="仅支持上传 CSV 文件")
+    _ensure_data_loaded(dataset_id)
+    repo = _get_dataset(dataset_id)
+    try:
+        appended = repo.append_csv(file.file)
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("追加数据失败：%s", exc)
+        raise HTTPException(status_code=400, detail="增量文件格式异常，请确认列名与编码") from exc
+    _after_load(dataset_id)
+    return {"message": "追加完成", "appended": appended, "overview": repo.overview()}
 
 
 @app.get("/api/data/overview")
-def overview() -> Dict[str, Any]:
+def overview(dataset_id: Optional[str] = _DATASET_QUERY) -> Dict[str, Any]:
     """返回当前数据集的统计信息。"""
-    _ensure_data_loaded()
-    return data_repo.overview()
+    snapshot = _ensure_data_loaded(dataset_id)
+    return snapshot.overview()
+
+
+@app.get("/api/data/memory")
+def data_memory(dataset_id: Optional[str] = _DATASET_QUERY) -> Dict[str, Any]:
+    """返回各数据视图的内存占用报告。"""
+    snapshot = _ensure_data_loaded(dataset_id)
+    return {"compact": snapshot.compact, "views": snapshot.memory_report()}
 
 
 @app.post("/api/recommend")
 def recommend(req: RecommendRequest) -> Dict[str, List[Dict[str, Any]]]:
     """客户个性化推荐。"""
-    _ensure_data_loaded()
-    rec = recommender.Recommender(data_repo)
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    return _single_flight.do(snapshot.version, "recommend", req.dict(), lambda: _run_recommend(snapshot, req))
+
+
+def _run_recommend(snapshot: DatasetSnapshot, req: RecommendRequest) -> Dict[str, List[Dict[str, Any]]]:
+    """执行推荐计算。"""
+    rec = recommender.Recommender(snapshot)
     try:
         df = rec.recommend(req.customer_id, req.top_n)
     except Exception as exc:  # noqa: BLE001
@@ -116,21 +534,60 @@ def recommend(req: RecommendRequest) -> Dict[str, List[Dict[str, Any]]]:
 
 
 @app.post("/api/promotion")
-def promotion_candidates(rule: PromotionRule) -> Dict[str, Any]:
+def promotion_candidates(rule: PromotionRule) -> FastJSONResponse:
     """促销候选筛选。"""
-    _ensure_data_loaded()
-    metrics = promotion.calc_product_metrics(data_repo)
-    result = promotion.select_promotion_candidates(metrics, rule.dict())
-    return {"items": result.to_dict(orient="records"), "total": int(len(result))}
+    return _promotion_response(_ensure_data_loaded(rule.dataset_id), rule)
+
+
+@app.get("/api/promotion")
+def promotion_candidates_cached(request: Request, rule: PromotionRule = Depends()) -> Response:
+    """促销候选筛选的可缓存 GET 版本，支持 ETag 条件请求。"""
+    snapshot = _ensure_data_loaded(rule.dataset_id)
+    return _conditional(request, snapshot, "promotion", rule.dict(), lambda: _promotion_response(snapshot, rule))
+
+
+def _promotion_response(snapshot: DatasetSnapshot, rule: PromotionRule) -> FastJSONResponse:
+    """计算促销候选并组装分页响应，附带品类与子品类的分面计数。"""
+    params = rule.dict(exclude=PAGE_FIELDS)
+    result, facets = _single_flight.do(snapshot.version, "promotion", params, lambda: _run_promotion(snapshot, params))
+    payload = _paged(result, rule, "items")
+    payload["facets"] = facets
+    payload["result_id"] = _results.put(snapshot.version, "promotion", params, result)
+    return FastJSONResponse(payload)
+
+
+def _run_promotion(snapshot: DatasetSnapshot, params: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Dict[str, int]]]:
+    """使用按版本缓存的排序索引执行促销候选筛选。"""
+    return promotion.screen_promotion_candidates(snapshot, params)
 
 
 @app.post("/api/promotion/analyze")
-def promotion_analyze(req: PromotionAnalyzeRequest) -> Dict[str, Any]:
+def promotion_analyze(req: PromotionAnalyzeRequest) -> FastJSONResponse:
     """使用 Apriori 进行购物篮关联分析。"""
-    _ensure_data_loaded()
+    return _promotion_analyze_response(_ensure_data_loaded(req.dataset_id), req)
+
+
+@app.get("/api/promotion/analyze")
+def promotion_analyze_cached(request: Request, req: PromotionAnalyzeRequest = Depends()) -> Response:
+    """关联规则挖掘的可缓存 GET 版本，支持 ETag 条件请求。"""
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    return _conditional(request, snapshot, "promotion_analyze", req.dict(), lambda: _promotion_analyze_response(snapshot, req))
+
+
+def _promotion_analyze_response(snapshot: DatasetSnapshot, req: PromotionAnalyzeRequest) -> FastJSONResponse:
+    """挖掘关联规则并组装分页响应。"""
+    params = req.dict(exclude=PAGE_FIELDS)
+    result = _single_flight.do(snapshot.version, "promotion_analyze", params, lambda: _run_promotion_analyze(snapshot, req))
+    payload = _paged(result, req, "items")
+    payload["result_id"] = _results.put(snapshot.version, "association_rules", params, result)
+    return FastJSONResponse(payload)
+
+
+def _run_promotion_analyze(snapshot: DatasetSnapshot, req: PromotionAnalyzeRequest) -> pd.DataFrame:
+    """执行关联规则挖掘。"""
     try:
         rules: List[AssociationRule] = promotion.mine_association_rules(
-            data_repo,
+            snapshot,
             min_support=req.min_support,
             min_confidence=req.min_confidence,
             metric=req.metric,
@@ -138,70 +595,188 @@ def promotion_analyze(req: PromotionAnalyzeRequest) -> Dict[str, Any]:
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("关联规则挖掘失败：%s", exc)
         raise HTTPException(status_code=400, detail="关联规则挖掘失败，请调整参数后重试") from exc
-    return {"items": [rule.dict() for rule in rules], "total": len(rules)}
+    return pd.DataFrame([rule.dict() for rule in rules], columns=list(AssociationRule.__fields__))
 
 
 @app.post("/api/forecast")
-def forecast_sales(req: ForecastRequest) -> Dict[str, Any]:
+def forecast_sales(req: ForecastRequest) -> FastJSONResponse:
     """销售额与利润预测。"""
-    _ensure_data_loaded()
-    ts_df = forecast.build_sales_timeseries(data_repo)
-    history, predict_df, model_info = forecast.train_and_predict_sales(ts_df, req.months)
-    summary = forecast.summarize_forecast(predict_df, model_info)
-    long_term = forecast.evaluate_long_horizon(history, 12)
-    return {
-        "history": history.to_dict(orient="records"),
-        "forecast": predict_df.to_dict(orient="records"),
-        "summary": summary,
-        "model": model_info,
-        "long_term": long_term,
-    }
+    return _forecast_response(_ensure_data_loaded(req.dataset_id), req)
+
+
+@app.get("/api/forecast")
+def forecast_sales_cached(request: Request, req: ForecastRequest = Depends()) -> Response:
+    """销售预测的可缓存 GET 版本，支持 ETag 条件请求。"""
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    return _conditional(request, snapshot, "forecast", req.dict(), lambda: _forecast_response(snapshot, req))
+
+
+def _forecast_response(snapshot: DatasetSnapshot, req: ForecastRequest) -> FastJSONResponse:
+    """执行销售预测并组装响应。"""
+    params = {"months": req.months}
+    result = _single_flight.do(snapshot.version, "forecast", params, lambda: _run_forecast(snapshot, req.months))
+    return FastJSONResponse({
+        **result,
+        "history": frame_to_json(result["history"], req.layout),
+        **_paged(result["forecast"], req, "forecast"),
+        "result_id": _results.put(snapshot.version, "forecast", params, result["forecast"]),
+    })
+
+
+def _run_forecast(snapshot: DatasetSnapshot, months: int) -> Dict[str, Any]:
+    """执行销售预测，返回历史与预测数据框及说明。"""
+    return forecast.forecast_report(snapshot, months)
 
 
 @app.post("/api/clustering")
-def cluster(req: ClusterRequest) -> Dict[str, Any]:
+def cluster(req: ClusterRequest) -> FastJSONResponse:
     """客户聚类分析。"""
-    _ensure_data_loaded()
-    rfm_df = clustering.calc_rfm(data_repo)
-    cluster_df, _ = clustering.kmeans_cluster(rfm_df, req.k)
-    summary = clustering.explain_clusters(cluster_df)
-    return {
-        "clusters": cluster_df.to_dict(orient="records"),
-        "summary": summary.to_dict(orient="records"),
-    }
+    return _cluster_response(_ensure_data_loaded(req.dataset_id), req)
+
+
+@app.get("/api/clustering")
+def cluster_cached(request: Request, req: ClusterRequest = Depends()) -> Response:
+    """客户聚类的可缓存 GET 版本，支持 ETag 条件请求。"""
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    # 模型可跨追加沿用并被显式重新训练，ETag 需带上模型训练所用的数据版本，重新训练须在计算 ETag 之前完成
+    if req.refit:
+        clustering.fit_cluster_model(snapshot, req.k, refit=True)
+    params = {**req.dict(), "model_version": clustering.model_version(snapshot, req.k)}
+    return _conditional(request, snapshot, "clustering", params, lambda: _cluster_response(snapshot, req))
+
+
+def _cluster_response(snapshot: DatasetSnapshot, req: ClusterRequest) -> FastJSONResponse:
+    """执行聚类并组装分页响应。"""
+    params = {"k": req.k, "refit": req.refit}
+    cluster_df, summary = _single_flight.do(
+        snapshot.version, "clustering", params, lambda: clustering.current_clusters(snapshot, req.k, req.refit),
+    )
+    payload = _paged(cluster_df, req, "clusters")
+    payload["summary"] = frame_to_json(summary, req.layout)
+    payload["result_id"] = _results.put(snapshot.version, "cluster", params, cluster_df)
+    return FastJSONResponse(payload)
+
+
+def _conditional(
+    request: Request, snapshot: DatasetSnapshot, endpoint: str, params: Dict[str, Any], build: Callable[[], Response],
+) -> Response:
+    """按 (数据指纹, 接口, 参数) 生成 ETag，命中 If-None-Match 时直接返回 304，不做任何计算。"""
+    etag = make_etag(snapshot.fingerprint or str(snapshot.version), endpoint, params)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={config.ANALYSIS_CACHE_MAX_AGE}, must-revalidate"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response = build()
+    response.headers.update(headers)
+    return response
+
+
+def _paged(df: pd.DataFrame, page: PageOptions, key: str) -> Dict[str, Any]:
+    """按分页选项截取结果，数据放在 key 字段下，并附带 total/offset/limit/next_offset。"""
+    try:
+        result = frame_payload(df, page.layout, page.limit, page.offset, page.sort_by, page.descending)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    result[key] = result.pop("data")
+    return result
+
+
+@app.post("/api/clustering/assign")
+def cluster_assign(req: ClusterAssignRequest) -> Dict[str, Any]:
+    """使用已训练的聚类模型为客户归类：已有客户按编号，新客户按提供的订单明细现算 RFM 后 predict。"""
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    lines = pd.DataFrame([line.dict() for line in req.orders]) if req.orders else None
+    try:
+        result = clustering.assign_clusters(snapshot, req.customer_ids, lines, req.k)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    items = result["items"]
+    return {"items": items.to_dict(orient="records"), "total": int(len(items)), "missing": result["missing"]}
+
+
+@app.post("/api/customers/similar")
+def similar_customers(req: SimilarCustomersRequest) -> Dict[str, Any]:
+    """查找与种子客户最相似的客户，生成相似人群。"""
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    try:
+        return similarity.find_similar_customers(snapshot, req.customer_ids, req.top_n, req.include_category)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
 @app.post("/api/export")
 def export_data(req: ExportRequest) -> StreamingResponse:
-    """根据类型导出 CSV。"""
-    _ensure_data_loaded()
+    """按类型或结果 ID 分块流式导出 CSV/Parquet。"""
+    snapshot = _ensure_data_loaded(req.dataset_id)
+    if req.result_id:
+        cached = _results.get(req.result_id)
+        if cached is None:
+            raise HTTPException(status_code=404, detail="结果已过期，请重新执行分析后再导出")
+        target, df = cached
+    elif req.target:
+        target = req.target
+        params = req.dict(exclude={"result_id", "format", "compress"})
+        df = _single_flight.do(snapshot.version, "export", params, lambda: _build_export_frame(snapshot, req))
+    else:
+        raise HTTPException(status_code=400, detail="请指定导出类型或结果 ID")
+    if df is None or df.empty:
+        raise HTTPException(status_code=400, detail="暂无可导出的数据")
+    if req.format == "parquet":
+        try:
+            chunks = exporter.iter_parquet(df)
+            first = next(chunks)
+        except RuntimeError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        body = itertools.chain([first], chunks)
+        filename, media_type = f"{target}.parquet", "application/vnd.apache.parquet"
+    elif req.compress:
+        body = exporter.iter_csv(df, compress=True)
+        filename, media_type = f"{target}.csv.gz", "application/gzip"
+    else:
+        body = exporter.iter_csv(df)
+        filename, media_type = f"{target}.csv", "text/csv"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+def _build_export_frame(snapshot: DatasetSnapshot, req: ExportRequest) -> Optional[pd.DataFrame]:
+    """按导出类型计算待导出的数据框。"""
     target = req.target
     df = None
     if target == "recommendation":
-        rec = recommender.Recommender(data_repo)
+        rec = recommender.Recommender(snapshot)
         df = rec.recommend(req.customer_id or "", req.top_n)
     elif target == "promotion":
-        metrics = promotion.calc_product_metrics(data_repo)
-        df = promotion.select_promotion_candidates(metrics, PromotionRule().dict())
+        df, _ = promotion.screen_promotion_candidates(snapshot, PromotionRule().dict(exclude=PAGE_FIELDS))
     elif target == "cluster":
-        rfm_df = clustering.calc_rfm(data_repo)
-        cluster_df, _ = clustering.kmeans_cluster(rfm_df, req.k)
-        df = cluster_df
+        df, _ = clustering.current_clusters(snapshot, req.k)
     elif target == "forecast":
-        ts_df = forecast.build_sales_timeseries(data_repo)
-        _, predict_df, _ = forecast.train_and_predict_sales(ts_df, req.months)
-        df = predict_df
+        df = forecast.forecast_report(snapshot, req.months)["forecast"]
     else:
         raise HTTPException(status_code=400, detail="不支持的导出类型")
-
-    if df is None or df.empty:
-        raise HTTPException(status_code=400, detail="暂无可导出的数据")
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False, encoding="utf-8-sig")
-    csv_buffer.seek(0)
-    filename = f"{target}.csv"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(iter([csv_buffer.getvalue()]), media_type="text/csv", headers=headers)
+    return df
+
+
+@app.post("/api/events")
+def ingest_events(batch: EventBatch) -> Dict[str, Any]:
+    """批量写入实时订单明细事件，更新各滑动窗口的销售额、利润与热销商品，不修改已加载的数据集。"""
+    events = [
+        {**event.dict(include={"product_id", "product_name", "quantity", "sales", "profit"}),
+         "timestamp": event.timestamp.timestamp() if event.timestamp else None}
+        for event in batch.events
+    ]
+    return _get_aggregator(batch.dataset_id).ingest(events)
+
+
+@app.get("/api/events/summary")
+def events_summary(
+    window: str = "1h", top_k: int = config.EVENT_TOP_K, by: str = "sales", dataset_id: Optional[str] = _DATASET_QUERY,
+) -> Dict[str, Any]:
+    """返回实时事件在指定滑动窗口内的销售额、利润、数量与热销商品。"""
+    aggregator = _get_aggregator(dataset_id)
+    try:
+        return aggregator.summary(window, top_k, by)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
 @app.post("/api/tts")
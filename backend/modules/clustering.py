@@ -1,41 +1,47 @@
 """客户聚类模块。"""
-from typing import Tuple
-
-from typing import Tuple
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 
 from backend import config
-from backend.data_loader import DataRepository
+from backend.data_loader import DatasetSnapshot, build_rfm_features, is_live_lineage
+from backend.utils import metrics
+from backend.utils.importing import lazy_import
 from backend.utils.logger import LOGGER
 
+if TYPE_CHECKING:  # scikit-learn 导入较慢，仅在首次聚类时加载
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+
+# 按 (数据谱系, k) 缓存已训练的标准化器、模型与分群标签。追加数据只产生新版本、不改变谱系，
+# 模型沿用至显式要求重新训练；新客户归类时只需一次 predict。每个谱系最多保留
+# CLUSTER_MODELS_PER_LINEAGE 个 k 的模型，超出时淘汰最早训练的
+_CLUSTER_MODEL_CACHE: Dict[Tuple[int, int], Dict[str, object]] = {}
+_CLUSTER_MODEL_LOCK = threading.Lock()
 
-def calc_rfm(repo: DataRepository) -> pd.DataFrame:
+
+def calc_rfm(repo: DatasetSnapshot, customer_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
     """
-    计算 RFM 指标。
+    读取数据快照中维护的 RFM 特征表。
 
-    :param repo: 数据仓库。
+    :param repo: 数据快照。
+    :param customer_ids: 仅返回指定客户，None 时计算全部客户。
     :return: 包含 customer_id、R、F、M 的数据框。
     """
-    if repo.orders is None:
-        raise ValueError("请先加载数据并构建订单数据。")
-    latest_date = repo.get_latest_date()
-    if latest_date is None:
+    if repo.rfm is None:
+        raise ValueError("请先加载数据并构建 RFM 特征表。")
+    if repo.get_latest_date() is None:
         raise ValueError("数据集中缺少订单日期。")
-    orders = repo.orders.copy()
-    orders["days_since"] = (latest_date - orders["order_date"]).dt.days
-    rfm = orders.groupby("customer_id").agg(
-        R=("days_since", "min"),
-        F=("order_id", "nunique"),
-        M=("sales", "sum"),
-    ).reset_index()
-    LOGGER.info("已计算 RFM 指标，共 %s 个客户。", len(rfm))
+    rfm = repo.rfm
+    if customer_ids is not None:
+        rfm = rfm[rfm["customer_id"].astype(str).isin({str(cid) for cid in customer_ids})]
+    rfm = rfm[["customer_id", "R", "F", "M"]].reset_index(drop=True)
+    LOGGER.info("已读取 RFM 指标，共 %s 个客户。", len(rfm))
     return rfm
 
 
-def kmeans_cluster(rfm_df: pd.DataFrame, k: int = config.DEFAULT_CLUSTER_K) -> Tuple[pd.DataFrame, KMeans]:
+def kmeans_cluster(rfm_df: pd.DataFrame, k: int = config.DEFAULT_CLUSTER_K) -> Tuple[pd.DataFrame, "KMeans"]:
     """
     对 RFM 数据执行 KMeans 聚类。
 
@@ -43,17 +49,141 @@ def kmeans_cluster(rfm_df: pd.DataFrame, k: int = config.DEFAULT_CLUSTER_K) -> T
     :param k: 聚类数量。
     :return: (带聚类标签的数据框, 训练好的模型)。
     """
+    cluster_df, model, _ = _fit_kmeans(rfm_df, k)
+    return cluster_df, model
+
+
+def fit_cluster_model(repo: DatasetSnapshot, k: int = config.DEFAULT_CLUSTER_K, refit: bool = False) -> Dict[str, object]:
+    """
+    获取数据集的聚类模型，未命中缓存或要求重新训练时在当前快照上训练并保存。
+
+    :param repo: 数据快照。
+    :param k: 聚类数量。
+    :param refit: 是否在当前数据上重新训练；模型已基于当前版本训练时不重复训练。
+    :return: 包含 version（训练所用数据版本）、scaler、model、cluster_df、summary、labels 的字典。
+    """
+    if not 2 <= k <= config.MAX_CLUSTER_K:
+        raise ValueError(f"聚类数量需在 2 到 {config.MAX_CLUSTER_K} 之间。")
+    key = (repo.lineage, k)
+    cached = _CLUSTER_MODEL_CACHE.get(key)
+    if cached is not None and (not refit or cached["version"] == repo.version):
+        return cached
+    with _CLUSTER_MODEL_LOCK:
+        cached = _CLUSTER_MODEL_CACHE.get(key)
+        if cached is not None and (not refit or cached["version"] == repo.version):
+            return cached
+        rfm_df = calc_rfm(repo)
+        cluster_df, model, scaler = _fit_kmeans(rfm_df, k)
+        summary = explain_clusters(cluster_df)
+        entry: Dict[str, object] = {
+            "version": repo.version,
+            "k": k,
+            "scaler": scaler,
+            "model": model,
+            "cluster_df": cluster_df,
+            "summary": summary,
+            "labels": dict(zip(summary["cluster"].astype(int), summary["label"])),
+        }
+        # 已无数据集使用的谱系对应的模型全部失效，新模型建成后清理
+        for stale in [item for item in _CLUSTER_MODEL_CACHE if not is_live_lineage(item[0])]:
+            _CLUSTER_MODEL_CACHE.pop(stale, None)
+        _CLUSTER_MODEL_CACHE.pop(key, None)
+        siblings = [item for item in _CLUSTER_MODEL_CACHE if item[0] == repo.lineage]
+        for oldest in siblings[:max(0, len(siblings) - config.CLUSTER_MODELS_PER_LINEAGE + 1)]:
+            _CLUSTER_MODEL_CACHE.pop(oldest, None)
+        _CLUSTER_MODEL_CACHE[key] = entry
+        LOGGER.info("已缓存聚类模型：数据版本 %s，k=%s。", repo.version, k)
+        return entry
+
+
+def model_version(repo: DatasetSnapshot, k: int = config.DEFAULT_CLUSTER_K) -> Optional[int]:
+    """返回数据集已缓存模型训练所用的数据版本，尚未训练时返回 None，不触发训练。"""
+    cached = _CLUSTER_MODEL_CACHE.get((repo.lineage, k))
+    return None if cached is None else int(cached["version"])
+
+
+def current_clusters(repo: DatasetSnapshot, k: int = config.DEFAULT_CLUSTER_K, refit: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    返回当前快照全部客户的分群结果与分群解释。
+
+    模型训练后又追加过数据时，用已有模型对当前 RFM 重新 predict，分群标签沿用训练时的解释，
+    群组规模与均值按当前数据统计。
+
+    :param repo: 数据快照。
+    :param k: 聚类数量。
+    :param refit: 是否先在当前数据上重新训练。
+    :return: (带 cluster 列的 RFM 数据框, 含 label 的分群解释)。
+    """
+    entry = fit_cluster_model(repo, k, refit)
+    if entry["version"] == repo.version:
+        return entry["cluster_df"], entry["summary"]
+    cluster_df = _predict(entry, calc_rfm(repo))
+    summary = explain_clusters(cluster_df)
+    summary["label"] = summary["cluster"].map(entry["labels"])
+    return cluster_df.drop(columns="label"), summary
+
+
+def assign_clusters(
+    repo: DatasetSnapshot,
+    customer_ids: Iterable[str] = (),
+    lines: Optional[pd.DataFrame] = None,
+    k: int = config.DEFAULT_CLUSTER_K,
+) -> Dict[str, object]:
+    """
+    使用已训练模型为客户归类，无需重新聚类。
+
+    :param repo: 数据快照，提供模型与计算 R 的基准日期。
+    :param customer_ids: 数据集中已有客户的编号，直接取其 RFM 特征。
+    :param lines: 新客户的订单明细（customer_id、order_id、order_date、sales），据此现算 RFM；
+        同一客户同时出现在 customer_ids 中时以明细为准。
+    :param k: 聚类数量，对应缓存的模型。
+    :return: 包含 items（customer_id、R、F、M、cluster、label）与 missing（数据集中找不到且未提供明细的编号）的字典。
+    """
+    customer_ids = [str(cid).strip() for cid in customer_ids]
+    if not customer_ids and (lines is None or lines.empty):
+        raise ValueError("请提供客户编号或订单明细。")
+    entry = fit_cluster_model(repo, k)
+    frames = []
+    supplied: set = set()
+    if lines is not None and not lines.empty:
+        lines = lines.assign(customer_id=lines["customer_id"].astype(str), order_date=pd.to_datetime(lines["order_date"]))
+        latest = max(repo.get_latest_date(), lines["order_date"].max())
+        frames.append(build_rfm_features(lines, latest)[["customer_id", "R", "F", "M"]])
+        supplied = set(lines["customer_id"])
+    known = calc_rfm(repo, [cid for cid in customer_ids if cid not in supplied])
+    if not known.empty:
+        frames.append(known.assign(customer_id=known["customer_id"].astype(str)))
+    found = set().union(*(set(frame["customer_id"]) for frame in frames)) if frames else set()
+    missing = [cid for cid in dict.fromkeys(customer_ids) if cid not in found]
+    if not found:
+        raise ValueError("未找到这些客户的历史订单，也未提供订单明细，无法归类。")
+    rfm_df = _predict(entry, pd.concat(frames, ignore_index=True))
+    return {"items": rfm_df, "missing": missing}
+
+
+def _predict(entry: Dict[str, object], rfm_df: pd.DataFrame) -> pd.DataFrame:
+    """用缓存的标准化器与模型为 RFM 数据打上 cluster 与 label 列。"""
+    rfm_df = rfm_df.copy()
+    scaled = entry["scaler"].transform(rfm_df[["R", "F", "M"]])
+    rfm_df["cluster"] = entry["model"].predict(scaled)
+    rfm_df["label"] = rfm_df["cluster"].map(entry["labels"])
+    return rfm_df
+
+
+@metrics.timed("clustering.kmeans")
+def _fit_kmeans(rfm_df: pd.DataFrame, k: int) -> Tuple[pd.DataFrame, "KMeans", "StandardScaler"]:
+    """训练标准化器与 KMeans 模型，返回带标签的数据、模型与标准化器。"""
     if rfm_df.empty:
         raise ValueError("RFM 数据为空，无法聚类。")
-    scaler = StandardScaler()
+    scaler = lazy_import("sklearn.preprocessing").StandardScaler()
     features = rfm_df[["R", "F", "M"]]
     scaled = scaler.fit_transform(features)
-    model = KMeans(n_clusters=k, random_state=42, n_init=10)
+    model = lazy_import("sklearn.cluster").KMeans(n_clusters=k, random_state=42, n_init=10)
     labels = model.fit_predict(scaled)
     rfm_df = rfm_df.copy()
     rfm_df["cluster"] = labels
     LOGGER.info("完成 KMeans 聚类，共 %s 类。", k)
-    return rfm_df, model
+    return rfm_df, model, scaler
 
 
 def explain_clusters(rfm_df: pd.DataFrame) -> pd.DataFrame:
@@ -1,21 +1,60 @@
 """销售与利润预测模块，提供线性回归与 ARIMA 双模型对比。"""
-from typing import Dict, Tuple
+import threading
+from typing import Any, Dict, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from statsmodels.tsa.arima.model import ARIMA
 
 from backend import config
-from backend.data_loader import DataRepository
+from backend.data_loader import DatasetSnapshot, is_live_version
+from backend.utils import metrics
+from backend.utils.importing import lazy_import
 from backend.utils.logger import LOGGER
 
+# 按 (数据版本, 预测月数) 缓存完整预测结果，模型拟合只在数据变化后重做
+_FORECAST_CACHE: Dict[Tuple[int, int], Dict[str, Any]] = {}
+_FORECAST_LOCK = threading.Lock()
 
-def build_sales_timeseries(repo: DataRepository) -> pd.DataFrame:
+
+def forecast_report(repo: DatasetSnapshot, months: int = config.DEFAULT_FORECAST_MONTHS) -> Dict[str, Any]:
+    """
+    获取当前数据版本的预测结果，未命中缓存时执行聚合、择优预测与长期评估。
+
+    :param repo: 数据快照。
+    :param months: 预测月份数。
+    :return: 包含 history、forecast、summary、model、long_term 的字典，调用方不应修改。
+    """
+    if not 1 <= months <= config.MAX_FORECAST_MONTHS:
+        raise ValueError(f"预测月份数需在 1 到 {config.MAX_FORECAST_MONTHS} 之间。")
+    key = (repo.version, months)
+    cached = _FORECAST_CACHE.get(key)
+    if cached is not None:
+        return cached
+    with _FORECAST_LOCK:
+        cached = _FORECAST_CACHE.get(key)
+        if cached is not None:
+            return cached
+        ts_df = build_sales_timeseries(repo)
+        history, predict_df, model_info = train_and_predict_sales(ts_df, months)
+        report = {
+            "history": history,
+            "forecast": predict_df,
+            "summary": summarize_forecast(predict_df, model_info),
+            "model": model_info,
+            "long_term": evaluate_long_horizon(history, 12),
+        }
+        for stale in [item for item in _FORECAST_CACHE if not is_live_version(item[0])]:
+            _FORECAST_CACHE.pop(stale, None)
+        _FORECAST_CACHE[key] = report
+        return report
+
+
+@metrics.timed("forecast.timeseries")
+def build_sales_timeseries(repo: DatasetSnapshot) -> pd.DataFrame:
     """
     按月聚合销售额与利润，并补齐缺失月份。
 
-    :param repo: 数据仓库。
+    :param repo: 数据快照。
     :return: 含 period、sales、profit 的时间序列数据框，按时间有序且缺失月份补零。
     """
     if repo.raw_df is None:
@@ -24,6 +63,7 @@ def build_sales_timeseries(repo: DataRepository) -> pd.DataFrame:
         raise ValueError("数据中缺少订单日期，无法聚合。")
     df = repo.raw_df.copy()
     df["period"] = df["order_date"].dt.to_period("M")
+    df[["sales", "profit"]] = df[["sales", "profit"]].astype("float64")
     grouped = df.groupby("period").agg(sales=("sales", "sum"), profit=("profit", "sum")).reset_index()
     grouped = grouped.sort_values(by="period")
     completed = _complete_periods(grouped)
@@ -46,7 +86,8 @@ def train_and_predict_sales(
     history = ts_df.copy()
     history["t"] = range(1, len(history) + 1)
 
-    evaluation = _evaluate_models(history)
+    with metrics.stage("forecast.evaluate"):
+        evaluation = _evaluate_models(history)
     if evaluation["winner"] == "ARIMA":
         arima_result = _arima_forecast(history, months)
         forecast_df = arima_result["forecast"] if arima_result else _linear_regression_forecast(history, months)
@@ -121,10 +162,12 @@ def evaluate_long_horizon(history: pd.DataFrame, months: int = 12) -> Dict[str,
     }
 
 
+@metrics.timed("forecast.linear_regression")
 def _linear_regression_forecast(history: pd.DataFrame, months: int) -> pd.DataFrame:
     """基于时间索引的线性回归预测。"""
-    model_sales = LinearRegression()
-    model_profit = LinearRegression()
+    linear_model = lazy_import("sklearn.linear_model")
+    model_sales = linear_model.LinearRegression()
+    model_profit = linear_model.LinearRegression()
     model_sales.fit(history[["t"]], history["sales"])
     model_profit.fit(history[["t"]], history["profit"])
 
@@ -138,14 +181,16 @@ def _linear_regression_forecast(history: pd.DataFrame, months: int) -> pd.DataFr
     return predict_df
 
 
+@metrics.timed("forecast.arima")
 def _arima_forecast(history: pd.DataFrame, months: int) -> Dict[str, object] | None:
     """尝试使用 ARIMA 捕捉趋势与周期性，失败时返回 None。"""
     if len(history) < 6:
         LOGGER.warning("样本期数不足，跳过 ARIMA 预测。")
         return None
+    arima_model = lazy_import("statsmodels.tsa.arima.model")
     try:
-        sales_model = ARIMA(history["sales"], order=(1, 1, 1)).fit()
-        profit_model = ARIMA(history["profit"], order=(1, 1, 1)).fit()
+        sales_model = arima_model.ARIMA(history["sales"], order=(1, 1, 1)).fit()
+        profit_model = arima_model.ARIMA(history["profit"], order=(1, 1, 1)).fit()
         sales_forecast = sales_model.forecast(steps=months)
         profit_forecast = profit_model.forecast(steps=months)
     except Exception as exc:  # noqa: BLE001
@@ -1,22 +1,36 @@
 """商品促销分析模块。"""
-from typing import Dict, List
+import threading
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
-from mlxtend.frequent_patterns import apriori, association_rules
 
 """商品促销分析模块，包含指标筛选与关联规则挖掘。"""
 
 from backend import config
 from backend.api_models import AssociationRule
-from backend.data_loader import DataRepository
+from backend.data_loader import DatasetSnapshot, is_live_version
+from backend.utils import metrics
+from backend.utils.importing import lazy_import
 from backend.utils.logger import LOGGER
 
+# 按数据版本缓存布尔购物篮矩阵，同一版本下不同阈值的挖掘共用一份
+_BASKET_CACHE: Dict[int, pd.DataFrame] = {}
+_BASKET_LOCK = threading.Lock()
+# 按数据版本缓存促销筛选索引
+_SCREEN_CACHE: Dict[int, "PromotionIndex"] = {}
+_SCREEN_LOCK = threading.Lock()
 
-def calc_product_metrics(repo: DataRepository) -> pd.DataFrame:
+_INDEXED_METRICS = ("quantity", "profit_rate", "discount")
+# 分面字段 -> 规则中对应的过滤参数名
+_FACET_FIELDS = {"category": "categories", "sub_category": "sub_categories"}
+
+
+def calc_product_metrics(repo: DatasetSnapshot) -> pd.DataFrame:
     """
     计算商品销售指标。
 
-    :param repo: 数据仓库实例。
+    :param repo: 数据快照。
     :return: 包含销量、销售额、利润率等指标的商品数据框。
     """
     if repo.raw_df is None:
@@ -45,18 +59,152 @@ def select_promotion_candidates(products: pd.DataFrame, rule: Dict[str, float] |
         & (products["profit_rate"] >= rule.get("min_profit_rate", 0))
         & (products["discount"] <= rule.get("max_discount", 1))
     ].copy()
-    candidates["reason"] = candidates.apply(
-        lambda r: f"销量{int(r['quantity'])}件，利润率{r['profit_rate']:.2f}，折扣{r['discount']:.2f}", axis=1,
-    )
+    candidates["reason"] = format_reasons(candidates)
     LOGGER.info("筛选得到 %s 个促销候选商品。", len(candidates))
     return candidates.sort_values(by=["profit_rate", "quantity"], ascending=[True, False])
 
 
-def build_basket_matrix(repo: DataRepository) -> pd.DataFrame:
+def format_reasons(products: pd.DataFrame) -> pd.Series:
+    """按列向量化生成“销量/利润率/折扣”推荐理由，避免逐行 apply。"""
+    quantity = products["quantity"].astype("int64").astype(str)
+    profit_rate = np.char.mod("%.2f", products["profit_rate"].to_numpy(dtype=np.float64))
+    discount = np.char.mod("%.2f", products["discount"].to_numpy(dtype=np.float64))
+    return "销量" + quantity + "件，利润率" + profit_rate + "，折扣" + discount
+
+
+class PromotionIndex:
+    """
+    一个数据版本的促销筛选索引。
+
+    商品按默认展示顺序（利润率升序、销量降序）排好并预先生成理由列，另为销量、利润率、折扣各保存一份
+    排序后的取值与位置；区间筛选先在各指标上二分查找得到命中数，只取最窄的区间展开，再用其余条件过滤，
+    命中位置排序后即是默认展示顺序，无需每次重新排序。品类与子品类编码为整数，用于过滤与分面计数。
+    """
+
+    def __init__(self, products: pd.DataFrame) -> None:
+        frame = products.sort_values(by=["profit_rate", "quantity"], ascending=[True, False], kind="mergesort")
+        frame = frame.reset_index(drop=True)
+        frame["reason"] = format_reasons(frame)
+        self.frame = frame
+        self._values: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for name in _INDEXED_METRICS:
+            values = frame[name].to_numpy()
+            # 整数列按浮点比较，保证 0.5 这类阈值不被截断
+            values = values if values.dtype.kind == "f" else values.astype(np.float64)
+            order = np.argsort(values, kind="stable")
+            self._values[name] = values
+            self._sorted[name] = (values[order], order)
+        self._facets: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        for field in _FACET_FIELDS:
+            if field in frame.columns:
+                codes, labels = pd.factorize(frame[field].astype(str), sort=True)
+                self._facets[field] = (codes, [str(label) for label in labels])
+
+    def screen(self, rule: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Dict[str, int]]]:
+        """
+        按规则筛选候选商品并统计分面。
+
+        :param rule: 促销规则，除指标阈值外可含 categories、sub_categories（逗号分隔）。
+        :return: (按默认顺序排列的候选商品, 各分面字段的取值计数)。分面计数不受本字段自身的过滤影响，
+            便于前端展示切换到其它取值后的命中数。
+        """
+        bounds = {
+            "quantity": (rule.get("min_quantity", 0), rule.get("max_quantity", float("inf"))),
+            "profit_rate": (rule.get("min_profit_rate", 0), float("inf")),
+            "discount": (float("-inf"), rule.get("max_discount", 1)),
+        }
+        ranges = {}
+        for name, (low, high) in bounds.items():
+            sorted_values, _ = self._sorted[name]
+            low, high = np.asarray(low, dtype=sorted_values.dtype), np.asarray(high, dtype=sorted_values.dtype)
+            ranges[name] = (int(np.searchsorted(sorted_values, low, "left")), int(np.searchsorted(sorted_values, high, "right")))
+        narrowest = min(ranges, key=lambda name: ranges[name][1] - ranges[name][0])
+        start, stop = ranges[narrowest]
+        positions = self._sorted[narrowest][1][start:stop]
+        for name, (low, high) in bounds.items():
+            if name != narrowest and positions.size:
+                values = self._values[name][positions]
+                positions = positions[(values >= np.asarray(low, dtype=values.dtype)) & (values <= np.asarray(high, dtype=values.dtype))]
+        positions = np.sort(positions)
+
+        masks = {}
+        for field, key in _FACET_FIELDS.items():
+            selected = _split_values(rule.get(key))
+            if selected and field in self._facets:
+                codes, labels = self._facets[field]
+                wanted = np.isin(codes[positions], [code for code, label in enumerate(labels) if label in selected])
+                masks[field] = wanted
+        facets: Dict[str, Dict[str, int]] = {}
+        for field, (codes, labels) in self._facets.items():
+            others = [mask for name, mask in masks.items() if name != field]
+            visible = positions[np.logical_and.reduce(others)] if others else positions
+            counts = np.bincount(codes[visible], minlength=len(labels))
+            facets[field] = {label: int(count) for label, count in zip(labels, counts) if count}
+        if masks:
+            positions = positions[np.logical_and.reduce(list(masks.values()))]
+        return self.frame.iloc[positions].reset_index(drop=True), facets
+
+
+def get_promotion_index(repo: DatasetSnapshot) -> PromotionIndex:
+    """
+    获取当前数据版本的促销筛选索引，未命中缓存时构建并保存。
+
+    :param repo: 数据快照。
+    :return: 促销筛选索引，调用方不应修改其中的数据框。
+    """
+    cached = _SCREEN_CACHE.get(repo.version)
+    if cached is not None:
+        return cached
+    with _SCREEN_LOCK:
+        cached = _SCREEN_CACHE.get(repo.version)
+        if cached is not None:
+            return cached
+        with metrics.stage("promotion.screen_index"):
+            index = PromotionIndex(_with_categories(repo, calc_product_metrics(repo)))
+        for stale in [version for version in _SCREEN_CACHE if not is_live_version(version)]:
+            _SCREEN_CACHE.pop(stale, None)
+        _SCREEN_CACHE[repo.version] = index
+        return index
+
+
+def screen_promotion_candidates(repo: DatasetSnapshot, rule: Dict[str, Any] | None = None) -> Tuple[pd.DataFrame, Dict[str, Dict[str, int]]]:
+    """
+    使用按版本缓存的排序索引筛选促销候选商品，结果与 select_promotion_candidates 一致并附带品类列。
+
+    :param repo: 数据快照。
+    :param rule: 促销规则，可含 categories、sub_categories（逗号分隔）过滤品类。
+    :return: (候选商品, 品类与子品类的分面计数)。
+    """
+    if rule is None:
+        rule = config.DEFAULT_PROMOTION_RULE
+    candidates, facets = get_promotion_index(repo).screen(rule)
+    LOGGER.info("按规则 %s 筛选得到 %s 个促销候选商品。", rule, len(candidates))
+    return candidates, facets
+
+
+def _with_categories(repo: DatasetSnapshot, products: pd.DataFrame) -> pd.DataFrame:
+    """从明细中为每个商品取品类与子品类（同一商品取首次出现的值）。"""
+    fields = [field for field in _FACET_FIELDS if field in repo.raw_df.columns]
+    if not fields:
+        return products
+    categories = repo.raw_df[["product_id", *fields]].drop_duplicates("product_id")
+    return products.merge(categories, on="product_id", how="left")
+
+
+def _split_values(value: Any) -> set:
+    """将逗号分隔的过滤值拆分为集合，空值返回空集合。"""
+    if not value:
+        return set()
+    return {item.strip() for item in str(value).split(",") if item.strip()}
+
+
+@metrics.timed("promotion.basket_matrix")
+def build_basket_matrix(repo: DatasetSnapshot) -> pd.DataFrame:
     """
     将订单明细转换为购物篮 0/1 矩阵。
 
-    :param repo: 数据仓库。
+    :param repo: 数据快照。
     :return: 订单-商品矩阵，行为订单，列为商品，值为是否购买。
     """
     if repo.raw_df is None:
@@ -65,13 +213,34 @@ def build_basket_matrix(repo: DataRepository) -> pd.DataFrame:
     if df.empty:
         raise ValueError("销售明细为空，无法生成购物篮。")
     df["flag"] = (df["quantity"] > 0).astype(int)
-    pivot = df.pivot_table(index="order_id", columns="product_id", values="flag", fill_value=0, aggfunc="max")
+    pivot = df.pivot_table(index="order_id", columns="product_id", values="flag", fill_value=0, aggfunc="max", observed=True)
     LOGGER.info("已构建购物篮矩阵，订单数 %s，商品数 %s。", pivot.shape[0], pivot.shape[1])
     return pivot
 
 
+def get_basket_matrix(repo: DatasetSnapshot) -> pd.DataFrame:
+    """
+    获取当前数据版本的布尔购物篮矩阵，未命中缓存时构建并保存。
+
+    :param repo: 数据快照。
+    :return: 订单-商品布尔矩阵，调用方不应修改。
+    """
+    cached = _BASKET_CACHE.get(repo.version)
+    if cached is not None:
+        return cached
+    with _BASKET_LOCK:
+        cached = _BASKET_CACHE.get(repo.version)
+        if cached is not None:
+            return cached
+        basket = build_basket_matrix(repo).astype(bool)
+        for stale in [version for version in _BASKET_CACHE if not is_live_version(version)]:
+            _BASKET_CACHE.pop(stale, None)
+        _BASKET_CACHE[repo.version] = basket
+        return basket
+
+
 def mine_association_rules(
-    repo: DataRepository,
+    repo: DatasetSnapshot,
     min_support: float = config.DEFAULT_MIN_SUPPORT,
     min_confidence: float = config.DEFAULT_MIN_CONFIDENCE,
     metric: str = "lift",
@@ -79,14 +248,14 @@ def mine_association_rules(
     """
     使用 Apriori 挖掘强关联规则。
 
-    :param repo: 数据仓库。
+    :param repo: 数据快照。
     :param min_support: 最小支持度。
     :param min_confidence: 最小置信度。
     :param metric: 规则排序指标，默认使用提升度。
     :return: 关联规则列表。
     """
     _validate_thresholds(min_support, min_confidence)
-    basket = build_basket_matrix(repo)
+    basket = get_basket_matrix(repo)
     rules_df = _mine_with_fallback(basket, min_support, min_confidence, metric)
     if rules_df.empty:
         return []
@@ -97,13 +266,17 @@ def mine_association_rules(
 
 def _mine_with_fallback(basket: pd.DataFrame, min_support: float, min_confidence: float, metric: str) -> pd.DataFrame:
     """优先使用用户阈值挖掘，无结果时自动放宽至更低支持度/置信度。"""
+    frequent_patterns = lazy_import("mlxtend.frequent_patterns")
     attempts = [(min_support, min_confidence), (max(min_support / 2, 0.001), max(min_confidence * 0.8, 0.1))]
+    flags = basket.astype(bool)
     for support, confidence in attempts:
-        frequent = apriori(basket.astype(bool), min_support=support, use_colnames=True)
+        with metrics.stage("promotion.apriori"):
+            frequent = frequent_patterns.apriori(flags, min_support=support, use_colnames=True)
         if frequent.empty:
             LOGGER.warning("在支持度 %.4f 下未找到频繁项集，尝试放宽阈值。", support)
             continue
-        rules_df = association_rules(frequent, metric="confidence", min_threshold=confidence)
+        with metrics.stage("promotion.association_rules"):
+            rules_df = frequent_patterns.association_rules(frequent, metric="confidence", min_threshold=confidence)
         rules_df = rules_df[rules_df[metric] > 1] if metric == "lift" else rules_df
         rules_df = rules_df[(rules_df["antecedents"].apply(len) > 0) & (rules_df["consequents"].apply(len) > 0)]
         if not rules_df.empty:
@@ -121,7 +294,7 @@ def _validate_thresholds(min_support: float, min_confidence: float) -> None:
         raise ValueError("最小置信度需在 (0,1] 区间内。")
 
 
-def _build_product_name_map(repo: DataRepository) -> Dict[str, str]:
+def _build_product_name_map(repo: DatasetSnapshot) -> Dict[str, str]:
     """创建 product_id 到名称的映射，便于生成可读理由。"""
     if repo.products is None or repo.products.empty:
         return {}
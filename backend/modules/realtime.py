@@ -0,0 +1,223 @@
+"""实时订单事件的滑动窗口汇总，按固定大小的环形缓冲区维护各时间窗口的销售额、利润与热销商品。"""
+import heapq
+import threading
+import time
+from typing import Any, Container, Dict, Iterable, List, Optional, Set
+
+from backend import config
+from backend.utils import metrics
+
+# 按数据集 ID 保存各自的实时汇总器
+_AGGREGATORS: Dict[str, "RealtimeAggregator"] = {}
+_AGGREGATORS_LOCK = threading.Lock()
+
+_RANK_FIELDS = {"sales": 0, "quantity": 1, "profit": 2}
+
+
+class SlidingWindow:
+    """
+    单个时间窗口的环形缓冲区。
+
+    每个桶保存一段时间内的合计与按商品的小计，窗口合计与商品合计随写入累加、随桶过期扣减，
+    单条事件的更新与单个桶的过期都是常数时间，查询窗口合计无需遍历任何明细。
+    反复加减会累积浮点误差，窗口每转过一整圈即按各桶小计重新求和一次，误差不会随运行时长增长。
+    """
+
+    def __init__(self, buckets: int, bucket_seconds: float) -> None:
+        self.size = buckets
+        self.width = float(bucket_seconds)
+        self._slots = [-1] * buckets
+        self._sums = [[0.0, 0.0, 0.0, 0] for _ in range(buckets)]
+        self._products: List[Dict[str, List[float]]] = [{} for _ in range(buckets)]
+        self._head: Optional[int] = None
+        # 窗口合计：[销售额, 数量, 利润, 明细行数]；商品合计：商品编号 -> [销售额, 数量, 利润, 明细行数]
+        self.totals = [0.0, 0.0, 0.0, 0]
+        self.product_totals: Dict[str, List[float]] = {}
+        # 已移出窗口的商品编号，供汇总器清理商品名称
+        self.evicted: Set[str] = set()
+
+    def add(self, timestamp: float, product_id: str, sales: float, quantity: float, profit: float) -> bool:
+        """
+        写入一条事件，早于窗口起点的事件被忽略。
+
+        :return: 是否计入本窗口。
+        """
+        bucket = int(timestamp // self.width)
+        if self._head is not None and bucket <= self._head - self.size:
+            return False
+        self.advance(bucket)
+        slot = bucket % self.size
+        if self._slots[slot] != bucket:
+            self._expire(slot)
+            self._slots[slot] = bucket
+        values = (sales, quantity, profit, 1)
+        bucket_sums = self._sums[slot]
+        bucket_product = self._products[slot].setdefault(product_id, [0.0, 0.0, 0.0, 0])
+        product_total = self.product_totals.setdefault(product_id, [0.0, 0.0, 0.0, 0])
+        for index, value in enumerate(values):
+            bucket_sums[index] += value
+            bucket_product[index] += value
+            product_total[index] += value
+            self.totals[index] += value
+        return True
+
+    def advance(self, bucket: int) -> None:
+        """将窗口推进到指定桶，途经的旧桶依次过期；最多处理一整圈，与空闲时长无关。"""
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+        for passed in range(max(self._head + 1, bucket - self.size + 1), bucket + 1):
+            slot = passed % self.size
+            self._expire(slot)
+            self._slots[slot] = passed
+        rotated = bucket // self.size != self._head // self.size
+        self._head = bucket
+        if rotated:
+            self._resync()
+
+    def top(self, k: int, by: str) -> List[Dict[str, Any]]:
+        """按指定指标返回窗口内前 k 个商品。"""
+        index = _RANK_FIELDS[by]
+        ranked = heapq.nlargest(k, self.product_totals.items(), key=lambda item: item[1][index])
+        return [
+            {"product_id": product_id, "sales": round(values[0], 4), "quantity": values[1], "profit": round(values[2], 4), "lines": int(values[3])}
+            for product_id, values in ranked
+        ]
+
+    def _expire(self, slot: int) -> None:
+        """从窗口合计与商品合计中扣除该桶，并清空桶。"""
+        if self._slots[slot] == -1:
+            return
+        bucket_sums = self._sums[slot]
+        for index in range(4):
+            self.totals[index] -= bucket_sums[index]
+            bucket_sums[index] = 0
+        for product_id, values in self._products[slot].items():
+            product_total = self.product_totals[product_id]
+            for index in range(4):
+                product_total[index] -= values[index]
+            if product_total[3] <= 0:
+                del self.product_totals[product_id]
+                self.evicted.add(product_id)
+        self._products[slot] = {}
+        self._slots[slot] = -1
+
+    def _resync(self) -> None:
+        """按各桶小计重新求和窗口合计与商品合计，消除增量加减累积的浮点误差。"""
+        totals = [0.0, 0.0, 0.0, 0]
+        product_totals: Dict[str, List[float]] = {}
+        for slot, bucket_sums in enumerate(self._sums):
+            if self._slots[slot] == -1:
+                continue
+            for index in range(4):
+                totals[index] += bucket_sums[index]
+            for product_id, values in self._products[slot].items():
+                product_total = product_totals.setdefault(product_id, [0.0, 0.0, 0.0, 0])
+                for index in range(4):
+                    product_total[index] += values[index]
+        self.evicted.update(self.product_totals.keys() - product_totals.keys())
+        self.totals = totals
+        self.product_totals = product_totals
+
+
+class RealtimeAggregator:
+    """一个数据集的全部时间窗口，事件写入时同时更新所有窗口。"""
+
+    def __init__(self, windows: Dict[str, Any] = config.EVENT_WINDOWS) -> None:
+        self._lock = threading.Lock()
+        self.windows = {name: SlidingWindow(buckets, seconds) for name, (buckets, seconds) in windows.items()}
+        self._names: Dict[str, str] = {}
+        self.received = 0
+
+    @metrics.timed("events.ingest")
+    def ingest(self, events: Iterable[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, int]:
+        """
+        写入一批订单明细事件。
+
+        :param events: 事件字典，包含 product_id、sales，可选 product_name、quantity、profit、timestamp（秒级时间戳）。
+        :param now: 当前时间戳，晚于此刻的事件按此刻计，默认取系统时间。
+        :return: 计入最长窗口与因过旧被忽略的事件数。
+        """
+        now = time.time() if now is None else now
+        accepted = ignored = 0
+        with self._lock:
+            for event in events:
+                timestamp = min(event.get("timestamp") or now, now)
+                product_id = str(event["product_id"])
+                if event.get("product_name"):
+                    self._names[product_id] = str(event["product_name"])
+                counted = False
+                for window in self.windows.values():
+                    counted |= window.add(timestamp, product_id, float(event["sales"]), float(event.get("quantity", 1)), float(event.get("profit", 0)))
+                if counted:
+                    accepted += 1
+                else:
+                    ignored += 1
+            self.received += accepted
+            self._prune_names()
+        return {"accepted": accepted, "ignored": ignored}
+
+    def summary(self, window: str, top_k: int = config.EVENT_TOP_K, by: str = "sales", now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        返回指定窗口的销售额、利润、数量、明细行数与热销商品。
+
+        :param window: 窗口名，见 config.EVENT_WINDOWS。
+        :param top_k: 热销商品数量。
+        :param by: 商品排序指标，sales、quantity 或 profit。
+        :param now: 当前时间戳，默认取系统时间。
+        :return: 窗口汇总字典。
+        """
+        if window not in self.windows:
+            raise ValueError(f"未知的时间窗口：{window}，可选 {', '.join(self.windows)}")
+        if by not in _RANK_FIELDS:
+            raise ValueError(f"不支持的排序指标：{by}，可选 {', '.join(_RANK_FIELDS)}")
+        now = time.time() if now is None else now
+        target = self.windows[window]
+        with self._lock:
+            # 各窗口一并推进到当前时刻，使已移出全部窗口的商品名称能够及时清理
+            for each in self.windows.values():
+                each.advance(int(now // each.width))
+            sales, quantity, profit, lines = target.totals
+            top = target.top(max(1, top_k), by)
+            self._prune_names()
+            for item in top:
+                item["product_name"] = self._names.get(item["product_id"])
+        return {
+            "window": window,
+            "window_seconds": target.size * target.width,
+            "sales": round(sales, 4),
+            "profit": round(profit, 4),
+            "quantity": quantity,
+            "lines": int(lines),
+            "top_products": top,
+        }
+
+    def _prune_names(self) -> None:
+        """丢弃已移出全部窗口的商品名称，调用方需持有锁。"""
+        evicted: Set[str] = set()
+        for window in self.windows.values():
+            evicted |= window.evicted
+            window.evicted.clear()
+        for product_id in evicted:
+            if not any(product_id in window.product_totals for window in self.windows.values()):
+                self._names.pop(product_id, None)
+
+
+def get_aggregator(dataset_id: Optional[str] = None, known: Optional[Container[str]] = None) -> RealtimeAggregator:
+    """
+    取得数据集对应的实时汇总器，不存在时创建。
+
+    :param dataset_id: 数据集 ID，None 时为默认数据集。
+    :param known: 已注册的数据集 ID 集合，给出时拒绝未注册的 ID，避免任意 ID 各自创建汇总器占用内存。
+    :return: 实时汇总器。
+    """
+    dataset_id = dataset_id or config.DEFAULT_DATASET_ID
+    if known is not None and dataset_id not in known:
+        raise KeyError(dataset_id)
+    aggregator = _AGGREGATORS.get(dataset_id)
+    if aggregator is None:
+        with _AGGREGATORS_LOCK:
+            aggregator = _AGGREGATORS.setdefault(dataset_id, RealtimeAggregator())
+    return aggregator
@@ -1,17 +1,45 @@
 """客户推荐模块。"""
+import threading
 from typing import Dict
 
 import pandas as pd
 
 from backend import config
-from backend.data_loader import DataRepository
+from backend.data_loader import DatasetSnapshot, is_live_version
+from backend.utils import metrics
 from backend.utils.logger import LOGGER
 
+# 按数据版本缓存商品共现矩阵，同一版本下所有推荐请求共用
+_CO_OCCURRENCE_CACHE: Dict[int, Dict[str, Dict[str, float]]] = {}
+_CO_OCCURRENCE_LOCK = threading.Lock()
+
+
+def get_co_occurrence(repo: DatasetSnapshot) -> Dict[str, Dict[str, float]]:
+    """
+    获取当前数据版本的商品共现矩阵，未命中缓存时构建并保存。
+
+    :param repo: 数据快照。
+    :return: 商品到共现商品及次数的嵌套字典，调用方不应修改。
+    """
+    cached = _CO_OCCURRENCE_CACHE.get(repo.version)
+    if cached is not None:
+        return cached
+    with _CO_OCCURRENCE_LOCK:
+        cached = _CO_OCCURRENCE_CACHE.get(repo.version)
+        if cached is not None:
+            return cached
+        co_matrix = Recommender(repo)._build_co_occurrence()
+        for stale in [version for version in _CO_OCCURRENCE_CACHE if not is_live_version(version)]:
+            _CO_OCCURRENCE_CACHE.pop(stale, None)
+        _CO_OCCURRENCE_CACHE[repo.version] = co_matrix
+        LOGGER.info("已缓存商品共现矩阵：数据版本 %s，商品 %s 个。", repo.version, len(co_matrix))
+        return co_matrix
+
 
 class Recommender:
     """基于购买频次和共现的简单推荐器。"""
 
-    def __init__(self, repo: DataRepository) -> None:
+    def __init__(self, repo: DatasetSnapshot) -> None:
         self.repo = repo
 
     def get_customer_history(self, customer_id: str) -> pd.DataFrame:
@@ -41,7 +69,7 @@ class Recommender:
         if user_df.empty:
             LOGGER.warning("客户 %s 暂无历史订单，拒绝返回随机推荐。", customer_id)
             raise ValueError("未找到该客户历史订单，请输入有效客户编号。")
-        co_matrix = self._build_co_occurrence()
+        co_matrix = get_co_occurrence(self.repo)
         scores: Dict[str, float] = {}
         purchased = set(user_df["product_id"].unique())
         for product in purchased:
@@ -82,12 +110,13 @@ class Recommender:
                 raise ValueError(f"客户名称匹配多个编号：{id_list}，请使用客户编号重试。")
         raise ValueError("未找到该客户历史订单，请输入有效客户编号。")
 
+    @metrics.timed("recommend.co_occurrence")
     def _build_co_occurrence(self) -> Dict[str, Dict[str, float]]:
         """计算商品共现矩阵，用于共现推荐。"""
         if self.repo.raw_df is None:
             return {}
         co_matrix: Dict[str, Dict[str, float]] = {}
-        grouped = self.repo.raw_df.groupby("order_id")
+        grouped = self.repo.raw_df.groupby("order_id", observed=True)
         for _, group in grouped:
             items = group["product_id"].dropna().unique()
             for i, item_i in enumerate(items):
@@ -0,0 +1,116 @@
+"""相似客户检索模块，基于标准化 RFM 与品类消费构建空间索引。"""
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend import config
+from backend.data_loader import DatasetSnapshot, is_live_version
+from backend.modules import clustering
+from backend.utils.importing import lazy_import
+from backend.utils.logger import LOGGER
+
+# 按 (数据版本, 是否包含品类消费) 缓存空间索引，同一数据版本只构建一次
+_INDEX_CACHE: Dict[Tuple[int, bool], Dict[str, object]] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def build_similarity_index(repo: DatasetSnapshot, include_category: bool = False) -> Dict[str, object]:
+    """
+    获取当前数据版本下的客户相似度索引，未命中缓存时构建。
+
+    :param repo: 数据快照。
+    :param include_category: 是否拼接各品类消费占比作为额外特征。
+    :return: 包含 tree、customer_ids、features、positions 的字典。
+    """
+    key = (repo.version, include_category)
+    cached = _INDEX_CACHE.get(key)
+    if cached is not None:
+        return cached
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None:
+            return cached
+        rfm_df = clustering.calc_rfm(repo)
+        if rfm_df.empty:
+            raise ValueError("RFM 数据为空，无法构建相似度索引。")
+        features = lazy_import("sklearn.preprocessing").StandardScaler().fit_transform(rfm_df[["R", "F", "M"]].fillna(0))
+        if include_category:
+            features = np.hstack([features, _category_share(repo, rfm_df["customer_id"])])
+        customer_ids = rfm_df["customer_id"].astype(str).to_numpy()
+        entry: Dict[str, object] = {
+            "tree": lazy_import("sklearn.neighbors").KDTree(features),
+            "customer_ids": customer_ids,
+            "features": features,
+            "positions": {cid: pos for pos, cid in enumerate(customer_ids)},
+        }
+        for stale in [item for item in _INDEX_CACHE if not is_live_version(item[0])]:
+            _INDEX_CACHE.pop(stale, None)
+        _INDEX_CACHE[key] = entry
+        LOGGER.info("已构建客户相似度索引：数据版本 %s，客户 %s 个，特征维度 %s。", repo.version, len(customer_ids), features.shape[1])
+        return entry
+
+
+def find_similar_customers(
+    repo: DatasetSnapshot,
+    customer_ids: List[str],
+    top_n: int = config.DEFAULT_TOP_N,
+    include_category: bool = False,
+) -> Dict[str, object]:
+    """
+    批量查询与种子客户最相似的客户。
+
+    :param repo: 数据快照。
+    :param customer_ids: 种子客户编号列表。
+    :param top_n: 每个种子返回的相似客户数量，同时也是合并人群的规模。
+    :param include_category: 是否使用品类消费特征。
+    :return: 包含 seeds（逐个种子的近邻）、audience（合并去重后的相似人群）与 missing（未找到的编号）的字典。
+    """
+    if top_n <= 0:
+        raise ValueError("相似客户数量需大于 0。")
+    entry = build_similarity_index(repo, include_category)
+    positions: Dict[str, int] = entry["positions"]
+    seeds = [str(cid).strip() for cid in customer_ids]
+    found = [cid for cid in seeds if cid in positions]
+    missing = [cid for cid in seeds if cid not in positions]
+    if not found:
+        raise ValueError("未找到种子客户，请输入有效客户编号。")
+
+    all_ids: np.ndarray = entry["customer_ids"]
+    seed_set = set(found)
+    # 多取种子数量个近邻，保证剔除种子自身后仍有 top_n 个结果
+    k = min(len(all_ids), top_n + len(seed_set))
+    query = entry["features"][[positions[cid] for cid in found]]
+    distances, indices = entry["tree"].query(query, k=k)
+
+    seed_results: List[Dict[str, object]] = []
+    best: Dict[str, float] = {}
+    for seed, dist_row, idx_row in zip(found, distances, indices):
+        neighbors: List[Dict[str, object]] = []
+        for dist, idx in zip(dist_row, idx_row):
+            cid = str(all_ids[idx])
+            if cid in seed_set:
+                continue
+            neighbors.append({"customer_id": cid, "distance": float(dist)})
+            best[cid] = min(best.get(cid, float("inf")), float(dist))
+            if len(neighbors) >= top_n:
+                break
+        seed_results.append({"seed": seed, "neighbors": neighbors})
+
+    audience = sorted(best.items(), key=lambda item: item[1])[:top_n]
+    return {
+        "seeds": seed_results,
+        "audience": [{"customer_id": cid, "distance": dist} for cid, dist in audience],
+        "missing": missing,
+    }
+
+
+def _category_share(repo: DatasetSnapshot, customer_ids: pd.Series) -> np.ndarray:
+    """计算客户在各品类上的消费占比矩阵，行顺序与 customer_ids 一致。"""
+    if repo.raw_df is None or "category" not in repo.raw_df:
+        return np.zeros((len(customer_ids), 0))
+    spend = repo.raw_df.pivot_table(index="customer_id", columns="category", values="sales", aggfunc="sum", fill_value=0, observed=True)
+    spend = spend.reindex(customer_ids).fillna(0)
+    totals = spend.sum(axis=1).replace(0, 1)
+    return spend.div(totals, axis=0).to_numpy()
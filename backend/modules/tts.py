@@ -1,28 +1,154 @@
 """语音播报模块，支持本地 TTS 与 MiniMax 云端合成。"""
+import hashlib
+import json
 import os
 import subprocess
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from urllib.parse import urlparse
 
-import pyttsx3
-import requests
-
 from backend import config
+from backend.utils.importing import lazy_import
 from backend.utils.logger import LOGGER, ensure_dirs
 
+if TYPE_CHECKING:  # 本地语音引擎与 HTTP 客户端仅在实际播报时加载
+    import pyttsx3
+
 # 由于 aurastd 接口为同步返回，这里使用内存缓存模拟任务，以兼容前端轮询逻辑
 _MINIMAX_TASK_CACHE: Dict[str, Dict[str, str]] = {}
 _AUDIO_PLAYER_PROCESS: Optional[subprocess.Popen] = None
-_LOCAL_TTS_ENGINE: Optional[pyttsx3.Engine] = None
+_LOCAL_TTS_ENGINE: Optional["pyttsx3.Engine"] = None
+
+
+class AudioCache:
+    """
+    按内容寻址的云端音频磁盘缓存。
+
+    文件名为合成参数的哈希，内存中以 OrderedDict 维护 文件名 -> 文件大小 的 LRU 索引，首次使用时按文件修改时间
+    从磁盘重建；命中时刷新修改时间，使重启后仍保留最近使用顺序。写入后总大小超出上限时从最久未用的文件开始删除，
+    刚写入的文件不会被淘汰。多个 worker 共用目录时，索引中没有但磁盘上存在的文件同样视为命中。
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """以文本、发音设置、音频设置与模型计算缓存键，其余字段不影响音频内容。"""
+        material = {name: payload.get(name) for name in ("text", "voice_setting", "audio_setting", "model")}
+        return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, suffix: str = "mp3") -> Optional[str]:
+        """
+        查找缓存音频，命中时提升为最近使用。
+
+        :param key: make_key 计算的缓存键。
+        :param suffix: 音频格式后缀。
+        :return: 本地文件路径，未命中返回 None。
+        """
+        name = f"{key}.{suffix}"
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            self._ensure_loaded()
+            try:
+                size = os.path.getsize(path)
+                os.utime(path)
+            except OSError:
+                self._forget(name)
+                self.misses += 1
+                return None
+            if name in self._index:
+                self._index.move_to_end(name)
+            else:
+                self._index[name] = size
+                self._bytes += size
+            self.hits += 1
+            return path
+
+    def put(self, key: str, data: bytes, suffix: str = "mp3") -> str:
+        """
+        写入音频并按容量上限淘汰最久未用的文件。
+
+        :param key: make_key 计算的缓存键。
+        :param data: 音频字节。
+        :param suffix: 音频格式后缀。
+        :return: 本地文件路径。
+        """
+        name = f"{key}.{suffix}"
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            self._ensure_loaded()
+            os.makedirs(self.directory, exist_ok=True)
+            # 先写临时文件再原子替换，避免其它 worker 读到半个文件
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+            self._forget(name)
+            self._index[name] = len(data)
+            self._bytes += len(data)
+            self._evict(keep=name)
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        """返回缓存条目数、占用字节、容量上限与命中统计。"""
+        with self._lock:
+            return {"entries": len(self._index), "bytes": self._bytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
 
+    def _ensure_loaded(self) -> None:
+        """首次使用时扫描缓存目录，按修改时间从旧到新重建 LRU 索引。"""
+        if self._loaded:
+            return
+        self._loaded = True
+        entries = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._bytes += size
+        self._evict()
 
-def _get_tts_engine() -> pyttsx3.Engine:
+    def _forget(self, name: str) -> None:
+        size = self._index.pop(name, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """从最久未用的文件开始删除，直至不超过容量上限。"""
+        for name in list(self._index):
+            if self._bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            self._forget(name)
+            LOGGER.info("语音缓存超出容量，已淘汰：%s", name)
+
+
+_AUDIO_CACHE = AudioCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _get_tts_engine() -> "pyttsx3.Engine":
     global _LOCAL_TTS_ENGINE
     if _LOCAL_TTS_ENGINE is None:
-        _LOCAL_TTS_ENGINE = pyttsx3.init()
+        _LOCAL_TTS_ENGINE = lazy_import("pyttsx3").init()
     return _LOCAL_TTS_ENGINE
 
 
@@ -65,8 +191,7 @@ def speak(text: str) -> None:
 
 
 def submit_minimax_task(text: str, voice_id: Optional[str] = None) -> Dict[str, str]:
-    """调用 aurastd TTS，同步获取结果，落盘存档后写入缓存并尝试自动播报。"""
-    _check_minimax_settings()
+    """调用 aurastd TTS，同步获取结果，落盘存档后写入缓存并尝试自动播报；相同参数的音频已缓存时直接复用，不访问网络，也无需配置密钥。"""
     ensure_dirs()
     payload: Dict[str, object] = {
         "text": text,
@@ -88,9 +213,20 @@ def submit_minimax_task(text: str, voice_id: Optional[str] = None) -> Dict[str,
     if config.MINIMAX_TTS_MODEL:
         payload["model"] = config.MINIMAX_TTS_MODEL
 
+    cache_key = _AUDIO_CACHE.make_key(payload)
+    audio_format = str(payload["audio_setting"]["format"])
+    cached_path = _AUDIO_CACHE.get(cache_key, audio_format)
+    if cached_path:
+        LOGGER.info("命中本地语音缓存：%s", cached_path)
+        return _register_task(
+            {"status": "success", "audio_url": "", "audio_hex": "", "local_path": cached_path, "message": "命中本地语音缓存"},
+            "命中本地语音缓存，无需重新合成",
+        )
+
+    _check_minimax_settings()
     headers = _build_headers()
-    LOGGER.info("调用 aurastd 语音合成，请求载荷: %s", payload)
-    resp = requests.post(
+    LOGGER.info("调用 aurastd 语音合成：文本 %s 字，发音人 %s，模型 %s", len(text), payload["voice_setting"]["voice_id"], payload.get("model", "默认"))
+    resp = lazy_import("requests").post(
         f"{config.MINIMAX_API_BASE}/tts",
         headers=headers,
         json=payload,
@@ -106,7 +242,6 @@ def submit_minimax_task(text: str, voice_id: Optional[str] = None) -> Dict[str,
         LOGGER.error("MiniMax 返回缺少音频数据，原始响应：%s", data)
         raise RuntimeError("MiniMax 返回结果缺少音频链接或数据。")
 
-    task_id = uuid.uuid4().hex
     status = data.get("status", "success")
     cache_value = {
         "status": "success" if str(status).lower() in {"ok", "success", "2"} else "processing",
@@ -116,7 +251,14 @@ def submit_minimax_task(text: str, voice_id: Optional[str] = None) -> Dict[str,
         "message": "语音生成成功",
     }
     if cache_value["status"] == "success":
-        cache_value["local_path"] = _save_audio(task_id, cache_value["audio_url"], cache_value["audio_hex"])
+        cache_value["local_path"] = _save_audio(cache_key, audio_format, cache_value["audio_url"], cache_value["audio_hex"])
+    return _register_task(cache_value, "语音生成成功，可通过状态接口获取结果")
+
+
+def _register_task(cache_value: Dict[str, str], message: str) -> Dict[str, str]:
+    """登记任务结果供状态接口查询，并尝试自动播报已落盘的音频。"""
+    task_id = uuid.uuid4().hex
+    if cache_value["local_path"]:
         _try_play_audio(cache_value["local_path"])
     _MINIMAX_TASK_CACHE[task_id] = cache_value
     LOGGER.info("MiniMax 任务提交成功，task_id=%s", task_id)
@@ -125,13 +267,12 @@ def submit_minimax_task(text: str, voice_id: Optional[str] = None) -> Dict[str,
         "status": cache_value["status"],
         "audio_url": cache_value["audio_url"],
         "local_path": cache_value["local_path"],
-        "message": "语音生成成功，可通过状态接口获取结果",
+        "message": message,
     }
 
 
 def query_minimax_task(task_id: str) -> Dict[str, str]:
-    """轮询 MiniMax 任务状态，返回音频地址等信息。"""
-    _check_minimax_settings()
+    """轮询 MiniMax 任务状态，返回音频地址等信息；任务结果保存在本进程内，查询不访问网络。"""
     if task_id not in _MINIMAX_TASK_CACHE:
         raise RuntimeError("未找到对应的语音任务，请确认 task_id 是否有效。")
     result = _MINIMAX_TASK_CACHE[task_id]
@@ -175,22 +316,21 @@ def _is_url(value: str) -> bool:
     return parsed.scheme in {"http", "https"} and bool(parsed.netloc)
 
 
-def _save_audio(task_id: str, audio_url: str, audio_hex: str) -> str:
-    """将云端返回的音频保存到本地，便于归档与离线播放。"""
-    os.makedirs(config.TTS_AUDIO_DIR, exist_ok=True)
-    target_path = Path(config.TTS_AUDIO_DIR) / f"{task_id}.mp3"
+def _save_audio(cache_key: str, audio_format: str, audio_url: str, audio_hex: str) -> str:
+    """将云端返回的音频写入本地缓存，便于归档、离线播放与相同文本复用。"""
     try:
         if audio_url:
-            resp = requests.get(audio_url, timeout=30, verify=False)
+            resp = lazy_import("requests").get(audio_url, timeout=30, verify=False)
             resp.raise_for_status()
-            target_path.write_bytes(resp.content)
+            content = resp.content
         elif audio_hex:
-            target_path.write_bytes(bytes.fromhex(audio_hex))
+            content = bytes.fromhex(audio_hex)
         else:
             LOGGER.warning("音频内容为空，未生成文件。")
             return ""
+        target_path = _AUDIO_CACHE.put(cache_key, content, audio_format)
         LOGGER.info("已保存云端音频到本地：%s", target_path)
-        return str(target_path)
+        return target_path
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("保存云端音频失败：%s", exc)
         return ""
@@ -0,0 +1,121 @@
+"""接口准入控制工具，为计算密集型接口提供并发上限、有界等待队列与排队超时。"""
+import asyncio
+import math
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+
+class AdmissionRejected(Exception):
+    """请求未获准入时抛出，携带建议的 HTTP 状态码与重试秒数。"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class EndpointLimiter:
+    """
+    单个接口的准入闸门。
+
+    运行在事件循环中，排队的请求只占用协程而不占用线程池，计算密集型请求再多也不会挤占轻量接口的线程。
+    """
+
+    def __init__(self, concurrency: int, queue_size: int, queue_timeout: float) -> None:
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> None:
+        """获取执行名额，队列已满时抛出 429，排队超时抛出 503。"""
+        retry_after = max(1, math.ceil(self.queue_timeout))
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise AdmissionRejected(429, "当前分析请求过多，请稍后重试", retry_after)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError as exc:
+                self.timed_out += 1
+                raise AdmissionRejected(503, "分析请求排队超时，请稍后重试", retry_after) from exc
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+
+    def release(self) -> None:
+        """归还执行名额。"""
+        self.active -= 1
+        self._semaphore.release()
+
+    def release_after(self, body: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """
+        包装响应体迭代器，在响应体全部发送完毕（或客户端断开）后才归还名额，使流式导出同样受并发上限约束。
+
+        :param body: 原响应体迭代器。
+        :return: 发送完毕后归还名额的迭代器。
+        """
+        async def wrapped() -> AsyncIterator[Any]:
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                self.release()
+
+        return wrapped()
+
+    def stats(self) -> Dict[str, float]:
+        """返回当前并发、排队与拒绝统计。"""
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class AdmissionController:
+    """
+    按请求方法与路径查找对应的准入闸门，未配置的组合不受限制。
+
+    同一条规则下配置的各方法共用一个闸门；规则的 paths 列出的其它路径也并入该闸门，
+    用于会触发同类计算的接口（如归类在模型未命中时会训练聚类模型）。
+    """
+
+    # 预检与 HEAD 请求不执行接口逻辑，从不占用名额
+    EXEMPT_METHODS = frozenset({"OPTIONS", "HEAD"})
+
+    def __init__(self, limits: Dict[str, Dict[str, Any]]) -> None:
+        self._limiters: Dict[str, EndpointLimiter] = {}
+        self._routes: Dict[Tuple[str, str], EndpointLimiter] = {}
+        for path, rule in limits.items():
+            limiter = EndpointLimiter(int(rule["concurrency"]), int(rule["queue"]), float(rule["timeout"]))
+            self._limiters[path] = limiter
+            for route in [path, *rule.get("paths", [])]:
+                for method in rule.get("methods", ["POST"]):
+                    self._routes[(str(method).upper(), route)] = limiter
+
+    def get(self, method: str, path: str) -> Optional[EndpointLimiter]:
+        """返回请求方法与路径对应的闸门，没有或为豁免方法时返回 None。"""
+        method = method.upper()
+        if method in self.EXEMPT_METHODS:
+            return None
+        return self._routes.get((method, path))
+
+    def total_concurrency(self) -> int:
+        """返回所有受限接口的并发上限之和。"""
+        return sum(limiter.concurrency for limiter in self._limiters.values())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """返回各受限接口的统计。"""
+        return {path: limiter.stats() for path, limiter in self._limiters.items()}
@@ -1,6 +1,7 @@
-"""导出工具，负责结果输出为 CSV。"""
+"""导出工具，负责结果输出为 CSV 文件或分块流式的 CSV/Parquet。"""
+import zlib
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, List, Optional
 
 import pandas as pd
 
@@ -24,3 +25,89 @@ def export_dataframe(df: pd.DataFrame, name: str, directory: Optional[str] = Non
     df.to_csv(path, index=False, encoding="utf-8-sig")
     LOGGER.info("数据已导出：%s", path)
     return path
+
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = config.EXPORT_CHUNK_ROWS, compress: bool = False) -> Iterator[bytes]:
+    """
+    按行分块生成 CSV 字节流，首块带 BOM 与表头，内存占用只与块大小相关。
+
+    :param df: 需要导出的数据框。
+    :param chunk_rows: 每块行数。
+    :param compress: 是否输出 gzip 压缩流。
+    :return: 字节块迭代器。
+    """
+    chunks = _iter_csv_text(df, chunk_rows)
+    if not compress:
+        yield from chunks
+        return
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_parquet(df: pd.DataFrame, chunk_rows: int = config.EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    按行组分块生成 Parquet 字节流，每写完一个行组即交出已生成的字节。
+
+    :param df: 需要导出的数据框。
+    :param chunk_rows: 每个行组的行数。
+    :return: 字节块迭代器。
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("导出 Parquet 需要安装 pyarrow。") from exc
+    sink = _ChunkSink()
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for start in range(0, len(df), chunk_rows):
+            table = pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False)
+            writer.write_table(table)
+            yield from sink.drain()
+    finally:
+        writer.close()
+    yield from sink.drain()
+
+
+def _iter_csv_text(df: pd.DataFrame, chunk_rows: int) -> Iterator[bytes]:
+    """逐块序列化为 UTF-8 CSV，仅首块写 BOM 与表头。"""
+    if df.empty:
+        yield df.to_csv(index=False).encode("utf-8-sig")
+        return
+    for start in range(0, len(df), chunk_rows):
+        first = start == 0
+        text = df.iloc[start:start + chunk_rows].to_csv(index=False, header=first)
+        yield text.encode("utf-8-sig" if first else "utf-8")
+
+
+class _ChunkSink:
+    """供 ParquetWriter 写入的只追加文件对象，写入的字节由生成器及时取走。"""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> Iterator[bytes]:
+        parts, self._parts = self._parts, []
+        if parts:
+            yield b"".join(parts)
@@ -0,0 +1,108 @@
+"""
+重量级依赖的延迟导入与导入耗时报告。
+
+statsmodels、mlxtend、scikit-learn、pyttsx3、matplotlib 等依赖只在首次真正用到时导入，
+worker 启动只需加载 FastAPI 与 pandas；首次导入耗时会被记录，便于确认冷启动代价转移到了哪里。
+
+命令行：python -m backend.utils.importing [目标模块] 输出冷启动导入耗时按模块分解。
+"""
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, List
+
+# 延迟导入的依赖在首次使用时的导入耗时（秒）
+_FIRST_USE_COSTS: Dict[str, float] = {}
+_lock = threading.Lock()
+
+HEAVY_MODULES = ["sklearn", "statsmodels", "mlxtend", "scipy", "pyttsx3", "matplotlib", "requests"]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    导入模块，首次导入时记录耗时；已导入时只是一次字典查找。
+
+    :param name: 模块全名，如 "sklearn.cluster"。
+    :return: 模块对象。
+    """
+    module = sys.modules.get(name)
+    # 其它线程正在导入时模块已在 sys.modules 中但尚未初始化完毕，需走 import_module 等待导入锁
+    if module is not None and not getattr(getattr(module, "__spec__", None), "_initializing", False):
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _FIRST_USE_COSTS.setdefault(name, round(elapsed, 4))
+    return module
+
+
+def runtime_report() -> Dict[str, Any]:
+    """返回当前进程中各延迟依赖的首次导入耗时与已加载的重量级顶层包。"""
+    with _lock:
+        costs = dict(_FIRST_USE_COSTS)
+    return {
+        "first_use_seconds": costs,
+        "loaded_heavy_packages": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def cold_import_report(target: str = "backend.main", top: int = 20) -> Dict[str, Any]:
+    """
+    在全新子进程中以 -X importtime 导入目标模块，按模块汇总累计导入耗时。
+
+    :param target: 待测模块。
+    :param top: 返回耗时最高的模块数。
+    :return: 包含总耗时、顶层包耗时与耗时最高模块的字典。
+    """
+    command = [sys.executable, "-X", "importtime", "-c", f"import {target}"]
+    completed = subprocess.run(command, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise ValueError(f"导入 {target} 失败：{completed.stderr.strip().splitlines()[-1:]}")
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2,
+            })
+    packages: Dict[str, float] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + entry["self_ms"]
+    total = next((entry["cumulative_ms"] for entry in entries if entry["module"] == target), sum(packages.values()))
+    return {
+        "target": target,
+        "total_ms": round(total, 1),
+        "by_package_ms": {name: round(cost, 1) for name, cost in sorted(packages.items(), key=lambda item: -item[1])[:top]},
+        "slowest_modules": [
+            {key: entry[key] for key in ("module", "cumulative_ms", "self_ms")}
+            for entry in sorted(entries, key=lambda item: -item["cumulative_ms"])[:top]
+        ],
+        "heavy_packages_loaded": [name for name in HEAVY_MODULES if any(entry["module"] == name for entry in entries)],
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"导入 {report['target']} 共 {report['total_ms']:.1f} ms")
+    print("按顶层包（自身耗时合计）：")
+    for name, cost in report["by_package_ms"].items():
+        print(f"  {name:<24} {cost:>9.1f} ms")
+    print(f"已加载的重量级依赖：{', '.join(report['heavy_packages_loaded']) or '无'}")
+
+
+def main(argv: List[str]) -> None:
+    _print_report(cold_import_report(argv[0] if argv else "backend.main"))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,10 +1,22 @@
-"""日志工具，统一中文日志格式。"""
+"""日志工具，统一中文日志格式。
+
+业务线程只把日志记录放入有界队列，由后台 QueueListener 负责格式化与写盘；
+文件按大小与时间双重条件轮转，可选输出 JSON Lines，高频的 INFO 日志按调用位置采样。
+"""
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from typing import Optional
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from backend import config
 
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+
 
 def ensure_dirs() -> None:
     """确保输出目录存在。"""
@@ -14,6 +26,117 @@ def ensure_dirs() -> None:
     os.makedirs(config.TTS_AUDIO_DIR, exist_ok=True)
 
 
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """按时间轮转的同时限制单个文件大小，同一时间段内多次按大小轮转时以序号区分归档文件。"""
+
+    def __init__(self, filename: str, max_bytes: int, when: str, backup_count: int) -> None:
+        super().__init__(filename, when=when, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+        self.namer = self._unique_name
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.max_bytes
+
+    @staticmethod
+    def _unique_name(default_name: str) -> str:
+        if not os.path.exists(default_name):
+            return default_name
+        index = 1
+        while os.path.exists(f"{default_name}.{index}"):
+            index += 1
+        return f"{default_name}.{index}"
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃日志而不阻塞业务线程，并统计丢弃条数。"""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按调用位置对高频 INFO/DEBUG 日志采样。
+
+    每个时间窗口内同一位置的前 burst 条全部输出，之后每 every 条输出一条；放行的记录带 sample_rate
+    （1 表示未采样）与 sample_suppressed（距上条放行被抑制的条数）属性，由格式化器输出，不改写消息本身。
+    WARNING 及以上级别从不采样。
+    """
+
+    def __init__(self, window: float, burst: int, every: int) -> None:
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.every = max(1, every)
+        self._lock = threading.Lock()
+        self._sites: Dict[Tuple[str, int], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            record.sample_rate, record.sample_suppressed = 1, 0
+            return True
+        key = (record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            state = self._sites.get(key)
+            if state is None or now - state[0] >= self.window:
+                state = self._sites[key] = [now, 0, 0]
+            state[1] += 1
+            if state[1] <= self.burst:
+                rate = 1
+            elif (state[1] - self.burst) % self.every == 0:
+                rate = self.every
+            else:
+                state[2] += 1
+                return False
+            suppressed, state[2] = int(state[2]), 0
+        record.sample_rate, record.sample_suppressed = rate, suppressed
+        return True
+
+
+class SampledFormatter(logging.Formatter):
+    """文本格式化器，在采样放行的日志末尾注明被抑制的条数。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "sample_suppressed", 0)
+        return f"{text}（同位置已采样抑制 {suppressed} 条）" if suppressed else text
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，便于日志平台解析。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if getattr(record, "sample_rate", 1) > 1:
+            payload["sample_rate"] = record.sample_rate
+            payload["sample_suppressed"] = record.sample_suppressed
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
 def init_logger(level: str = config.LOG_LEVEL, log_file: Optional[str] = config.LOG_FILE) -> logging.Logger:
     """
     初始化全局日志记录器。
@@ -22,22 +145,51 @@ def init_logger(level: str = config.LOG_LEVEL, log_file: Optional[str] = config.
     :param log_file: 日志文件路径，None 时仅输出到控制台。
     :return: 配置完成的 Logger 对象。
     """
+    global _LISTENER
     ensure_dirs()
     logger = logging.getLogger("supermarket_ai")
     if logger.handlers:
         return logger
     logger.setLevel(getattr(logging, level.upper(), logging.INFO))
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    logger.propagate = config.LOG_PROPAGATE
+    formatter: logging.Formatter = (
+        JsonLinesFormatter() if config.LOG_JSON else SampledFormatter("%(asctime)s - %(levelname)s - %(message)s")
+    )
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers: List[logging.Handler] = [console_handler]
 
     if log_file:
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_file, config.LOG_MAX_BYTES, config.LOG_ROTATE_WHEN, config.LOG_BACKUP_COUNT,
+        )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLE_WINDOW, config.LOG_SAMPLE_BURST, config.LOG_SAMPLE_EVERY))
+    logger.addHandler(queue_handler)
+    _LISTENER = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(shutdown_logger)
     return logger
 
 
+def shutdown_logger() -> None:
+    """停止后台写日志线程，并写完队列中剩余的日志。"""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+def logger_stats() -> Dict[str, int]:
+    """返回日志队列积压与丢弃条数。"""
+    for handler in LOGGER.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            return {"queued": handler.queue.qsize(), "dropped": handler.dropped}
+    return {"queued": 0, "dropped": 0}
+
+
 LOGGER = init_logger()
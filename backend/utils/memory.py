@@ -0,0 +1,193 @@
+"""
+进程内存诊断：估算数据视图与各缓存的深度内存占用，并以 tracemalloc 对比两次快照之间的分配位置。
+
+缓存由各模块在启动时通过 register_cache 登记取值函数，只在调用 cache_report 时才遍历计算，
+平时没有任何开销；tracemalloc 仅在显式开启后才追踪分配。
+"""
+import sys
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_CACHES: Dict[str, Callable[[], Any]] = {}
+_TRACE_LOCK = threading.Lock()
+_TRACE_BASELINE: Optional[tracemalloc.Snapshot] = None
+# tracemalloc 统计时忽略自身与导入机制的分配
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+def register_cache(name: str, getter: Callable[[], Any]) -> None:
+    """
+    登记一个需要统计内存的缓存。
+
+    :param name: 缓存名称。
+    :param getter: 返回缓存容器（字典或列表等）的无参函数。
+    """
+    _CACHES[name] = getter
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    估算对象及其引用对象的总字节数，同一对象只计一次。
+
+    数据框与序列按 memory_usage(deep=True) 计算，numpy 数组按缓冲区大小计算，
+    其余对象递归遍历容器元素与实例属性。
+
+    :param obj: 待统计对象。
+    :return: 估算字节数。
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if item is None or id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, pd.DataFrame):
+            total += int(item.memory_usage(index=True, deep=True).sum())
+        elif isinstance(item, (pd.Series, pd.Index)):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, np.ndarray):
+            total += sys.getsizeof(item) if item.base is None else item.nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel().tolist())
+        elif isinstance(item, (str, bytes, bytearray, int, float, bool)):
+            total += sys.getsizeof(item)
+        elif isinstance(item, dict):
+            total += sys.getsizeof(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(item)
+            stack.extend(item)
+        else:
+            total += sys.getsizeof(item)
+            # scikit-learn 的 KDTree 等扩展类型不暴露 __dict__，通过 get_arrays 取得底层数组
+            get_arrays = getattr(item, "get_arrays", None)
+            if callable(get_arrays):
+                stack.extend(get_arrays())
+            stack.extend(getattr(item, "__dict__", {}).values())
+    return total
+
+
+def cache_report() -> Dict[str, Dict[str, int]]:
+    """
+    统计所有已登记缓存的条目数与深度内存占用。
+
+    :return: 以缓存名为键，包含 entries、bytes 的字典。
+    """
+    report: Dict[str, Dict[str, int]] = {}
+    for name, getter in _CACHES.items():
+        container = getter()
+        report[name] = {
+            "entries": len(container) if hasattr(container, "__len__") else 1,
+            "bytes": deep_sizeof(container),
+        }
+    return report
+
+
+def process_report() -> Dict[str, Optional[int]]:
+    """返回进程当前常驻内存与峰值常驻内存（字节），不支持的平台返回 None。"""
+    rss: Optional[int] = None
+    peak: Optional[int] = None
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if peak is None:
+        try:
+            import resource
+
+            # macOS 下单位为字节，Linux 下为 KB
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = peak if sys.platform == "darwin" else peak * 1024
+        except (ImportError, OSError):
+            pass
+    return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+def trace_start(frames: int = 1) -> Dict[str, Any]:
+    """
+    开启 tracemalloc 并记录基准快照。
+
+    :param frames: 每个分配位置保留的调用栈帧数。
+    :return: 追踪状态。
+    """
+    global _TRACE_BASELINE
+    with _TRACE_LOCK:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, frames))
+        _TRACE_BASELINE = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        return trace_status()
+
+
+def trace_diff(top: int = 20, group_by: str = "lineno", rebase: bool = False) -> Dict[str, Any]:
+    """
+    取当前快照与基准快照比较，返回内存增长最多的分配位置。
+
+    :param top: 返回的位置数。
+    :param group_by: 聚合方式，lineno、filename 或 traceback。
+    :param rebase: 比较后是否以当前快照作为新的基准。
+    :return: 包含各位置增量与当前追踪内存的字典。
+    """
+    global _TRACE_BASELINE
+    if group_by not in {"lineno", "filename", "traceback"}:
+        raise ValueError("group_by 仅支持 lineno、filename 或 traceback。")
+    with _TRACE_LOCK:
+        if not tracemalloc.is_tracing() or _TRACE_BASELINE is None:
+            raise ValueError("尚未开启 tracemalloc，请先以 trace=start 记录基准快照。")
+        current = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        stats = current.compare_to(_TRACE_BASELINE, group_by)
+        if rebase:
+            _TRACE_BASELINE = current
+    return {
+        **trace_status(),
+        "top": [
+            {
+                "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[: max(1, top)]
+        ],
+    }
+
+
+def trace_stop() -> Dict[str, Any]:
+    """停止 tracemalloc 并丢弃基准快照。"""
+    global _TRACE_BASELINE
+    with _TRACE_LOCK:
+        _TRACE_BASELINE = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return trace_status()
+
+
+def trace_status() -> Dict[str, Any]:
+    """返回 tracemalloc 是否开启及当前/峰值追踪内存。"""
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {"tracing": True, "traced_bytes": current, "traced_peak_bytes": peak, "frames": tracemalloc.get_traceback_limit()}
+
+
+def summarize(views: Dict[str, Dict[str, object]], caches: Dict[str, Dict[str, int]]) -> List[Dict[str, object]]:
+    """按字节数从大到小合并视图与缓存，便于一眼看出占用最大的部分。"""
+    items = [{"kind": "view", "name": name, "bytes": int(item["bytes"])} for name, item in views.items()]
+    items += [{"kind": "cache", "name": name, "bytes": item["bytes"]} for name, item in caches.items()]
+    return sorted(items, key=lambda item: -item["bytes"])
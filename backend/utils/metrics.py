@@ -0,0 +1,168 @@
+"""轻量级运行指标工具，记录接口耗时与分阶段耗时直方图，并以 Prometheus 文本格式输出。"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 直方图桶上界（秒），覆盖毫秒级查询到分钟级模型训练
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_PREFIX = "supermarket"
+
+
+class Histogram:
+    """带标签的累计直方图，每组标签只维护桶计数、总和与次数，记录开销为一次二分查找加一次加锁。"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], seconds: float) -> None:
+        """记录一次耗时，series 布局为 [各桶计数..., 总和, 次数]。"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        """输出 Prometheus 文本格式行，桶计数在此处才做累加。"""
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(snapshot.items()):
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _join_labels(base, _format_labels(("le",), (f"{bound:g}",)))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative:g}")
+            inf_labels = _join_labels(base, _format_labels(("le",), ("+Inf",)))
+            lines.append(f"{self.name}_bucket{inf_labels} {series[-1]:g}")
+            lines.append(f"{self.name}_sum{_join_labels(base)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_join_labels(base)} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    """带标签的单调递增计数器。"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1.0) -> None:
+        """计数加一（或指定增量）。"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        """输出 Prometheus 文本格式行。"""
+        with self._lock:
+            snapshot = dict(self._values)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_join_labels(_format_labels(self.label_names, labels))} {value:g}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(f"{_PREFIX}_request_duration_seconds", "接口请求耗时", ("method", "path"))
+REQUESTS_TOTAL = Counter(f"{_PREFIX}_requests_total", "接口请求次数", ("method", "path", "status"))
+STAGE_DURATION = Histogram(f"{_PREFIX}_stage_duration_seconds", "分析流程内部各阶段耗时", ("stage",))
+
+# 仪表盘指标在抓取时才回调取值，请求热路径上没有任何额外开销
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]]] = {}
+
+
+def observe_request(method: str, path: str, status: int, seconds: float) -> None:
+    """
+    记录一次接口请求。
+
+    :param method: HTTP 方法。
+    :param path: 路由模板路径，避免路径参数造成标签基数膨胀。
+    :param status: 响应状态码。
+    :param seconds: 耗时（秒）。
+    """
+    REQUEST_DURATION.observe((method, path), seconds)
+    REQUESTS_TOTAL.inc((method, path, str(status)))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """计时一个处理阶段，异常退出时同样记录。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe((name,), time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """将整个函数调用计为一个阶段的装饰器。"""
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> T:
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def register_gauge(name: str, documentation: str, collect: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]) -> None:
+    """
+    注册抓取时回调的仪表盘指标。
+
+    :param name: 指标名（不含前缀）。
+    :param documentation: 指标说明。
+    :param collect: 返回 {((标签名, 标签值), ...): 数值} 的回调，无标签时键为空元组。
+    """
+    _gauges[f"{_PREFIX}_{name}"] = (documentation, collect)
+
+
+def render() -> str:
+    """生成完整的 Prometheus 文本格式指标。"""
+    lines: List[str] = []
+    for metric in (REQUEST_DURATION, REQUESTS_TOTAL, STAGE_DURATION):
+        lines.extend(metric.render())
+    for name, (documentation, collect) in _gauges.items():
+        try:
+            values = collect()
+        except Exception:  # noqa: BLE001 - 单个指标取值失败不影响其它指标输出
+            continue
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in values.items():
+            label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+            lines.append(f"{name}{_join_labels(label_text)} {float(value):g}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """拼接标签键值对。"""
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _join_labels(*parts: str) -> str:
+    """将非空标签片段包装为 {…}，全部为空时返回空串。"""
+    text = ",".join(part for part in parts if part)
+    return f"{{{text}}}" if text else ""
+
+
+def _escape(value: str) -> str:
+    """按 Prometheus 文本格式转义标签值。"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
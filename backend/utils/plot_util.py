@@ -1,10 +1,10 @@
 """绘图工具，统一输出目录与格式。"""
 from typing import List, Optional
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from backend import config
+from backend.utils.importing import lazy_import
 from backend.utils.logger import LOGGER, ensure_dirs
 
 
@@ -20,6 +20,7 @@ def plot_sales_forecast(history_df: pd.DataFrame, predict_df: pd.DataFrame, valu
     :return: 图表文件路径。
     """
     ensure_dirs()
+    plt = lazy_import("matplotlib.pyplot")
     plt.figure(figsize=(8, 4))
     plt.plot(history_df["period"], history_df[value_col], marker="o", label="历史值")
     plt.plot(predict_df["period"], predict_df[value_col], marker="x", linestyle="--", label="预测值")
@@ -39,6 +40,7 @@ def plot_sales_forecast(history_df: pd.DataFrame, predict_df: pd.DataFrame, valu
 def plot_cluster_distribution(cluster_df: pd.DataFrame, filename: str, title: str = "客户分群占比") -> str:
     """绘制客户分群饼图。"""
     ensure_dirs()
+    plt = lazy_import("matplotlib.pyplot")
     plt.figure(figsize=(6, 6))
     plt.pie(cluster_df["count"], labels=cluster_df["cluster"], autopct="%1.1f%%", startangle=90)
     plt.title(title)
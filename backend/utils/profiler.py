@@ -0,0 +1,159 @@
+"""按需请求剖析工具，对单个请求同时运行 cProfile 与栈采样，保存 pstats 与火焰图折叠栈文件。"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from fastapi.routing import APIRoute
+
+from backend import config
+from backend.utils.logger import LOGGER
+
+# 当前请求的剖析会话；未开启剖析的请求只多一次 ContextVar 读取
+_ACTIVE: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """一次请求的剖析会话，接口函数在哪个线程执行就在哪个线程启用 cProfile，并由后台线程采样调用栈。"""
+
+    def __init__(self, label: str, sample_interval: float = config.PROFILE_SAMPLE_INTERVAL) -> None:
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.sample_interval = sample_interval
+        self.profiler = cProfile.Profile()
+        self.stacks: Counter = Counter()
+        self._threads: Set[int] = set()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profile-{self.profile_id}", daemon=True)
+        self._sampler.start()
+
+    @contextmanager
+    def attach(self) -> Iterator[None]:
+        """在当前线程内启用剖析，退出时停用。"""
+        ident = threading.get_ident()
+        self._threads.add(ident)
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+            self._threads.discard(ident)
+
+    def save(self, directory: str = config.PROFILE_DIR) -> Dict[str, str]:
+        """
+        停止采样并写出剖析结果。
+
+        :param directory: 输出目录。
+        :return: 包含 pstats 与 collapsed 文件路径的字典。
+        """
+        self._stop.set()
+        self._sampler.join()
+        os.makedirs(directory, exist_ok=True)
+        stats_path = os.path.join(directory, f"{self.profile_id}.pstats")
+        collapsed_path = os.path.join(directory, f"{self.profile_id}.collapsed")
+        self.profiler.dump_stats(stats_path)
+        with open(collapsed_path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        LOGGER.info("已保存请求剖析 %s（%s）：%s", self.profile_id, self.label, stats_path)
+        return {"pstats": stats_path, "collapsed": collapsed_path}
+
+    def _sample_loop(self) -> None:
+        """按固定间隔采样被剖析线程的调用栈，供生成火焰图。"""
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+
+class ProfilingRoute(APIRoute):
+    """在接口函数外包一层剖析钩子，仅当前请求开启剖析时才启用 cProfile。"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+def activate(session: ProfileSession) -> Token:
+    """为当前请求上下文绑定剖析会话。"""
+    return _ACTIVE.set(session)
+
+
+def deactivate(token: Token) -> None:
+    """解除当前请求上下文的剖析会话。"""
+    _ACTIVE.reset(token)
+
+
+def list_profiles(directory: str = config.PROFILE_DIR) -> List[Dict[str, Any]]:
+    """按时间倒序列出已保存的剖析结果。"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".pstats"):
+            path = os.path.join(directory, name)
+            profiles.append({"profile_id": name[: -len(".pstats")], "size": os.path.getsize(path)})
+    return profiles
+
+
+def summarize(profile_id: str, limit: int = 30, sort_by: str = "cumulative", directory: str = config.PROFILE_DIR) -> str:
+    """
+    读取已保存的 pstats 并输出耗时最多的函数。
+
+    :param profile_id: 剖析 ID。
+    :param limit: 输出函数个数。
+    :param sort_by: 排序字段，如 cumulative、tottime。
+    :param directory: 剖析目录。
+    :return: pstats 文本报告。
+    """
+    if not profile_id.replace("-", "").isalnum():
+        raise ValueError("剖析 ID 不合法。")
+    path = os.path.join(directory, f"{profile_id}.pstats")
+    if not os.path.exists(path):
+        raise ValueError("剖析结果不存在。")
+    buffer = io.StringIO()
+    pstats.Stats(path, stream=buffer).sort_stats(sort_by).print_stats(limit)
+    return buffer.getvalue()
+
+
+def _profiled(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """包装接口函数；协程接口在事件循环线程内剖析，期间同线程的其它协程也会计入。"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            session = _ACTIVE.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            with session.attach():
+                return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        session = _ACTIVE.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        with session.attach():
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+
+def _collapse(frame: Any) -> str:
+    """将调用栈折叠为 root;...;leaf 形式，可直接交给 flamegraph.pl 或 speedscope。"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
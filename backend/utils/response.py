@@ -0,0 +1,147 @@
+"""响应序列化工具，提供列式/行式输出、分页排序与快速 JSON 编码。"""
+import hashlib
+import json
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response
+
+from backend.utils import metrics
+
+try:  # orjson 为可选依赖，安装后自动启用更快的编码路径
+    import orjson
+except ImportError:  # pragma: no cover - 未安装时回退标准库
+    orjson = None
+
+
+class FastJSONResponse(Response):
+    """跳过 FastAPI 逐字段 jsonable_encoder 的 JSON 响应，内容需已是原生 Python 类型。"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with metrics.stage("response.serialize"):
+            if orjson is not None:
+                return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+            # 与 orjson 一致：NaN/Infinity 输出为 null，其余非法浮点直接报错而不是生成非标准 JSON
+            return json.dumps(
+                _finite(content), ensure_ascii=False, separators=(",", ":"), allow_nan=False, default=_json_default,
+            ).encode("utf-8")
+
+
+def frame_payload(
+    df: pd.DataFrame,
+    layout: str = "records",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+) -> Dict[str, Any]:
+    """
+    对数据框执行排序、Top-K 与分页后序列化。
+
+    :param df: 完整结果数据框。
+    :param layout: records 为逐行对象列表，columns 为按列数组。
+    :param limit: 返回行数上限，None 表示不限。
+    :param offset: 起始偏移量。
+    :param sort_by: 排序字段，None 保持原顺序。
+    :param descending: 是否降序。
+    :return: 包含 data、total、offset、limit、next_offset 的字典。
+    """
+    total = int(len(df))
+    if sort_by:
+        if sort_by not in df.columns:
+            raise ValueError(f"不支持的排序字段：{sort_by}")
+        df = _sorted_window(df, sort_by, descending, limit, offset)
+    else:
+        df = df.iloc[offset: offset + limit] if limit is not None else df.iloc[offset:]
+    end = offset + len(df)
+    return {
+        "data": frame_to_json(df, layout),
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": end if end < total else None,
+    }
+
+
+def frame_to_json(df: pd.DataFrame, layout: str = "records") -> Any:
+    """按列一次性转换为原生类型，避免逐行构造字典再逐字段编码。"""
+    columns = [str(col) for col in df.columns]
+    values = [_column_values(df[col]) for col in df.columns]
+    if layout == "columns":
+        return {"columns": columns, "data": dict(zip(columns, values))}
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def make_etag(fingerprint: str, endpoint: str, params: Dict[str, Any]) -> str:
+    """
+    根据数据指纹、接口与参数生成弱 ETag（响应可能被 gzip 压缩，故使用弱校验）。
+
+    :param fingerprint: 数据集指纹。
+    :param endpoint: 接口名称。
+    :param params: 完整请求参数，含分页与输出格式。
+    :return: 形如 W/"..." 的 ETag。
+    """
+    raw = json.dumps([fingerprint, endpoint, params], sort_keys=True, ensure_ascii=False, default=str)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中当前 ETag，比较时忽略弱校验前缀。"""
+    if not if_none_match:
+        return False
+    target = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == target:
+            return True
+    return False
+
+
+def _sorted_window(df: pd.DataFrame, sort_by: str, descending: bool, limit: Optional[int], offset: int) -> pd.DataFrame:
+    """排序后截取分页窗口；数值列只取前 offset+limit 行时使用部分排序。"""
+    if limit is not None and pd.api.types.is_numeric_dtype(df[sort_by]):
+        top_k = offset + limit
+        ranked = df.nlargest(top_k, sort_by) if descending else df.nsmallest(top_k, sort_by)
+        return ranked.iloc[offset:]
+    ranked = df.sort_values(by=sort_by, ascending=not descending)
+    return ranked.iloc[offset: offset + limit] if limit is not None else ranked.iloc[offset:]
+
+
+def _column_values(series: pd.Series) -> List[Any]:
+    """将单列转为 JSON 友好的原生值列表，缺失值统一为 None。"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        formatted = series.dt.strftime("%Y-%m-%dT%H:%M:%S")
+        return formatted.astype(object).where(series.notna(), None).tolist()
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+        return series.astype(object).where(series.notna(), None).tolist()
+    if pd.api.types.is_float_dtype(series) and series.isna().any():
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
+
+
+def _finite(value: Any) -> Any:
+    """递归地将 NaN 与正负无穷替换为 None，供标准库编码器在 allow_nan=False 下使用。"""
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (float, np.floating)) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    """标准库编码器的兜底转换。"""
+    if isinstance(value, np.floating):
+        return _finite(value.item())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return str(value)
+    if hasattr(value, "dict"):
+        return value.dict()
+    raise TypeError(f"无法序列化类型：{type(value)}")
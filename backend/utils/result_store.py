@@ -0,0 +1,59 @@
+"""分析结果缓存，按内容生成结果 ID，供导出等后续请求直接复用。"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+class ResultStore:
+    """容量有限的 LRU 结果缓存，同一数据版本、接口与参数得到同一个结果 ID。"""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, pd.DataFrame]]" = OrderedDict()
+
+    @staticmethod
+    def make_id(version: int, endpoint: str, params: Dict[str, Any]) -> str:
+        """根据数据版本、接口与参数生成稳定的结果 ID。"""
+        raw = json.dumps([version, endpoint, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def put(self, version: int, endpoint: str, params: Dict[str, Any], df: pd.DataFrame) -> str:
+        """
+        保存结果数据框并返回结果 ID。
+
+        :param version: 数据集版本号。
+        :param endpoint: 产生结果的接口名，也用作导出文件名。
+        :param params: 计算参数。
+        :param df: 结果数据框，调用方不应再修改。
+        :return: 结果 ID。
+        """
+        result_id = self.make_id(version, endpoint, params)
+        with self._lock:
+            self._entries[result_id] = (endpoint, df)
+            self._entries.move_to_end(result_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Tuple[str, pd.DataFrame]]:
+        """按 ID 取回 (接口名, 数据框)，不存在或已淘汰时返回 None。"""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                self._entries.move_to_end(result_id)
+            return entry
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        """返回结果 ID 到数据框的浅拷贝映射，用于内存统计。"""
+        with self._lock:
+            return {result_id: df for result_id, (_, df) in self._entries.items()}
+
+    def stats(self) -> Dict[str, int]:
+        """返回缓存条目数与容量。"""
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries}
@@ -0,0 +1,207 @@
+"""多进程共享数据集工具，将清洗后的视图发布为内存映射文件供各 worker 只读挂载。"""
+import json
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend import config
+from backend.utils.logger import LOGGER
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_MANIFEST_NAME = "manifest.json"
+_VIEW_NAMES: List[str] = ["raw_df", "orders", "customers", "products", "rfm"]
+# 保留的历史版本数量，避免仍在读取旧版本的 worker 丢失文件
+_KEEP_VERSIONS = 2
+_LOCK_NAME = ".publish.lock"
+
+
+def manifest_path(root: str = config.SHARED_DATA_DIR) -> str:
+    """返回版本清单文件路径。"""
+    return os.path.join(root, _MANIFEST_NAME)
+
+
+def read_manifest(root: str = config.SHARED_DATA_DIR) -> Optional[Dict[str, object]]:
+    """读取当前发布的版本清单，不存在或损坏时返回 None。"""
+    path = manifest_path(root)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError) as exc:
+        LOGGER.warning("读取共享数据清单失败：%s", exc)
+        return None
+
+
+def current_version(root: str = config.SHARED_DATA_DIR) -> int:
+    """返回已发布的最新版本号，未发布时为 0。"""
+    manifest = read_manifest(root)
+    return int(manifest["version"]) if manifest else 0
+
+
+def publish(views: Dict[str, pd.DataFrame], source_path: Optional[str], compact: bool, fingerprint: str = "",
+            root: str = config.SHARED_DATA_DIR) -> int:
+    """
+    将各数据视图逐列写为 .npy 文件，并原子替换版本清单。
+
+    :param views: 视图名到数据框的映射。
+    :param source_path: 数据来源路径。
+    :param compact: 是否为紧凑内存模式。
+    :param fingerprint: 数据指纹，供各 worker 生成一致的 ETag。
+    :param root: 共享目录。
+    :return: 新发布的版本号。
+    """
+    os.makedirs(root, exist_ok=True)
+    # 多个 worker 同时发布时串行执行，版本号的分配与清单替换不会交错
+    with _publish_lock(root):
+        version = max([current_version(root), *_directory_versions(root)]) + 1
+        directory = f"v{version:06d}_{os.getpid()}"
+        target = os.path.join(root, directory)
+        os.mkdir(target)
+        view_meta: Dict[str, object] = {}
+        for name in _VIEW_NAMES:
+            df = views.get(name)
+            if df is None:
+                continue
+            columns = [
+                _write_column(target, f"{name}_{idx}", df[col], compact) | {"name": str(col)}
+                for idx, col in enumerate(df.columns)
+            ]
+            view_meta[name] = {"rows": int(len(df)), "columns": columns}
+        manifest = {
+            "version": version,
+            "directory": directory,
+            "source_path": source_path,
+            "compact": compact,
+            "fingerprint": fingerprint,
+            "views": view_meta,
+        }
+        temp_path = manifest_path(root) + f".{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False)
+        os.replace(temp_path, manifest_path(root))
+        _cleanup_old_versions(root, directory)
+    LOGGER.info("已发布共享数据集版本 %s：%s", version, target)
+    return version
+
+
+def attach(manifest: Dict[str, object], root: str = config.SHARED_DATA_DIR) -> Dict[str, pd.DataFrame]:
+    """
+    以只读内存映射方式挂载指定版本的数据视图，不复制底层数组。
+
+    :param manifest: read_manifest 返回的版本清单。
+    :param root: 共享目录。
+    :return: 视图名到数据框的映射。
+    """
+    target = os.path.join(root, str(manifest["directory"]))
+    views: Dict[str, pd.DataFrame] = {}
+    for name, meta in manifest["views"].items():
+        data = {column["name"]: _read_column(target, column) for column in meta["columns"]}
+        views[name] = pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]), copy=False)
+    return views
+
+
+def is_mapped(series: pd.Series) -> bool:
+    """判断列数据是否直接引用内存映射文件（按需换页、可随时回收，不计入常驻内存）。"""
+    values = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) else series.to_numpy()
+    base = values
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+def _write_column(target: str, stem: str, series: pd.Series, compact: bool) -> Dict[str, object]:
+    """
+    按列类型写出数组，字符串列在磁盘上统一做字典编码。
+
+    紧凑模式下字符串列以 category 挂载，编码数组直接引用映射文件；非紧凑模式记录原 dtype，挂载时还原，
+    保证调用方看到的类型不变，但还原出的字符串数组是每个 worker 私有的副本，不再零拷贝共享。
+    """
+    is_categorical = isinstance(series.dtype, pd.CategoricalDtype)
+    if is_categorical or series.dtype == object or pd.api.types.is_string_dtype(series):
+        categorical = series if is_categorical else series.astype("category")
+        categories = categorical.cat.categories
+        categories_array = categories.to_numpy()
+        if categories_array.dtype == object:
+            categories_array = categories_array.astype(str)
+        np.save(os.path.join(target, f"{stem}_codes.npy"), categorical.cat.codes.to_numpy())
+        np.save(os.path.join(target, f"{stem}_categories.npy"), categories_array)
+        if is_categorical or compact:
+            return {"kind": "category", "file": stem}
+        return {"kind": "string", "file": stem, "dtype": str(series.dtype)}
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy()
+        np.save(os.path.join(target, f"{stem}.npy"), values.view("int64"))
+        return {"kind": "datetime", "file": stem, "dtype": str(values.dtype)}
+    np.save(os.path.join(target, f"{stem}.npy"), series.to_numpy())
+    return {"kind": "numeric", "file": stem}
+
+
+def _read_column(target: str, column: Dict[str, object]) -> object:
+    """按列元数据以 mmap_mode="r" 读取数组。"""
+    stem = str(column["file"])
+    if column["kind"] in {"category", "string"}:
+        codes = np.load(os.path.join(target, f"{stem}_codes.npy"), mmap_mode="r")
+        categories = np.load(os.path.join(target, f"{stem}_categories.npy"))
+        categorical = pd.Categorical.from_codes(codes, categories=pd.Index(categories.tolist()))
+        if column["kind"] == "string":
+            # 还原原 dtype 会复制出私有的字符串数组，见 _write_column
+            return pd.Series(categorical).astype(str(column["dtype"]))
+        return categorical
+    values = np.load(os.path.join(target, f"{stem}.npy"), mmap_mode="r")
+    if column["kind"] == "datetime":
+        return values.view(str(column["dtype"]))
+    return values
+
+
+@contextmanager
+def _publish_lock(root: str) -> Iterator[None]:
+    """共享目录下的跨进程互斥锁，POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking。"""
+    with open(os.path.join(root, _LOCK_NAME), "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    # LK_LOCK 最多重试约 10 秒后抛出，另一个 worker 发布大数据集时继续等待
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _directory_versions(root: str) -> List[int]:
+    """返回共享目录中已存在的版本目录编号，其它进程已分配但尚未写完清单的版本同样计入。"""
+    versions = []
+    for entry in os.listdir(root):
+        if entry.startswith("v") and entry[1:7].isdigit():
+            versions.append(int(entry[1:7]))
+    return versions
+
+
+def _cleanup_old_versions(root: str, current: str) -> None:
+    """删除过旧的版本目录，仍被映射的文件删除失败时忽略（Windows 下常见）。"""
+    directories = sorted(entry for entry in os.listdir(root) if entry.startswith("v") and entry != current)
+    for stale in directories[: max(0, len(directories) - (_KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
@@ -0,0 +1,68 @@
+"""单飞请求合并工具，同一时刻相同键的计算只执行一次，其余调用方等待并共享结果。"""
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """一次正在进行的计算。"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """按 (数据版本, 接口, 参数) 合并并发的相同计算，并按接口统计合并次数。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[int, str, str], _Call] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def do(self, version: int, endpoint: str, params: Dict[str, Any], fn: Callable[[], T]) -> T:
+        """
+        执行或等待一次计算。
+
+        :param version: 数据集版本号。
+        :param endpoint: 接口名称，用于分组统计。
+        :param params: 请求参数，序列化后参与去重。
+        :param fn: 实际计算函数。
+        :return: 计算结果，并发调用方共享同一对象，调用方不应修改。
+        """
+        key = (version, endpoint, json.dumps(params, sort_keys=True, ensure_ascii=False, default=str))
+        with self._lock:
+            counter = self._counters.setdefault(endpoint, {"executed": 0, "coalesced": 0, "in_flight": 0})
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                counter["executed"] += 1
+                counter["in_flight"] += 1
+            else:
+                counter["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                counter["in_flight"] -= 1
+            call.done.set()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """返回各接口的执行次数、合并次数与进行中的计算数。"""
+        with self._lock:
+            return {endpoint: dict(counter) for endpoint, counter in self._counters.items()}
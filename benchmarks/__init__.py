@@ -0,0 +1 @@
+"""性能基准工具包：合成数据生成、模块级基准与接口压测。"""
@@ -0,0 +1,254 @@
+"""
+端到端接口压测：启动 backend.main:app，以逐级递增的并发回放推荐、预测、聚类、关联规则与导出请求，
+输出各接口吞吐、p50/p95/p99 延迟与错误率的 JSON 报告，便于不同构建之间对比。
+
+用法：
+    python -m benchmarks.load_test --concurrency 1,4,16 --duration 15
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --mix recommend=4,forecast=1
+    python -m benchmarks.load_test --dataset outputs/bench_data/sales_1000000_42.csv --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from backend import config
+
+DEFAULT_MIX = "recommend=4,forecast=1,clustering=2,promotion_analyze=1,export=1"
+REPORT_DIR = os.path.join(config.OUTPUT_DIR, "loadtest")
+
+# 每类请求：(HTTP 方法, 路径, 请求体生成函数)；参数在小范围内随机，既有重复命中缓存也有真实计算
+ENDPOINTS: Dict[str, Tuple[str, str, Callable[[random.Random, List[str]], Dict[str, Any]]]] = {
+    "recommend": ("POST", "/api/recommend", lambda rng, ids: {"customer_id": rng.choice(ids), "top_n": 5}),
+    "forecast": ("POST", "/api/forecast", lambda rng, ids: {"months": rng.randint(1, 12)}),
+    "clustering": ("POST", "/api/clustering", lambda rng, ids: {"k": rng.randint(2, 8), "limit": 100}),
+    "promotion_analyze": (
+        "POST", "/api/promotion/analyze",
+        lambda rng, ids: {"min_support": rng.choice([0.01, 0.02, 0.05]), "min_confidence": 0.3, "limit": 50},
+    ),
+    "export": (
+        "POST", "/api/export",
+        lambda rng, ids: {"target": rng.choice(["promotion", "cluster", "forecast"]), "compress": rng.random() < 0.5},
+    ),
+}
+
+
+class ServerProcess:
+    """以子进程方式运行 uvicorn，退出时终止。"""
+
+    def __init__(self, port: int, workers: int, env: Dict[str, str]) -> None:
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        command = [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+        if workers > 1:
+            command += ["--workers", str(workers)]
+        self.process = subprocess.Popen(command, cwd=config.PROJECT_DIR, env={**os.environ, **env})
+
+    def wait_ready(self, timeout: float = 120.0) -> None:
+        """轮询就绪检查直至默认数据加载与预热完成。"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"后端进程已退出，返回码 {self.process.returncode}")
+            try:
+                if requests.get(f"{self.url}/api/ready", timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.3)
+        raise RuntimeError("等待后端启动超时")
+
+    def stop(self) -> None:
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """解析 name=weight,... 形式的请求配比。"""
+    mix: Dict[str, float] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"未知的接口：{name}，可选 {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("请求配比不能为空。")
+    return mix
+
+
+def prepare(url: str, dataset: Optional[str]) -> List[str]:
+    """按需加载指定数据集，并通过一次聚类请求取得客户编号样本供推荐请求使用。"""
+    if dataset:
+        response = requests.post(f"{url}/api/data/load", json={"path": os.path.abspath(dataset)}, timeout=600)
+        response.raise_for_status()
+    response = requests.post(f"{url}/api/clustering", json={"k": config.DEFAULT_CLUSTER_K, "limit": 500}, timeout=600)
+    response.raise_for_status()
+    rows = response.json()["clusters"]
+    customer_ids = [str(row["customer_id"]) for row in rows]
+    if not customer_ids:
+        raise RuntimeError("未能取得客户编号样本。")
+    return customer_ids
+
+
+def run_stage(url: str, concurrency: int, duration: float, mix: Dict[str, float], customer_ids: List[str], seed: int) -> Dict[str, Any]:
+    """
+    以固定并发持续发送请求。
+
+    :param url: 服务地址。
+    :param concurrency: 并发客户端数。
+    :param duration: 持续秒数。
+    :param mix: 接口配比。
+    :param customer_ids: 推荐请求使用的客户编号。
+    :param seed: 随机种子，各客户端在此基础上偏移。
+    :return: 该并发级别的统计结果。
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[Tuple[float, int]]] = {name: [] for name in names}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local: Dict[str, List[Tuple[float, int]]] = {name: [] for name in names}
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = ENDPOINTS[name]
+            start = time.perf_counter()
+            try:
+                response = session.request(method, f"{url}{path}", json=body(rng, customer_ids), timeout=120)
+                response.content  # noqa: B018 - 读取完整响应体（导出为流式）后再计时
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            local[name].append((time.perf_counter() - start, status))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.monotonic() - started
+    endpoints = {name: _summarize(values, elapsed) for name, values in samples.items()}
+    total = sum(item["requests"] for item in endpoints.values())
+    return {"concurrency": concurrency, "elapsed_seconds": round(elapsed, 3), "throughput_rps": round(total / elapsed, 3), "endpoints": endpoints}
+
+
+def _summarize(values: List[Tuple[float, int]], elapsed: float) -> Dict[str, Any]:
+    """计算单个接口的吞吐、延迟分位数与错误率；429/503 单独计为限流。"""
+    if not values:
+        return {"requests": 0}
+    latencies = sorted(latency * 1000 for latency, _ in values)
+    statuses: Dict[str, int] = {}
+    for _, status in values:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(count for status, count in statuses.items() if status == "0" or int(status) >= 400)
+    throttled = statuses.get("429", 0) + statuses.get("503", 0)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed, 3),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2),
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2),
+        },
+        "error_rate": round(errors / len(values), 4),
+        "throttled_rate": round(throttled / len(values), 4),
+        "status_counts": statuses,
+    }
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """线性插值分位数，输入需已排序。"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="后端接口压测")
+    parser.add_argument("--url", default=None, help="压测已运行的服务；不填时自动启动 backend.main:app")
+    parser.add_argument("--workers", type=int, default=1, help="自动启动时的 uvicorn worker 数")
+    parser.add_argument("--dataset", default=None, help="压测前通过 /api/data/load 加载的 CSV")
+    parser.add_argument("--concurrency", default="1,4,16", help="逗号分隔的并发级别，逐级递增执行")
+    parser.add_argument("--duration", type=float, default=15.0, help="每个并发级别持续秒数")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="接口配比，如 recommend=4,forecast=1")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="报告路径，默认 outputs/loadtest/report_<时间>.json")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    levels = sorted({int(item) for item in args.concurrency.split(",") if item.strip()})
+    server = None
+    url = args.url
+    if url is None:
+        env = {"DATA_SHARED_MEMORY": "1"} if args.workers > 1 else {}
+        server = ServerProcess(_free_port(), args.workers, env)
+        url = server.url
+    try:
+        if server is not None:
+            server.wait_ready()
+        customer_ids = prepare(url, args.dataset)
+        stages = []
+        for level in levels:
+            print(f"[压测] 并发 {level}，持续 {args.duration}s", flush=True)
+            stage = run_stage(url, level, args.duration, mix, customer_ids, args.seed)
+            for name, item in stage["endpoints"].items():
+                if item["requests"]:
+                    latency = item["latency_ms"]
+                    print(f"  {name:<18} {item['throughput_rps']:>8.2f} rps  p50 {latency['p50']:>8.1f}ms  "
+                          f"p95 {latency['p95']:>8.1f}ms  p99 {latency['p99']:>8.1f}ms  错误率 {item['error_rate']:.2%}", flush=True)
+            stages.append(stage)
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "url": url if args.url else "local",
+        "workers": args.workers,
+        "dataset": args.dataset or config.DEFAULT_CSV,
+        "duration_per_stage": args.duration,
+        "mix": mix,
+        "stages": stages,
+    }
+    output = args.output or os.path.join(REPORT_DIR, f"report_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"[报告] {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+模块级基准测试：在不同规模的合成数据上测量各分析入口的耗时与峰值内存，并与保存的基线比较。
+
+用法：
+    python -m benchmarks.run_benchmarks --sizes 10k,1m                # 运行并与基线比较
+    python -m benchmarks.run_benchmarks --sizes 10k --save-baseline   # 运行并覆盖基线
+    python -m benchmarks.run_benchmarks --sizes 10m --compact --partitions 10  # 内存有限时以紧凑模式分区加载
+
+耗时取多次运行的中位数（不开启 tracemalloc），峰值内存单独运行一次以 tracemalloc 统计。
+每个规模开始前先在固定的 numpy/pandas 负载上计时作为本机速度参照，各条目另记耗时与参照之比（relative），
+与基线比较时优先比较该比值，使在不同机器上录制的基线也可使用；超出基线 tolerance 比例的条目视为回归，
+进程以非零状态码退出，可直接接入 CI。
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend import config
+from backend.data_loader import DataRepository, DatasetSnapshot
+from backend.modules import clustering, forecast, promotion, recommender, similarity
+from backend.modules.recommender import Recommender
+from benchmarks.synthetic_data import generate, parse_rows
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DATA_DIR = os.path.join(config.OUTPUT_DIR, "bench_data")
+
+
+class Case:
+    """一个基准条目：setup 在计时外准备输入，run 为被测调用；超过 max_rows 的规模直接跳过。"""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Any], Any],
+        setup: Optional[Callable[[DatasetSnapshot, str], Any]] = None,
+        max_rows: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda snapshot, path: snapshot)
+        self.max_rows = max_rows
+
+
+def _load(path: str, compact: bool = False) -> DatasetSnapshot:
+    repo = DataRepository(compact=compact)
+    repo.load_csv(path)
+    return repo.snapshot()
+
+
+def _split(path: str, parts: int) -> str:
+    """
+    将合成 CSV 按行均分为多个分区文件，分块读写，内存占用只与单个分区相关。
+
+    :param path: 完整 CSV 路径。
+    :param parts: 分区数。
+    :return: 分区目录，已存在时直接复用。
+    """
+    directory = f"{os.path.splitext(path)[0]}_p{parts}"
+    if os.path.isdir(directory):
+        return directory
+    print(f"[分区] {path} -> {directory}（{parts} 个文件）", flush=True)
+    temp_dir = f"{directory}.tmp"
+    os.makedirs(temp_dir, exist_ok=True)
+    with open(path, "r", encoding="utf-8") as file:
+        total = sum(1 for _ in file) - 1
+    chunks = pd.read_csv(path, chunksize=-(-total // parts))
+    for index, chunk in enumerate(chunks):
+        chunk.to_csv(os.path.join(temp_dir, f"part-{index:03d}.csv"), index=False)
+    os.replace(temp_dir, directory)
+    return directory
+
+
+def _top_customer(snapshot: DatasetSnapshot) -> str:
+    return str(snapshot.raw_df["customer_id"].value_counts().index[0])
+
+
+def _cold_recommend(snapshot: DatasetSnapshot, path: str) -> Any:
+    # 清空共现矩阵缓存，使每次计时都包含矩阵构建，而非只测一次字典查找
+    recommender._CO_OCCURRENCE_CACHE.clear()
+    return snapshot, _top_customer(snapshot)
+
+
+def _cold_basket(snapshot: DatasetSnapshot, path: str) -> DatasetSnapshot:
+    promotion._BASKET_CACHE.clear()
+    return snapshot
+
+
+def _fresh_rfm(snapshot: DatasetSnapshot, path: str) -> DatasetSnapshot:
+    # 新快照只带上已构建的订单视图，计时范围即 RFM 视图本身的构建
+    return DatasetSnapshot(
+        raw_df=snapshot.raw_df, version=snapshot.version, compact=snapshot.compact, prebuilt={"orders": snapshot.orders},
+    )
+
+
+def _fresh_similarity(snapshot: DatasetSnapshot) -> Dict[str, Any]:
+    similarity._INDEX_CACHE.clear()
+    seeds = snapshot.rfm["customer_id"].astype(str).head(10).tolist()
+    return similarity.find_similar_customers(snapshot, seeds, top_n=50)
+
+
+CASES: List[Case] = [
+    Case("data_loader.load_csv", run=lambda args: _load(*args), setup=lambda snapshot, path: (path, snapshot.compact)),
+    Case(
+        "recommender.recommend",
+        run=lambda args: Recommender(args[0]).recommend(args[1], top_n=config.DEFAULT_TOP_N),
+        setup=_cold_recommend,
+        max_rows=2_000_000,
+    ),
+    Case(
+        "promotion.select_promotion_candidates",
+        run=lambda snapshot: promotion.select_promotion_candidates(promotion.calc_product_metrics(snapshot)),
+    ),
+    Case(
+        "promotion.screen_promotion_candidates",
+        run=promotion.screen_promotion_candidates,
+        setup=lambda snapshot, path: promotion.get_promotion_index(snapshot) and snapshot,
+    ),
+    Case("promotion.build_basket_matrix", run=promotion.build_basket_matrix, max_rows=200_000),
+    Case("promotion.mine_association_rules", run=promotion.mine_association_rules, setup=_cold_basket, max_rows=200_000),
+    Case("forecast.build_sales_timeseries", run=forecast.build_sales_timeseries),
+    Case(
+        "forecast.train_and_predict_sales",
+        run=lambda ts_df: forecast.train_and_predict_sales(ts_df, config.DEFAULT_FORECAST_MONTHS),
+        setup=lambda snapshot, path: forecast.build_sales_timeseries(snapshot),
+    ),
+    Case("clustering.calc_rfm", run=clustering.calc_rfm, setup=_fresh_rfm),
+    Case(
+        "clustering.kmeans_cluster",
+        run=lambda rfm_df: clustering.kmeans_cluster(rfm_df, config.DEFAULT_CLUSTER_K),
+        setup=lambda snapshot, path: clustering.calc_rfm(snapshot),
+    ),
+    Case("similarity.find_similar_customers", run=_fresh_similarity),
+]
+
+
+def calibrate(repeat: int = 5) -> float:
+    """在固定的分组聚合与排序负载上计时取中位数，作为本机速度参照（秒）。"""
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"key": rng.integers(0, 1000, 500_000), "value": rng.random(500_000)})
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        frame.groupby("key")["value"].agg(["sum", "mean", "max"])
+        np.sort(frame["value"].to_numpy())
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_suite(
+    sizes: List[int],
+    seed: int,
+    repeat: int,
+    only: Optional[List[str]] = None,
+    compact: bool = False,
+    partitions: int = 1,
+) -> Dict[str, Any]:
+    """
+    逐规模生成数据并运行全部基准条目。
+
+    :param sizes: 行数列表。
+    :param seed: 合成数据种子。
+    :param repeat: 每个条目的计时次数。
+    :param only: 仅运行名称包含任一关键字的条目。
+    :param compact: 是否以紧凑内存模式加载，结果键加 -compact 后缀，只与同模式的基线比较。
+    :param partitions: 大于 1 时先将 CSV 均分为多个分区文件再按目录加载，解析峰值只与单个分区相关，结果键加 -p<分区数> 后缀。
+    :return: {规模: {条目: 结果}} 结构的结果字典。
+    """
+    results: Dict[str, Any] = {}
+    for rows in sizes:
+        path = os.path.join(DATA_DIR, f"sales_{rows}_{seed}.csv")
+        if not os.path.exists(path):
+            print(f"[生成] {rows} 行合成数据 -> {path}", flush=True)
+            generate(rows, seed=seed, output=path)
+        if partitions > 1:
+            path = _split(path, partitions)
+        snapshot = _load(path, compact)
+        # 派生视图按需构建，先统一构建好，使各条目只计分析本身的耗时
+        snapshot.materialize()
+        reference = calibrate()
+        size_results: Dict[str, Any] = {}
+        for case in CASES:
+            if only and not any(key in case.name for key in only):
+                continue
+            if case.max_rows is not None and rows > case.max_rows:
+                size_results[case.name] = {"skipped": f"超过 {case.max_rows} 行上限"}
+                continue
+            size_results[case.name] = _measure(case, snapshot, path, repeat)
+            if "seconds" in size_results[case.name]:
+                size_results[case.name]["relative"] = round(size_results[case.name]["seconds"] / reference, 4)
+            print(f"[{rows}] {case.name}: {_describe(size_results[case.name])}", flush=True)
+        key = str(rows) + ("-compact" if compact else "") + (f"-p{partitions}" if partitions > 1 else "")
+        results[key] = size_results
+    return results
+
+
+def _measure(case: Case, snapshot: DatasetSnapshot, path: str, repeat: int) -> Dict[str, Any]:
+    """计时 repeat 次取中位数，再单独运行一次统计 tracemalloc 峰值。"""
+    try:
+        timings = []
+        for _ in range(repeat):
+            payload = case.setup(snapshot, path)
+            gc.collect()
+            start = time.perf_counter()
+            case.run(payload)
+            timings.append(time.perf_counter() - start)
+        payload = case.setup(snapshot, path)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            case.run(payload)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except (MemoryError, ValueError) as exc:
+        return {"error": f"{type(exc).__name__}: {exc}"}
+    return {
+        "seconds": round(statistics.median(timings), 6),
+        "min_seconds": round(min(timings), 6),
+        "peak_mb": round(peak / 1024 / 1024, 3),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_seconds: float = 0.0) -> List[str]:
+    """
+    与基线比较，返回回归描述列表。
+
+    :param results: 本次结果。
+    :param baseline: 基线结果。
+    :param tolerance: 允许的相对增幅，例如 0.25 表示慢或多占 25% 以内不算回归。
+    :param min_seconds: 前后耗时都低于该秒数的条目只比较峰值内存，毫秒级耗时受调度抖动影响过大。
+    :return: 回归条目描述。双方都记录了 relative 时比较耗时与本机参照之比，否则退回比较绝对秒数。
+    """
+    regressions = []
+    for size, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get(size, {}).get(name)
+            if not previous or "seconds" not in previous or "seconds" not in current:
+                continue
+            timing = "relative" if "relative" in previous and "relative" in current else "seconds"
+            compared = [timing, "peak_mb"]
+            if previous["seconds"] < min_seconds and current["seconds"] < min_seconds:
+                compared.remove(timing)
+            for metric in compared:
+                before, after = previous[metric], current[metric]
+                if before > 0 and after > before * (1 + tolerance):
+                    regressions.append(f"[{size}] {name} {metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _describe(result: Dict[str, Any]) -> str:
+    if "seconds" in result:
+        return f"{result['seconds']:.4f}s, 峰值 {result['peak_mb']:.1f} MB"
+    return result.get("error") or result.get("skipped", "")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="分析模块基准测试")
+    parser.add_argument("--sizes", default="10k", help="逗号分隔的规模，如 10k,1m,10m")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default="", help="逗号分隔的条目关键字过滤")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果写入基线文件")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="前后耗时都低于该值的条目不比较耗时")
+    parser.add_argument("--output", default=None, help="另存本次结果的 JSON 路径")
+    parser.add_argument("--compact", action="store_true", help="以紧凑内存模式加载数据")
+    parser.add_argument("--partitions", type=int, default=1, help="将合成数据均分为多个分区文件后按目录加载")
+    args = parser.parse_args()
+
+    sizes = [parse_rows(item) for item in args.sizes.split(",") if item.strip()]
+    only = [item.strip() for item in args.only.split(",") if item.strip()] or None
+    results = run_suite(sizes, args.seed, max(1, args.repeat), only, args.compact, max(1, args.partitions))
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    baseline: Dict[str, Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    if args.save_baseline:
+        merged = dict(baseline.get("results", {}))
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({**report, "results": merged}, file, ensure_ascii=False, indent=2)
+        print(f"[基线] 已写入 {args.baseline}")
+        return
+    regressions = compare(results, baseline.get("results", {}), args.tolerance, args.min_seconds)
+    for line in regressions:
+        print(f"[回归] {line}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
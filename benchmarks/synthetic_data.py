@@ -0,0 +1,226 @@
+"""
+可复现的合成销售数据生成器，输出列布局与 data/sales_data_utf8.csv 一致。
+
+商品目录、客户姓名、城市等取值从样例 CSV 中抽取，再按以下分布放大：
+- 商品热度与客户活跃度服从幂律（Zipf）分布；
+- 每单商品数服从几何分布；
+- 下单日期带年度增长与季节性（5/6 月与下半年为旺季）。
+
+用法：python -m benchmarks.synthetic_data --rows 1m --seed 42 --output outputs/bench_data/sales_1m.csv
+"""
+import argparse
+import os
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend import config
+
+SAMPLE_CSV = os.path.join(config.DATA_DIR, "sales_data_utf8.csv")
+COLUMNS = [
+    "行 ID", "order_id", "order_date", "发货日期", "邮寄方式", "customer_id", "客户名称", "细分", "城市",
+    "省/自治区", "国家", "地区", "product_id", "category", "sub_category", "product_name",
+    "sales", "quantity", "discount", "profit",
+]
+SIZE_ALIASES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+_SHIP_MODES = np.array(["标准级", "二级", "一级", "当日"])
+_SHIP_MODE_P = np.array([0.58, 0.22, 0.15, 0.05])
+_SHIP_DAYS = {"标准级": (3, 8), "二级": (1, 6), "一级": (1, 4), "当日": (0, 1)}
+_SEGMENTS = np.array(["消费者", "公司", "小型企业"])
+_SEGMENT_P = np.array([0.51, 0.31, 0.18])
+_DISCOUNTS = np.array([0.0, 0.1, 0.2, 0.25, 0.4, 0.6, 0.8])
+_DISCOUNT_P = np.array([0.725, 0.018, 0.02, 0.009, 0.207, 0.006, 0.015])
+# 月度季节性权重，参考样例数据中 5/6 月与 8-12 月销量约为淡季两倍
+_MONTH_WEIGHTS = np.array([1.0, 0.9, 1.1, 1.0, 2.0, 2.0, 1.0, 2.0, 1.9, 2.1, 2.1, 2.1])
+_MEAN_BASKET = 3.6
+_CHUNK_ORDERS = 250_000
+
+
+def parse_rows(value: str) -> int:
+    """解析 10k / 1m / 10m 或纯数字形式的行数。"""
+    text = value.strip().lower()
+    if text in SIZE_ALIASES:
+        return SIZE_ALIASES[text]
+    return int(text.replace("_", ""))
+
+
+def generate(
+    rows: int,
+    seed: int = 42,
+    output: Optional[str] = None,
+    sample_csv: str = SAMPLE_CSV,
+    start_year: int = 2021,
+    years: int = 4,
+) -> str:
+    """
+    生成合成销售明细并写入 CSV。
+
+    :param rows: 目标行数。
+    :param seed: 随机种子，相同种子与参数得到相同文件。
+    :param output: 输出路径，默认 outputs/bench_data/sales_<rows>_<seed>.csv。
+    :param sample_csv: 提供商品目录、姓名与地域取值的样例 CSV。
+    :param start_year: 起始年份。
+    :param years: 覆盖年数。
+    :return: 输出文件路径。
+    """
+    if rows <= 0:
+        raise ValueError("行数需为正整数。")
+    if output is None:
+        output = os.path.join(config.OUTPUT_DIR, "bench_data", f"sales_{rows}_{seed}.csv")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    rng = np.random.default_rng(seed)
+    catalog = _build_catalog(rng, sample_csv, n_products=int(min(20_000, max(500, rows // 5))))
+    customers = _build_customers(rng, sample_csv, n_customers=int(min(500_000, max(200, rows // 12))))
+    dates = _build_calendar(start_year, years)
+
+    written = 0
+    with open(output, "w", encoding="utf-8", newline="") as file:
+        file.write(",".join(COLUMNS) + "\n")
+        for chunk in _iter_chunks(rng, rows, catalog, customers, dates):
+            chunk.insert(0, "行 ID", np.arange(written + 1, written + len(chunk) + 1))
+            chunk.to_csv(file, header=False, index=False, float_format="%.4f")
+            written += len(chunk)
+    return output
+
+
+def _iter_chunks(
+    rng: np.random.Generator, rows: int, catalog: pd.DataFrame, customers: pd.DataFrame, dates: Dict[str, np.ndarray],
+) -> Iterator[pd.DataFrame]:
+    """按订单批次生成明细，单批内存与总行数无关。"""
+    product_p = _zipf_weights(len(catalog), 1.1, rng)
+    customer_p = _zipf_weights(len(customers), 0.8, rng)
+    remaining = rows
+    next_order = 0
+    while remaining > 0:
+        n_orders = int(min(_CHUNK_ORDERS, max(1, remaining / _MEAN_BASKET * 1.05)))
+        basket = np.minimum(rng.geometric(1 / _MEAN_BASKET, size=n_orders), 30)
+        cumulative = np.cumsum(basket)
+        if cumulative[-1] > remaining:
+            cut = int(np.searchsorted(cumulative, remaining))
+            basket = basket[: cut + 1]
+            basket[-1] -= cumulative[cut] - remaining
+            n_orders = len(basket)
+        lines = int(basket.sum())
+
+        order_day = rng.choice(len(dates["day"]), size=n_orders, p=dates["p"])
+        order_customer = rng.choice(len(customers), size=n_orders, p=customer_p)
+        order_ship = rng.choice(len(_SHIP_MODES), size=n_orders, p=_SHIP_MODE_P)
+        low = np.array([_SHIP_DAYS[mode][0] for mode in _SHIP_MODES])[order_ship]
+        high = np.array([_SHIP_DAYS[mode][1] for mode in _SHIP_MODES])[order_ship]
+        ship_lag = rng.integers(low, high + 1)
+        order_dates = dates["day"][order_day]
+        ship_dates = order_dates + ship_lag.astype("timedelta64[D]")
+        order_prefix = np.where(rng.random(n_orders) < 0.8, "CN", "US")
+        order_ids = pd.Series(order_prefix).str.cat(
+            pd.Series(pd.DatetimeIndex(order_dates).year.astype(str)).radd("20"), sep="-",
+        ).str.cat(pd.Series(np.arange(next_order, next_order + n_orders) + 1_000_000).astype(str), sep="-")
+        next_order += n_orders
+
+        owner = np.repeat(np.arange(n_orders), basket)
+        product_idx = rng.choice(len(catalog), size=lines, p=product_p)
+        quantity = np.minimum(1 + rng.poisson(2.8, size=lines), 14)
+        discount = rng.choice(_DISCOUNTS, size=lines, p=_DISCOUNT_P)
+        unit_price = catalog["unit_price"].to_numpy()[product_idx]
+        sales = unit_price * quantity * (1 - discount)
+        margin = catalog["margin"].to_numpy()[product_idx] - discount * 0.9 + rng.normal(0, 0.03, size=lines)
+        customer_rows = customers.iloc[order_customer[owner]].reset_index(drop=True)
+        product_rows = catalog.iloc[product_idx].reset_index(drop=True)
+
+        yield pd.DataFrame({
+            "order_id": order_ids.to_numpy()[owner],
+            "order_date": pd.DatetimeIndex(order_dates[owner]).strftime("%Y/%m/%d"),
+            "发货日期": pd.DatetimeIndex(ship_dates[owner]).strftime("%Y/%m/%d"),
+            "邮寄方式": _SHIP_MODES[order_ship[owner]],
+            "customer_id": customer_rows["customer_id"].to_numpy(),
+            "客户名称": customer_rows["客户名称"].to_numpy(),
+            "细分": customer_rows["细分"].to_numpy(),
+            "城市": customer_rows["城市"].to_numpy(),
+            "省/自治区": customer_rows["省/自治区"].to_numpy(),
+            "国家": "中国",
+            "地区": customer_rows["地区"].to_numpy(),
+            "product_id": product_rows["product_id"].to_numpy(),
+            "category": product_rows["category"].to_numpy(),
+            "sub_category": product_rows["sub_category"].to_numpy(),
+            "product_name": product_rows["product_name"].to_numpy(),
+            "sales": np.round(sales, 4),
+            "quantity": quantity,
+            "discount": discount,
+            "profit": np.round(sales * margin, 4),
+        })
+        remaining -= lines
+
+
+def _build_catalog(rng: np.random.Generator, sample_csv: str, n_products: int) -> pd.DataFrame:
+    """以样例中的商品名模板扩展出指定数量的商品，单价在模板中位价附近浮动。"""
+    sample = _read_sample(sample_csv)
+    sample = sample[sample["quantity"] > 0]
+    unit = sample["sales"] / sample["quantity"] / (1 - sample["discount"]).clip(lower=0.2)
+    templates = (
+        sample.assign(unit_price=unit)
+        .groupby(["category", "sub_category", "product_name"], observed=True)["unit_price"].median()
+        .reset_index()
+    )
+    picks = rng.integers(0, len(templates), size=n_products)
+    catalog = templates.iloc[picks].reset_index(drop=True)
+    catalog["unit_price"] = np.round(catalog["unit_price"] * rng.lognormal(0, 0.25, size=n_products), 2)
+    catalog["margin"] = np.clip(rng.normal(0.25, 0.1, size=n_products), 0.02, 0.5)
+    catalog["product_id"] = (
+        catalog["category"].str[:3] + "-" + catalog["sub_category"] + "-" + pd.Series(np.arange(10_000_000, 10_000_000 + n_products)).astype(str)
+    )
+    return catalog
+
+
+def _build_customers(rng: np.random.Generator, sample_csv: str, n_customers: int) -> pd.DataFrame:
+    """组合样例中的姓氏、名字与城市生成客户表。"""
+    sample = _read_sample(sample_csv)
+    names = sample["客户名称"].dropna().astype(str)
+    surnames = names.str[0].unique()
+    given = names.str[1:].replace("", np.nan).dropna().unique()
+    places = sample[["城市", "省/自治区", "地区"]].drop_duplicates().reset_index(drop=True)
+    full_names = pd.Series(rng.choice(surnames, size=n_customers)) + pd.Series(rng.choice(given, size=n_customers))
+    place_rows = places.iloc[rng.integers(0, len(places), size=n_customers)].reset_index(drop=True)
+    return pd.DataFrame({
+        "customer_id": full_names + "-" + pd.Series(np.arange(10_000, 10_000 + n_customers)).astype(str),
+        "客户名称": full_names,
+        "细分": rng.choice(_SEGMENTS, size=n_customers, p=_SEGMENT_P),
+        "城市": place_rows["城市"],
+        "省/自治区": place_rows["省/自治区"],
+        "地区": place_rows["地区"],
+    })
+
+
+def _build_calendar(start_year: int, years: int) -> Dict[str, np.ndarray]:
+    """生成日期及其抽样概率：月度季节性叠加每年约 15% 的增长。"""
+    days = pd.date_range(f"{start_year}-01-01", f"{start_year + years - 1}-12-31", freq="D")
+    weights = _MONTH_WEIGHTS[days.month.to_numpy() - 1] * (1.15 ** (days.year.to_numpy() - start_year))
+    return {"day": days.to_numpy().astype("datetime64[D]"), "p": weights / weights.sum()}
+
+
+def _zipf_weights(n: int, alpha: float, rng: np.random.Generator) -> np.ndarray:
+    """返回随机排列后的幂律概率，避免热门项总是目录前几项。"""
+    weights = 1.0 / np.arange(1, n + 1) ** alpha
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _read_sample(sample_csv: str) -> pd.DataFrame:
+    """读取样例 CSV，缺失时给出明确提示。"""
+    if not os.path.exists(sample_csv):
+        raise ValueError(f"未找到样例数据：{sample_csv}，合成数据需要其中的商品与地域取值。")
+    return pd.read_csv(sample_csv)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成可复现的合成销售数据")
+    parser.add_argument("--rows", default="10k", help="行数，支持 10k/100k/1m/10m 或具体数字")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    path = generate(parse_rows(args.rows), seed=args.seed, output=args.output)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""测试公共夹具：以仓库自带的样例 CSV 构建数据仓库。"""
+import pytest
+
+from backend import config
+from backend.data_loader import DataRepository
+
+
+@pytest.fixture
+def loaded_repo() -> DataRepository:
+    """加载样例数据的独立数据仓库。"""
+    repo = DataRepository(compact=False)
+    repo.load_csv(config.DEFAULT_CSV)
+    return repo
@@ -0,0 +1,96 @@
+"""接口准入控制：排队上限、排队超时、豁免方法与拒绝响应。"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import config
+from backend.main import _admission, app
+from backend.utils import metrics
+from backend.utils.admission import AdmissionController, AdmissionRejected, EndpointLimiter
+
+
+def test_full_queue_rejects_with_429():
+    async def scenario():
+        limiter = EndpointLimiter(concurrency=1, queue_size=0, queue_timeout=1)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        limiter.release()
+        return exc.value, limiter.stats()
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 429 and rejected.retry_after >= 1
+    assert stats["rejected"] == 1 and stats["active"] == 0
+
+
+def test_queue_timeout_rejects_with_503():
+    async def scenario():
+        limiter = EndpointLimiter(concurrency=1, queue_size=1, queue_timeout=0.05)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        return exc.value, limiter.stats()
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert stats["timed_out"] == 1 and stats["waiting"] == 0
+
+
+def test_slot_is_held_until_body_is_consumed():
+    async def scenario():
+        limiter = EndpointLimiter(concurrency=1, queue_size=0, queue_timeout=1)
+        await limiter.acquire()
+
+        async def body():
+            yield b"a"
+            yield b"b"
+
+        chunks = []
+        async for chunk in limiter.release_after(body()):
+            chunks.append(chunk)
+            assert limiter.active == 1
+        return chunks, limiter.active
+
+    chunks, active = asyncio.run(scenario())
+    assert chunks == [b"a", b"b"] and active == 0
+
+
+def test_controller_matches_method_and_path():
+    controller = AdmissionController({"/api/forecast": {"methods": ["GET", "POST"], "concurrency": 1, "queue": 0, "timeout": 1}})
+    assert controller.get("POST", "/api/forecast") is controller.get("GET", "/api/forecast")
+    assert controller.get("OPTIONS", "/api/forecast") is None
+    assert controller.get("HEAD", "/api/forecast") is None
+    assert controller.get("DELETE", "/api/forecast") is None
+
+
+def test_assign_shares_the_clustering_lane():
+    controller = AdmissionController(config.ADMISSION_LIMITS)
+    assert controller.get("POST", "/api/clustering/assign") is controller.get("POST", "/api/clustering")
+
+
+def test_rejection_carries_cors_headers_and_preflight_is_exempt():
+    limiter = _admission.get("POST", "/api/forecast")
+    origin = config.ALLOWED_ORIGINS[0]
+    client = TestClient(app)
+    labels = ("POST", "/api/forecast", "429")
+    rejected_before = metrics.REQUESTS_TOTAL._values.get(labels, 0.0)
+    queue_size = limiter.queue_size
+    # 占满名额且不允许排队，后续请求应立即被拒绝
+    limiter.queue_size = 0
+    limiter._semaphore._value = 0
+    try:
+        response = client.post("/api/forecast", json={"months": 3}, headers={"Origin": origin})
+        preflight = client.options(
+            "/api/forecast",
+            headers={"Origin": origin, "Access-Control-Request-Method": "POST"},
+        )
+    finally:
+        limiter._semaphore._value = limiter.concurrency
+        limiter.queue_size = queue_size
+    assert response.status_code == 429
+    assert response.headers["retry-after"]
+    assert response.headers["access-control-allow-origin"] == origin
+    # 被拒绝的请求按其路径计入指标，而非 unmatched
+    assert metrics.REQUESTS_TOTAL._values.get(labels, 0.0) == rejected_before + 1
+    assert preflight.status_code == 200
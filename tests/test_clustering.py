@@ -0,0 +1,98 @@
+"""聚类模型缓存与新客户归类：已有客户按编号、新客户按订单明细现算 RFM，模型跨追加沿用。"""
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from backend import config
+from backend.data_loader import build_rfm_features
+from backend.main import app
+from backend.modules import clustering
+
+
+def test_assign_known_customers_matches_fit(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+    entry = clustering.fit_cluster_model(snapshot, 3)
+    fitted = entry["cluster_df"].assign(customer_id=entry["cluster_df"]["customer_id"].astype(str)).set_index("customer_id")
+    known = fitted.index[:5].tolist()
+
+    result = clustering.assign_clusters(snapshot, known + ["no-such-customer"], k=3)
+
+    items = result["items"].set_index("customer_id")
+    assert (items.loc[known, "cluster"] == fitted.loc[known, "cluster"]).all()
+    assert set(items["label"]) <= set(entry["labels"].values())
+    assert result["missing"] == ["no-such-customer"]
+
+
+def test_assign_new_customer_from_order_lines(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+    entry = clustering.fit_cluster_model(snapshot, 3)
+    latest = snapshot.get_latest_date()
+    lines = pd.DataFrame([
+        {"customer_id": "NEW-1", "order_id": "N1", "order_date": latest - pd.Timedelta(days=3), "sales": 120.0},
+        {"customer_id": "NEW-1", "order_id": "N1", "order_date": latest - pd.Timedelta(days=3), "sales": 30.0},
+        {"customer_id": "NEW-1", "order_id": "N2", "order_date": latest - pd.Timedelta(days=40), "sales": 50.0},
+    ])
+
+    result = clustering.assign_clusters(snapshot, lines=lines, k=3)
+
+    row = result["items"].iloc[0]
+    assert (row["customer_id"], row["R"], row["F"], row["M"]) == ("NEW-1", 3, 2, 200.0)
+    features = build_rfm_features(lines, latest)[["R", "F", "M"]]
+    expected = int(entry["model"].predict(entry["scaler"].transform(features))[0])
+    assert row["cluster"] == expected and row["label"] == entry["labels"][expected]
+    assert result["missing"] == []
+
+
+def test_model_survives_append_until_refit(loaded_repo):
+    before = loaded_repo.snapshot()
+    entry = clustering.fit_cluster_model(before, 3)
+    extra = loaded_repo.raw_df.head(3).copy()
+    extra["order_id"] = ["APPEND-1", "APPEND-2", "APPEND-3"]
+    extra["customer_id"] = "APPEND-CUSTOMER"
+    loaded_repo.append_records(extra)
+    after = loaded_repo.snapshot()
+
+    assert after.version != before.version and after.lineage == before.lineage
+    assert clustering.fit_cluster_model(after, 3) is entry
+    cluster_df, summary = clustering.current_clusters(after, 3)
+    # 追加的客户由沿用的模型直接 predict 归类
+    assert "APPEND-CUSTOMER" in set(cluster_df["customer_id"].astype(str))
+    assert int(summary["count"].sum()) == len(after.rfm)
+
+    refitted = clustering.fit_cluster_model(after, 3, refit=True)
+    assert refitted is not entry and refitted["version"] == after.version
+    assert clustering.fit_cluster_model(after, 3, refit=True) is refitted
+
+
+def test_assign_endpoint_reports_missing():
+    client = TestClient(app)
+    response = client.post("/api/clustering/assign", json={
+        "customer_ids": ["no-such-customer"],
+        "orders": [{"customer_id": "NEW-2", "order_id": "N9", "order_date": "2030-01-01T00:00:00", "sales": 99.5}],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 1 and body["items"][0]["customer_id"] == "NEW-2"
+    assert body["missing"] == ["no-such-customer"]
+    assert client.post("/api/clustering/assign", json={"customer_ids": ["no-such-customer"]}).status_code == 400
+
+
+def test_out_of_range_k_rejected():
+    client = TestClient(app)
+    for k in (1, config.MAX_CLUSTER_K + 1):
+        assert client.post("/api/clustering", json={"k": k}).status_code == 422
+        assert client.get("/api/clustering", params={"k": k}).status_code == 422
+        assert client.post("/api/clustering/assign", json={"customer_ids": ["x"], "k": k}).status_code == 422
+        assert client.post("/api/export", json={"target": "cluster", "k": k}).status_code == 422
+
+
+def test_model_cache_is_capped_per_lineage(loaded_repo, monkeypatch):
+    monkeypatch.setattr(config, "CLUSTER_MODELS_PER_LINEAGE", 2)
+    snapshot = loaded_repo.snapshot()
+    first = clustering.fit_cluster_model(snapshot, 2)
+    clustering.fit_cluster_model(snapshot, 3)
+    clustering.fit_cluster_model(snapshot, 4)
+
+    kept = sorted(k for lineage, k in clustering._CLUSTER_MODEL_CACHE if lineage == snapshot.lineage)
+    assert kept == [3, 4]
+    # 被淘汰的 k 再次请求时重新训练
+    assert clustering.fit_cluster_model(snapshot, 2) is not first
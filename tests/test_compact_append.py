@@ -0,0 +1,35 @@
+"""紧凑模式下增量追加：只紧凑化新增行，结果与一次性加载一致。"""
+import pandas as pd
+
+from backend import config
+from backend.data_loader import DataRepository
+
+
+def test_append_keeps_codes_and_matches_full_load(tmp_path):
+    source = pd.read_csv(config.DEFAULT_CSV)
+    head, tail = source.iloc[: len(source) // 2], source.iloc[len(source) // 2:]
+    head_path, full_path = tmp_path / "head.csv", tmp_path / "full.csv"
+    head.to_csv(head_path, index=False)
+    source.to_csv(full_path, index=False)
+
+    repo = DataRepository(compact=True)
+    repo.load_csv(str(head_path))
+    before = repo.snapshot()
+    before_codes = before.raw_df["product_id"].cat.codes.copy()
+    assert repo.append_records(tail.copy()) == len(tail)
+    after = repo.snapshot()
+
+    # 已有行的字典编码保持不变，新类别追加在字典末尾
+    assert (after.raw_df["product_id"].cat.codes.iloc[: len(before_codes)].to_numpy() == before_codes.to_numpy()).all()
+    assert isinstance(after.raw_df["customer_id"].dtype, pd.CategoricalDtype)
+    assert after.raw_df["sales"].dtype == "float32"
+
+    full = DataRepository(compact=True)
+    full.load_csv(str(full_path))
+    customers = full.snapshot().customers
+    expected = customers.set_index(customers["customer_id"].astype(str))
+    actual = after.customers.set_index(after.customers["customer_id"].astype(str))
+    assert actual["total_sales"].dtype == "float64"
+    pd.testing.assert_series_equal(
+        actual["total_sales"].sort_index(), expected["total_sales"].sort_index(), check_names=False, check_index_type=False
+    )
@@ -0,0 +1,63 @@
+"""数据上传与追加接口：追加在线程池中执行，并增量刷新 RFM 等视图。"""
+import io
+import threading
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from backend import config
+from backend.main import app
+
+
+def _append_csv() -> bytes:
+    rows = pd.read_csv(config.DEFAULT_CSV).head(4).copy()
+    rows["order_id"] = [f"APPEND-{i}" for i in range(4)]
+    return rows.to_csv(index=False).encode("utf-8")
+
+
+def test_append_endpoint_updates_dataset():
+    client = TestClient(app)
+    assert client.post("/api/data/load", json={"dataset_id": "append-api"}).status_code == 200
+    before = client.get("/api/data/overview", params={"dataset_id": "append-api"}).json()
+
+    response = client.post(
+        "/api/data/append",
+        params={"dataset_id": "append-api"},
+        files={"file": ("more.csv", io.BytesIO(_append_csv()), "text/csv")},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["appended"] == 4
+    assert body["overview"]["records"] == before["records"] + 4
+    assert body["overview"]["orders"] == before["orders"] + 4
+    assert body["overview"]["version"] != before["version"]
+
+
+def test_append_runs_off_the_event_loop(monkeypatch):
+    from backend.data_loader import DataRepository
+
+    threads = []
+    original = DataRepository.append_csv
+
+    def spy(self, source):
+        threads.append(threading.current_thread())
+        return original(self, source)
+
+    monkeypatch.setattr(DataRepository, "append_csv", spy)
+    client = TestClient(app)
+    client.post("/api/data/load", json={"dataset_id": "append-api-thread"})
+    response = client.post(
+        "/api/data/append",
+        params={"dataset_id": "append-api-thread"},
+        files={"file": ("more.csv", io.BytesIO(_append_csv()), "text/csv")},
+    )
+    assert response.status_code == 200
+    # 同步接口由 anyio 线程池执行，而不是在事件循环线程中运行
+    assert threads and threads[0].name == "AnyIO worker thread"
+
+
+def test_append_rejects_non_csv():
+    client = TestClient(app)
+    response = client.post("/api/data/append", files={"file": ("more.txt", io.BytesIO(b"x"), "text/plain")})
+    assert response.status_code == 400
@@ -0,0 +1,103 @@
+"""数据集注册表的换出、重新挂载与并发取快照。"""
+import threading
+
+from backend import config
+from backend.data_loader import DataRepository, DatasetRegistry, is_live_version
+from backend.modules import promotion
+
+
+def _registry(tmp_path, budget_bytes: int) -> DatasetRegistry:
+    default = DataRepository(compact=False)
+    default.load_csv(config.DEFAULT_CSV)
+    registry = DatasetRegistry(default, budget_bytes, str(tmp_path / "datasets"))
+    registry.get_or_create("other").load_csv(config.DEFAULT_CSV)
+    return registry
+
+
+def _sorted_products(snapshot) -> list:
+    products = snapshot.products
+    return sorted(zip(products["product_id"].astype(str), products["product_name"].astype(str), products["quantity"].tolist()))
+
+
+def test_spill_and_reload_keep_content(tmp_path):
+    registry = _registry(tmp_path, 0)
+    repo = registry.get("other")
+    before = repo.snapshot()
+    expected = _sorted_products(before)
+
+    assert repo.spill(str(tmp_path / "datasets" / "other"))
+    assert repo.spilled and repo.raw_df is None
+    # 换出只替换引用，之前取得的快照仍然可用
+    assert before.raw_df is not None
+
+    snapshot = registry.snapshot("other")
+    assert not repo.spilled
+    assert len(snapshot.raw_df) == len(before.raw_df)
+    assert _sorted_products(snapshot) == expected
+
+
+def test_resident_bytes_excludes_mapped_columns(tmp_path):
+    registry = _registry(tmp_path, 0)
+    repo = registry.get("other")
+    repo.snapshot().materialize()
+    repo.spill(str(tmp_path / "datasets" / "other"))
+    snapshot = registry.snapshot("other")
+    heap = sum(int(item["bytes"]) for item in snapshot.memory_report().values())
+    assert 0 < snapshot.resident_bytes() < heap
+
+
+def test_concurrent_snapshots_never_see_spilled_dataset(tmp_path):
+    # 预算为 1 字节：每次取用一个数据集都会换出另一个，两个线程交替取用时不断发生换出与重新挂载
+    registry = _registry(tmp_path, 1)
+    errors = []
+
+    def worker(dataset_id: str) -> None:
+        for _ in range(30):
+            snapshot = registry.snapshot(dataset_id)
+            if snapshot.raw_df is None:
+                errors.append(dataset_id)
+            # 加载或追加后的预算检查，与另一线程的取用交错执行
+            registry.enforce_budget(keep=dataset_id)
+
+    threads = [threading.Thread(target=worker, args=(dataset_id,)) for dataset_id in ("default", "other")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_reload_keeps_version_and_caches(tmp_path):
+    registry = _registry(tmp_path, 0)
+    repo = registry.get("other")
+    before = repo.snapshot()
+    index = promotion.get_promotion_index(before)
+
+    repo.spill(str(tmp_path / "datasets" / "other"))
+    # 换出期间版本仍视为在用，按版本缓存的结果不会被其它数据集的新条目清理
+    assert is_live_version(before.version)
+
+    after = registry.snapshot("other")
+    assert (after.version, after.lineage) == (before.version, before.lineage)
+    assert promotion.get_promotion_index(after) is index
+
+
+def test_access_does_not_enforce_budget_inline(tmp_path, monkeypatch):
+    registry = _registry(tmp_path, 1)
+    calls = []
+    original = registry.enforce_budget
+
+    def record(keep=None):
+        calls.append(threading.current_thread())
+        return original(keep=keep)
+
+    monkeypatch.setattr(registry, "enforce_budget", record)
+    registry.snapshot("other").materialize()
+    registry.snapshot("other")
+    if registry._checker is not None:
+        registry._checker.join(timeout=30)
+
+    assert calls and all(thread is not threading.current_thread() for thread in calls)
+    # 后台检查按预算换出了最久未用的默认数据集，正在使用的数据集保留
+    assert registry.get("other").raw_df is not None
+    assert registry._repos["default"].spilled
@@ -0,0 +1,35 @@
+"""内存诊断接口与剖析接口共用 X-Profile 令牌，未授权请求不触发深度统计。"""
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import config
+from backend.main import app
+from backend.utils import memory
+
+
+@pytest.fixture
+def client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(config, "PROFILE_TOKEN", "secret")
+    return TestClient(app)
+
+
+def test_memory_report_requires_token(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(memory, "cache_report", lambda: calls.append(1) or {})
+
+    assert client.get("/api/debug/memory").status_code == 403
+    assert client.get("/api/debug/memory", headers={"X-Profile": "wrong"}).status_code == 403
+    assert client.get("/api/debug/memory", params={"trace": "diff"}).status_code == 403
+    assert calls == []
+
+    response = client.get("/api/debug/memory", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    assert {"process", "views", "caches", "largest"} <= set(response.json())
+    assert calls == [1]
+
+
+def test_memory_report_disabled_without_configured_token(monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_TOKEN", "")
+    client = TestClient(app)
+    assert client.get("/api/debug/memory").status_code == 403
+    assert client.get("/api/debug/memory", headers={"X-Profile": ""}).status_code == 403
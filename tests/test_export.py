@@ -0,0 +1,63 @@
+"""流式导出：CSV、gzip CSV 与 Parquet 的内容正确，已压缩的下载不经 gzip 中间件二次压缩。"""
+import gzip
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+
+def _client() -> TestClient:
+    client = TestClient(app)
+    assert client.post("/api/data/load", json={"dataset_id": "export-api"}).status_code == 200
+    return client
+
+
+def test_csv_export_matches_forecast():
+    client = _client()
+    forecast = client.post("/api/forecast", json={"dataset_id": "export-api", "months": 4}).json()["forecast"]
+
+    response = client.post("/api/export", json={"dataset_id": "export-api", "target": "forecast", "months": 4})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    exported = pd.read_csv(io.BytesIO(response.content), encoding="utf-8-sig")
+    assert exported["period"].tolist() == [row["period"] for row in forecast]
+
+
+def test_gzip_export_is_compressed_once():
+    client = _client()
+    response = client.post(
+        "/api/export",
+        json={"dataset_id": "export-api", "target": "promotion", "compress": True},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in response.headers
+    assert "promotion.csv.gz" in response.headers["content-disposition"]
+    exported = pd.read_csv(io.BytesIO(gzip.decompress(response.content)), encoding="utf-8-sig")
+    assert len(exported) > 0
+
+
+def test_parquet_export_by_result_id():
+    pytest.importorskip("pyarrow")
+    client = _client()
+    result = client.post("/api/clustering", json={"dataset_id": "export-api", "k": 3}).json()
+
+    response = client.post("/api/export", json={"dataset_id": "export-api", "result_id": result["result_id"], "format": "parquet"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    exported = pd.read_parquet(io.BytesIO(response.content))
+    assert len(exported) == result["total"]
+
+
+def test_export_errors():
+    client = _client()
+    assert client.post("/api/export", json={"dataset_id": "export-api"}).status_code == 400
+    assert client.post("/api/export", json={"dataset_id": "export-api", "target": "unknown"}).status_code == 400
+    assert client.post("/api/export", json={"dataset_id": "export-api", "result_id": "expired"}).status_code == 404
@@ -0,0 +1,29 @@
+"""预测月数有界：越界请求在参数校验阶段拒绝，不进入预测缓存与 ARIMA 外推。"""
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import config
+from backend.main import app
+from backend.modules import forecast
+
+
+@pytest.mark.parametrize("months", [0, -1, config.MAX_FORECAST_MONTHS + 1, 10**9])
+def test_out_of_range_months_rejected(months):
+    client = TestClient(app)
+    before = set(forecast._FORECAST_CACHE)
+
+    assert client.post("/api/forecast", json={"months": months}).status_code == 422
+    assert client.get("/api/forecast", params={"months": months}).status_code == 422
+    assert client.post("/api/export", json={"target": "forecast", "months": months}).status_code == 422
+    assert set(forecast._FORECAST_CACHE) == before
+
+
+def test_module_rejects_unbounded_months(loaded_repo):
+    with pytest.raises(ValueError):
+        forecast.forecast_report(loaded_repo.snapshot(), config.MAX_FORECAST_MONTHS + 1)
+
+
+def test_max_months_is_served():
+    response = TestClient(app).post("/api/forecast", json={"months": config.MAX_FORECAST_MONTHS})
+    assert response.status_code == 200
+    assert len(response.json()["forecast"]) == config.MAX_FORECAST_MONTHS
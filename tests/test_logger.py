@@ -0,0 +1,50 @@
+"""日志采样与传递：采样信息写入记录属性而不改写消息，默认继续传递给根记录器。"""
+import json
+import logging
+
+from backend import config
+from backend.utils.logger import LOGGER, JsonLinesFormatter, SampledFormatter, SamplingFilter
+
+
+def _record(msg: str = "已读取 %s 个客户", level: int = logging.INFO, created: float = 100.0) -> logging.LogRecord:
+    record = logging.LogRecord("supermarket_ai", level, "/app/module.py", 42, msg, (7,), None)
+    record.created = created
+    return record
+
+
+def test_sampling_sets_attributes_without_rewriting_message():
+    sampler = SamplingFilter(window=60, burst=2, every=3)
+    records = [_record() for _ in range(8)]
+
+    passed = [record for record in records if sampler.filter(record)]
+
+    # 前 2 条全部放行，之后每 3 条放行 1 条
+    assert passed == [records[0], records[1], records[4], records[7]]
+    assert [(r.sample_rate, r.sample_suppressed) for r in passed] == [(1, 0), (1, 0), (3, 2), (3, 2)]
+    assert all(r.msg == "已读取 %s 个客户" and r.getMessage() == "已读取 7 个客户" for r in records)
+
+
+def test_warnings_and_new_window_are_not_sampled():
+    sampler = SamplingFilter(window=10, burst=1, every=100)
+    assert sampler.filter(_record())
+    assert not sampler.filter(_record())
+    assert sampler.filter(_record(level=logging.WARNING))
+    assert sampler.filter(_record(created=111.0))
+
+
+def test_formatters_report_suppressed_count():
+    record = _record()
+    record.sample_rate, record.sample_suppressed = 3, 2
+
+    assert SampledFormatter("%(message)s").format(record) == "已读取 7 个客户（同位置已采样抑制 2 条）"
+    payload = json.loads(JsonLinesFormatter().format(record))
+    assert payload["message"] == "已读取 7 个客户"
+    assert (payload["sample_rate"], payload["sample_suppressed"]) == (3, 2)
+    assert SampledFormatter("%(message)s").format(_record()) == "已读取 7 个客户"
+
+
+def test_logger_propagates_by_default(caplog):
+    assert config.LOG_PROPAGATE and LOGGER.propagate
+    with caplog.at_level(logging.INFO, logger="supermarket_ai"):
+        LOGGER.info("传递到根记录器 %s", "ok")
+    assert "传递到根记录器 ok" in caplog.messages
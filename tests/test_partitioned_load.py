@@ -0,0 +1,104 @@
+"""按时间分区加载：目录与通配符并行读取、按日期窗口跳过分区，分区索引持久化并随文件变化失效。"""
+import os
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from backend import config, data_loader
+from backend.data_loader import DataRepository
+
+
+@pytest.fixture
+def partitions(tmp_path, monkeypatch):
+    """按年份拆分样例 CSV，并为每个测试使用独立的分区索引文件。"""
+    monkeypatch.setattr(config, "PARTITION_INDEX_PATH", str(tmp_path / "partition_index.json"))
+    monkeypatch.setattr(data_loader, "_PARTITION_INDEX", {})
+    monkeypatch.setattr(data_loader, "_partition_index_loaded", False)
+    source = pd.read_csv(config.DEFAULT_CSV)
+    years = pd.to_datetime(source["order_date"]).dt.year
+    folder = tmp_path / "monthly"
+    folder.mkdir()
+    for year, part in source.groupby(years):
+        part.to_csv(folder / f"sales_{year}.csv", index=False)
+    return folder
+
+
+def _spy_reads(monkeypatch) -> list:
+    read = DataRepository._read_partition
+    paths = []
+
+    def spy(self, path, *args):
+        paths.append(os.path.basename(path))
+        return read(self, path, *args)
+
+    monkeypatch.setattr(DataRepository, "_read_partition", spy)
+    return paths
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_directory_and_glob_match_single_file(partitions, compact, monkeypatch):
+    workers = []
+    real_pool = data_loader.ThreadPoolExecutor
+
+    def pool(max_workers):
+        workers.append(max_workers)
+        return real_pool(max_workers=max_workers)
+
+    monkeypatch.setattr(data_loader, "ThreadPoolExecutor", pool)
+    monkeypatch.setattr(config, "LOAD_WORKERS", 2)
+    single = DataRepository(compact=compact)
+    single.load_csv(config.DEFAULT_CSV)
+    expected = single.overview()
+
+    for path in (str(partitions), str(partitions / "sales_*.csv")):
+        repo = DataRepository(compact=compact)
+        repo.load_csv(path)
+        overview = repo.overview()
+        for key in ("records", "orders", "customers", "products"):
+            assert overview[key] == expected[key]
+        assert repo.raw_df["sales"].sum() == pytest.approx(single.raw_df["sales"].sum())
+        assert [item["loaded"] for item in repo.snapshot().partitions] == [True] * 4
+    assert workers == [2, 2]
+
+
+def test_date_window_skips_indexed_partitions(partitions, monkeypatch):
+    DataRepository().load_csv(str(partitions))
+    reads = _spy_reads(monkeypatch)
+
+    repo = DataRepository()
+    repo.load_csv(str(partitions), start_date=date(2023, 3, 1), end_date=date(2023, 6, 30))
+
+    assert reads == ["sales_2023.csv"]
+    dates = repo.raw_df["order_date"]
+    assert dates.min() >= pd.Timestamp("2023-03-01") and dates.max() <= pd.Timestamp("2023-06-30")
+    loaded = {os.path.basename(item["path"]): item["loaded"] for item in repo.snapshot().partitions}
+    assert loaded == {"sales_2021.csv": False, "sales_2022.csv": False, "sales_2023.csv": True, "sales_2024.csv": False}
+
+
+def test_partition_index_persists_and_invalidates(partitions, monkeypatch):
+    DataRepository().load_csv(str(partitions))
+    assert os.path.exists(config.PARTITION_INDEX_PATH)
+
+    # 模拟重启：内存中的索引清空后从磁盘恢复，首次按窗口加载即可剪枝
+    monkeypatch.setattr(data_loader, "_PARTITION_INDEX", {})
+    monkeypatch.setattr(data_loader, "_partition_index_loaded", False)
+    reads = _spy_reads(monkeypatch)
+    DataRepository().load_csv(str(partitions), start_date=date(2024, 1, 1))
+    assert reads == ["sales_2024.csv"]
+
+    # 分区文件被改写后索引记录失效，需重新读取该文件确认日期范围
+    changed = partitions / "sales_2021.csv"
+    pd.read_csv(changed).head(10).to_csv(changed, index=False)
+    reads.clear()
+    DataRepository().load_csv(str(partitions), start_date=date(2024, 1, 1))
+    assert sorted(reads) == ["sales_2021.csv", "sales_2024.csv"]
+
+
+def test_empty_window_and_missing_sources(partitions):
+    with pytest.raises(ValueError):
+        DataRepository().load_csv(str(partitions), start_date=date(2030, 1, 1))
+    with pytest.raises(ValueError):
+        DataRepository().load_csv(str(partitions), start_date=date(2024, 1, 2), end_date=date(2024, 1, 1))
+    with pytest.raises(FileNotFoundError):
+        DataRepository().load_csv(str(partitions / "missing_*.csv"))
@@ -0,0 +1,61 @@
+"""按需请求剖析：只有携带正确 X-Profile 令牌的请求被剖析，结果保存为 pstats 与折叠栈文件。"""
+import os
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import config
+from backend import main
+from backend.main import app
+
+
+@pytest.fixture
+def client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(config, "PROFILE_TOKEN", "secret")
+    return TestClient(app)
+
+
+def _remove(profile_id: str) -> None:
+    for suffix in (".pstats", ".collapsed"):
+        path = os.path.join(config.PROFILE_DIR, profile_id + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_profiled_request_saves_output(client):
+    response = client.post("/api/forecast", json={"months": 2}, headers={"X-Profile": "secret"})
+
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    try:
+        stats_path = os.path.join(config.PROFILE_DIR, f"{profile_id}.pstats")
+        assert os.path.exists(stats_path)
+        assert os.path.exists(os.path.join(config.PROFILE_DIR, f"{profile_id}.collapsed"))
+        functions = {name for _, _, name in pstats.Stats(stats_path).stats}
+        assert "forecast_report" in functions
+
+        headers = {"X-Profile": "secret"}
+        listed = client.get("/api/debug/profiles", headers=headers).json()["profiles"]
+        assert profile_id in {item["profile_id"] for item in listed}
+        summary = client.get(f"/api/debug/profiles/{profile_id}", headers=headers)
+        assert summary.status_code == 200 and "forecast_report" in summary.text
+    finally:
+        _remove(profile_id)
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "wrong"}, {"X-Profile": "secre"}])
+def test_requests_without_valid_token_are_not_profiled(client, headers):
+    response = client.post("/api/forecast", json={"months": 2}, headers=headers)
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/api/debug/profiles", headers=headers).status_code == 403
+
+
+def test_token_uses_constant_time_compare(client, monkeypatch):
+    calls = []
+    real = main.hmac.compare_digest
+    monkeypatch.setattr(main.hmac, "compare_digest", lambda a, b: calls.append((a, b)) or real(a, b))
+
+    assert client.get("/api/debug/profiles", headers={"X-Profile": "secret"}).status_code == 200
+    assert (b"secret", b"secret") in calls
@@ -0,0 +1,51 @@
+"""促销筛选索引与逐次过滤的 select_promotion_candidates 结果一致。"""
+import pandas as pd
+import pytest
+
+from backend import config
+from backend.data_loader import DataRepository
+from backend.modules import promotion
+
+RULES = [
+    config.DEFAULT_PROMOTION_RULE,
+    {"min_quantity": 0, "max_quantity": float("inf"), "min_profit_rate": -10, "max_discount": 1},
+    {"min_quantity": 3, "max_quantity": 12, "min_profit_rate": 0.1, "max_discount": 0.2},
+    {"min_quantity": 5, "max_quantity": 5, "min_profit_rate": 0, "max_discount": 0},
+    {"min_quantity": 100000, "max_quantity": float("inf"), "min_profit_rate": 0, "max_discount": 1},
+]
+
+
+def _rows(frame: pd.DataFrame) -> list:
+    return sorted(zip(frame["product_id"].astype(str), frame["product_name"].astype(str), frame["reason"]))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("rule", RULES)
+def test_index_matches_select(compact, rule):
+    repo = DataRepository(compact=compact)
+    repo.load_csv(config.DEFAULT_CSV)
+    snapshot = repo.snapshot()
+
+    expected = promotion.select_promotion_candidates(snapshot.products, rule)
+    actual, facets = promotion.screen_promotion_candidates(snapshot, rule)
+
+    assert _rows(actual) == _rows(expected)
+    # 索引结果已按默认展示顺序排列：利润率升序、销量降序
+    ordered = actual.sort_values(by=["profit_rate", "quantity"], ascending=[True, False], kind="mergesort")
+    assert list(ordered.index) == list(actual.index)
+    assert sum(facets.get("category", {}).values()) == len(actual)
+
+
+def test_category_filter_and_facets(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+    rule = {"min_quantity": 0, "max_quantity": float("inf"), "min_profit_rate": -10, "max_discount": 1}
+    everything, facets = promotion.screen_promotion_candidates(snapshot, rule)
+    category = sorted(facets["category"])[0]
+
+    filtered, filtered_facets = promotion.screen_promotion_candidates(snapshot, {**rule, "categories": category})
+
+    assert len(filtered) == facets["category"][category]
+    assert set(filtered["category"].astype(str)) == {category}
+    # 分面计数不受本字段自身过滤影响
+    assert filtered_facets["category"] == facets["category"]
+    assert len(everything) == len(snapshot.products)
@@ -0,0 +1,43 @@
+"""实时事件滑动窗口：过期扣减、误差重算、商品名称清理与数据集校验。"""
+import random
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.modules.realtime import RealtimeAggregator, SlidingWindow
+
+
+def test_totals_resync_after_rotation():
+    window = SlidingWindow(buckets=4, bucket_seconds=1)
+    rng = random.Random(0)
+    for second in range(400):
+        for _ in range(5):
+            window.add(second + 0.5, f"p{rng.randrange(20)}", rng.uniform(0, 1000) / 7, 1, rng.uniform(-50, 50) / 3)
+    window.advance(400)
+    expected = sum(sums[0] for slot, sums in enumerate(window._sums) if window._slots[slot] != -1)
+    assert window.totals[0] == expected
+    assert window.totals[3] == 5 * 3
+    # 全部过期后合计回到精确的 0
+    window.advance(1000)
+    assert window.totals == [0.0, 0.0, 0.0, 0] and window.product_totals == {}
+
+
+def test_names_dropped_when_products_leave_all_windows():
+    aggregator = RealtimeAggregator({"short": (2, 1), "long": (3, 10)})
+    aggregator.ingest([{"product_id": "a", "product_name": "苹果", "sales": 1.0, "timestamp": 100.0}], now=100.0)
+    aggregator.ingest([{"product_id": "b", "product_name": "香蕉", "sales": 2.0, "timestamp": 105.0}], now=105.0)
+
+    # 短窗口已过期，长窗口仍包含 a，名称需保留
+    summary = aggregator.summary("long", now=105.0)
+    assert {item["product_name"] for item in summary["top_products"]} == {"苹果", "香蕉"}
+
+    aggregator.summary("long", now=500.0)
+    assert aggregator._names == {}
+
+
+def test_unknown_dataset_returns_404():
+    client = TestClient(app)
+    event = {"order_id": "o1", "product_id": "x", "sales": 1.0}
+    assert client.post("/api/events", json={"dataset_id": "no-such-dataset", "events": [event]}).status_code == 404
+    assert client.get("/api/events/summary", params={"dataset_id": "no-such-dataset"}).status_code == 404
+    assert client.get("/api/events/summary").status_code == 200
@@ -0,0 +1,42 @@
+"""快速 JSON 响应：标准库回退路径与 orjson 输出一致，预测结果支持分页。"""
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.utils import response
+
+
+PAYLOAD = {"a": float("nan"), "b": [np.float64("inf"), np.float32(1.5), -float("inf")], "c": {"d": np.int64(3)}}
+
+
+def test_fallback_writes_null_for_non_finite(monkeypatch):
+    monkeypatch.setattr(response, "orjson", None)
+    body = response.FastJSONResponse(PAYLOAD).body
+
+    assert b"NaN" not in body and b"Infinity" not in body
+    assert json.loads(body) == {"a": None, "b": [None, 1.5, None], "c": {"d": 3}}
+
+
+def test_fallback_matches_orjson(monkeypatch):
+    if response.orjson is None:
+        pytest.skip("未安装 orjson")
+    fast = json.loads(response.FastJSONResponse(PAYLOAD).body)
+    monkeypatch.setattr(response, "orjson", None)
+    assert json.loads(response.FastJSONResponse(PAYLOAD).body) == fast
+
+
+def test_forecast_is_paged():
+    client = TestClient(app)
+    full = client.post("/api/forecast", json={"months": 6}).json()
+    page = client.post("/api/forecast", json={"months": 6, "limit": 2, "offset": 2}).json()
+
+    assert full["total"] == page["total"] == 6 and full["next_offset"] is None
+    assert page["forecast"] == full["forecast"][2:4]
+    assert (page["offset"], page["limit"], page["next_offset"]) == (2, 2, 4)
+    assert page["history"] == full["history"]
+
+    columns = client.get("/api/forecast", params={"months": 6, "layout": "columns", "limit": 3}).json()
+    assert len(columns["forecast"]["data"]["period"]) == 3
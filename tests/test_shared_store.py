@@ -0,0 +1,76 @@
+"""共享数据存储：列类型往返与并发发布。"""
+import functools
+import os
+import threading
+
+import pandas as pd
+
+from backend.data_loader import DataRepository
+from backend.utils import shared_store
+
+
+def _views(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+    return snapshot.materialize()
+
+
+def test_round_trip_keeps_dtypes_when_not_compact(tmp_path, loaded_repo):
+    views = _views(loaded_repo)
+    shared_store.publish(views, "sample.csv", compact=False, root=str(tmp_path))
+    attached = shared_store.attach(shared_store.read_manifest(str(tmp_path)), str(tmp_path))
+    for name, view in views.items():
+        assert attached[name].dtypes.astype(str).to_dict() == view.dtypes.astype(str).to_dict(), name
+        pd.testing.assert_frame_equal(attached[name], view.reset_index(drop=True), check_exact=False)
+
+
+def test_compact_round_trip_stores_strings_as_category(tmp_path, loaded_repo):
+    views = _views(loaded_repo)
+    shared_store.publish(views, "sample.csv", compact=True, root=str(tmp_path))
+    attached = shared_store.attach(shared_store.read_manifest(str(tmp_path)), str(tmp_path))
+    raw = attached["raw_df"]
+    assert isinstance(raw["customer_id"].dtype, pd.CategoricalDtype)
+    assert raw["customer_id"].astype(str).tolist() == views["raw_df"]["customer_id"].astype(str).tolist()
+    # 数值列直接引用映射文件
+    assert shared_store.is_mapped(raw["sales"])
+
+
+def test_concurrent_publishes_get_distinct_versions(tmp_path, loaded_repo):
+    views = {"products": loaded_repo.snapshot().products}
+    versions = []
+
+    def worker() -> None:
+        versions.append(shared_store.publish(views, "sample.csv", compact=False, root=str(tmp_path)))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(versions) == list(range(1, 7))
+    manifest = shared_store.read_manifest(str(tmp_path))
+    assert manifest["version"] == 6
+    attached = shared_store.attach(manifest, str(tmp_path))
+    assert len(attached["products"]) == len(views["products"])
+
+
+def test_sync_retries_when_version_directory_is_cleaned_up(tmp_path, loaded_repo, monkeypatch):
+    root = str(tmp_path)
+    views = {"raw_df": loaded_repo.raw_df, "products": loaded_repo.snapshot().products}
+    shared_store.publish(views, "sample.csv", compact=False, root=root)
+    stale = shared_store.read_manifest(root)
+    # 再发布两个版本后，最早的版本目录被清理
+    shared_store.publish(views, "sample.csv", compact=False, root=root)
+    shared_store.publish(views, "sample.csv", compact=False, root=root)
+    assert not os.path.exists(os.path.join(root, stale["directory"]))
+    latest = shared_store.read_manifest
+    manifests = [stale]
+
+    # 第一次读到的是已被清理的旧清单，挂载失败后应重新读取最新清单
+    monkeypatch.setattr(shared_store, "read_manifest", lambda *args: manifests.pop() if manifests else latest(root))
+    monkeypatch.setattr(shared_store, "attach", functools.partial(shared_store.attach, root=root))
+    monkeypatch.setattr(shared_store, "manifest_path", lambda *args: os.path.join(root, "manifest.json"))
+
+    repo = DataRepository(compact=False)
+    assert repo.sync_shared()
+    assert repo.snapshot().version >= 3
+    assert len(repo.raw_df) == len(loaded_repo.raw_df)
@@ -0,0 +1,70 @@
+"""相似客户检索：KD 树近邻与暴力计算的欧氏距离一致，种子自身不出现在结果中。"""
+import numpy as np
+import pytest
+
+from backend import config
+from backend.data_loader import DataRepository
+from backend.modules import similarity
+
+
+def _brute_force(entry, seed: str, exclude: set, top_n: int) -> list:
+    features = entry["features"]
+    distances = np.linalg.norm(features - features[entry["positions"][seed]], axis=1)
+    ranked = [(str(cid), float(dist)) for cid, dist in zip(entry["customer_ids"], distances) if str(cid) not in exclude]
+    return sorted(ranked, key=lambda item: item[1])[:top_n]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("include_category", [False, True])
+def test_neighbors_match_brute_force(compact, include_category):
+    repo = DataRepository(compact=compact)
+    repo.load_csv(config.DEFAULT_CSV)
+    snapshot = repo.snapshot()
+    seeds = snapshot.rfm["customer_id"].astype(str).head(3).tolist()
+
+    result = similarity.find_similar_customers(snapshot, seeds, top_n=5, include_category=include_category)
+    entry = similarity.build_similarity_index(snapshot, include_category)
+
+    assert [item["seed"] for item in result["seeds"]] == seeds
+    for item in result["seeds"]:
+        expected = _brute_force(entry, item["seed"], set(seeds), 5)
+        actual = [(n["customer_id"], n["distance"]) for n in item["neighbors"]]
+        assert len(actual) == 5 and not {cid for cid, _ in actual} & set(seeds)
+        # 距离相同的客户先后顺序不定，只比较距离序列与每个近邻到种子的真实距离
+        assert np.allclose([d for _, d in actual], [d for _, d in expected])
+        truth = dict(_brute_force(entry, item["seed"], set(seeds), len(entry["customer_ids"])))
+        assert all(np.isclose(truth[cid], dist) for cid, dist in actual)
+
+    audience = [(a["customer_id"], a["distance"]) for a in result["audience"]]
+    assert len(audience) == len({cid for cid, _ in audience}) == 5
+    assert [d for _, d in audience] == sorted(d for _, d in audience)
+    best = {}
+    for item in result["seeds"]:
+        for n in item["neighbors"]:
+            best[n["customer_id"]] = min(best.get(n["customer_id"], np.inf), n["distance"])
+    assert all(best[cid] == dist for cid, dist in audience)
+
+
+def test_category_features_and_cache(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+    plain = similarity.build_similarity_index(snapshot)
+    with_category = similarity.build_similarity_index(snapshot, include_category=True)
+
+    assert plain["features"].shape[1] == 3
+    assert with_category["features"].shape[1] == 3 + snapshot.raw_df["category"].nunique()
+    assert np.allclose(with_category["features"][:, 3:].sum(axis=1), 1.0)
+    assert similarity.build_similarity_index(snapshot) is plain
+
+
+def test_missing_and_invalid_seeds(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+    seed = snapshot.rfm["customer_id"].astype(str).iloc[0]
+
+    result = similarity.find_similar_customers(snapshot, [f" {seed} ", "no-such-customer"], top_n=2)
+    assert result["seeds"][0]["seed"] == seed
+    assert result["missing"] == ["no-such-customer"]
+
+    with pytest.raises(ValueError):
+        similarity.find_similar_customers(snapshot, ["no-such-customer"])
+    with pytest.raises(ValueError):
+        similarity.find_similar_customers(snapshot, [seed], top_n=0)
@@ -0,0 +1,90 @@
+"""数据快照：概览计数的缓存、按需构建的派生视图与并发追加时的读一致性。"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from backend.data_loader import DatasetSnapshot
+
+
+def test_overview_is_memoized_without_building_views(loaded_repo):
+    snapshot = loaded_repo.snapshot()
+
+    first = snapshot.overview()
+
+    assert snapshot.views().keys() == {"raw_df"}
+    assert snapshot._memo["_counts"] is snapshot._counts()
+    assert snapshot.overview() == first
+    assert first["orders"] == len(snapshot.orders)
+    assert first["customers"] == len(snapshot.customers)
+    assert first["products"] == len(snapshot.products)
+
+
+def test_overview_reads_counts_from_built_views(loaded_repo):
+    built = loaded_repo.snapshot()
+    built.materialize()
+    # 视图已构建时直接取行数；用截断的视图验证计数确实来自视图而非重新扫描明细
+    snapshot = DatasetSnapshot(
+        raw_df=built.raw_df, version=built.version, prebuilt={"orders": built.orders.head(3), "products": built.products},
+    )
+    overview = snapshot.overview()
+    assert overview["orders"] == 3
+    assert overview["products"] == len(built.products)
+    assert overview["customers"] == len(built.customers)
+
+
+def _batch(repo, index: int) -> pd.DataFrame:
+    rows = repo.raw_df.head(2).copy()
+    rows["order_id"] = [f"CONCURRENT-{index}-{i}" for i in range(len(rows))]
+    return rows
+
+
+def _assert_consistent(snapshot: DatasetSnapshot, version: int, records: int) -> None:
+    """快照的版本、明细与各派生视图始终对应同一份数据。"""
+    assert snapshot.version == version and len(snapshot.raw_df) == records
+    assert snapshot.overview()["records"] == records
+    assert np.isclose(snapshot.orders["sales"].sum(), snapshot.raw_df["sales"].sum())
+    assert np.isclose(snapshot.rfm["M"].sum(), snapshot.raw_df["sales"].sum())
+    assert snapshot.orders["order_id"].nunique() == snapshot.raw_df["order_id"].nunique()
+
+
+def test_reader_keeps_snapshot_while_append_swaps(loaded_repo):
+    held = loaded_repo.snapshot()
+    version, records = held.version, len(held.raw_df)
+
+    loaded_repo.append_records(_batch(loaded_repo, 0))
+
+    # 追加已发布新快照，旧快照上首次构建的视图仍基于旧明细
+    assert loaded_repo.snapshot() is not held and loaded_repo.version != version
+    _assert_consistent(held, version, records)
+    assert not held.orders["order_id"].astype(str).str.startswith("CONCURRENT-").any()
+    current = loaded_repo.snapshot()
+    _assert_consistent(current, current.version, records + 2)
+
+
+def test_concurrent_readers_see_consistent_snapshots(loaded_repo):
+    done = threading.Event()
+    errors = []
+
+    def read() -> None:
+        try:
+            while not done.is_set():
+                snapshot = loaded_repo.snapshot()
+                _assert_consistent(snapshot, snapshot.version, len(snapshot.raw_df))
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    try:
+        for index in range(1, 6):
+            loaded_repo.append_records(_batch(loaded_repo, index))
+    finally:
+        done.set()
+        for thread in readers:
+            thread.join()
+
+    assert errors == []
+    final = loaded_repo.snapshot()
+    _assert_consistent(final, final.version, len(final.raw_df))
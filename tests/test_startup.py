@@ -0,0 +1,45 @@
+"""后台启动与就绪检查：预热默认关闭，默认数据加载失败时报告未就绪。"""
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from backend import config, main
+
+
+def test_warm_up_is_off_by_default():
+    env = {key: value for key, value in os.environ.items() if key != "STARTUP_WARMUP"}
+    code = "from backend import config; print(config.STARTUP_WARMUP)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+
+
+def test_ready_reports_degraded_when_default_data_fails(monkeypatch):
+    monkeypatch.setattr(main, "_readiness", {"status": "starting", "data_loaded": False, "warmed": {}})
+    monkeypatch.setattr(main, "_try_auto_load_default", lambda: False)
+    monkeypatch.setattr(main, "data_repo", main.DataRepository())
+
+    main._background_startup()
+
+    response = TestClient(main.app).get("/api/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "degraded" and response.json()["data_loaded"] is False
+
+    # 数据随后加载成功，就绪检查随之转为就绪
+    main.data_repo.load_csv(config.DEFAULT_CSV)
+    response = TestClient(main.app).get("/api/ready")
+    assert response.status_code == 200 and response.json()["status"] == "ready"
+
+
+def test_ready_after_successful_load_without_warm_up(monkeypatch):
+    monkeypatch.setattr(main, "_readiness", {"status": "starting", "data_loaded": False, "warmed": {}})
+    monkeypatch.setattr(config, "STARTUP_WARMUP", False)
+    monkeypatch.setattr(main, "_try_auto_load_default", lambda: True)
+    monkeypatch.setattr(main, "_warm_up", lambda snapshot: (_ for _ in ()).throw(AssertionError("不应预热")))
+
+    main._background_startup()
+
+    response = TestClient(main.app).get("/api/ready")
+    assert response.status_code == 200 and response.json()["warmed"] == {}
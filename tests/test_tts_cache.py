@@ -0,0 +1,95 @@
+"""云端语音缓存：按内容寻址命中、按容量 LRU 淘汰，命中缓存时不访问网络也不要求配置密钥。"""
+import os
+
+import pytest
+
+from backend import config
+from backend.modules import tts
+from backend.modules.tts import AudioCache
+from backend.utils.importing import lazy_import
+
+
+def test_hit_and_miss(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1024)
+    key = cache.make_key({"text": "你好", "voice_setting": {"voice_id": "v"}, "stream": False})
+
+    assert cache.get(key) is None
+    path = cache.put(key, b"audio")
+
+    assert cache.get(key) == path
+    with open(path, "rb") as file:
+        assert file.read() == b"audio"
+    # 不影响音频内容的字段不参与缓存键
+    assert cache.make_key({"text": "你好", "voice_setting": {"voice_id": "v"}, "stream": True}) == key
+    assert cache.make_key({"text": "你好", "voice_setting": {"voice_id": "w"}}) != key
+    assert cache.stats() == {"entries": 1, "bytes": 5, "max_bytes": 1024, "hits": 1, "misses": 1}
+
+
+def test_lru_eviction(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    assert cache.get("a")
+
+    cache.put("c", b"x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert sorted(os.listdir(tmp_path)) == ["a.mp3", "c.mp3"]
+    # 刚写入的文件即使单个超过上限也保留，其余全部淘汰
+    cache.put("d", b"x" * 40)
+    assert sorted(os.listdir(tmp_path)) == ["d.mp3"] and cache.stats()["bytes"] == 40
+
+
+def test_index_rebuilt_from_disk_in_mtime_order(tmp_path):
+    for offset, name in enumerate(["old", "mid", "new"]):
+        path = tmp_path / f"{name}.mp3"
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (1_000_000 + offset, 1_000_000 + offset))
+
+    cache = AudioCache(str(tmp_path), max_bytes=25)
+
+    assert cache.get("old") is None and cache.get("mid") and cache.get("new")
+
+
+@pytest.fixture
+def minimax(tmp_path, monkeypatch):
+    """隔离缓存目录，替换网络请求并禁用自动播放，返回记录请求的列表。"""
+    calls = []
+
+    class FakeResponse:
+        status_code = 200
+        text = ""
+
+        @staticmethod
+        def json():
+            return {"audio": b"synthesized".hex(), "status": "success"}
+
+    def post(url, **kwargs):
+        calls.append(kwargs["json"]["text"])
+        return FakeResponse()
+
+    monkeypatch.setattr(tts, "_AUDIO_CACHE", AudioCache(str(tmp_path), max_bytes=1024))
+    monkeypatch.setattr(lazy_import("requests"), "post", post)
+    monkeypatch.setattr(tts, "_try_play_audio", lambda path: None)
+    return calls
+
+
+def test_settings_checked_only_on_miss(minimax, monkeypatch):
+    monkeypatch.setattr(config, "MINIMAX_API_KEY", "")
+    with pytest.raises(RuntimeError):
+        tts.submit_minimax_task("促销播报")
+    assert minimax == []
+
+    monkeypatch.setattr(config, "MINIMAX_API_KEY", "key")
+    first = tts.submit_minimax_task("促销播报")
+    assert minimax == ["促销播报"] and first["status"] == "success"
+    with open(first["local_path"], "rb") as file:
+        assert file.read() == b"synthesized"
+
+    # 命中缓存时不访问网络，也不要求配置密钥
+    monkeypatch.setattr(config, "MINIMAX_API_KEY", "")
+    second = tts.submit_minimax_task("促销播报")
+    assert minimax == ["促销播报"]
+    assert second["local_path"] == first["local_path"]
+    assert tts.query_minimax_task(second["task_id"])["status"] == "success"